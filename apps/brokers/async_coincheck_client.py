@@ -0,0 +1,156 @@
+import asyncio
+
+import aiohttp
+from logger_util import UtxLogger as log
+
+from apps.brokers.coincheck_client import CoincheckClient
+from apps.brokers.config import coincheck_cfg
+from apps.brokers.rate_limit import get_endpoint_class, get_governor
+
+
+class AsyncCoincheckClient(CoincheckClient):
+    """
+    Asyncio variant of CoincheckClient.
+    Every API method of CoincheckClient is available and returns an awaitable,
+    e.g. `await client.get_ticker("btc_jpy")`. All requests share one
+    aiohttp connection pool, so independent calls can be awaited together
+    with asyncio.gather.
+
+    The client must be used from a single event loop; close it with
+    `await client.close()` or use it as an async context manager.
+    """
+
+    def __init__(self, config=coincheck_cfg):
+        self.config = config
+        self.api_key = config.api_key
+        self.secret_key = config.secret_key
+        self.session = None
+        self.governor = get_governor(config)
+        self.log = log(self.__class__.__name__)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connect_timeout, read_timeout = self.config.timeout
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.config.pool_size),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=connect_timeout, sock_read=read_timeout
+                ),
+            )
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def throttle(self, request, private=False):
+        """Wait for the shared rate-limit budget of the request, if any."""
+        if self.governor is not None:
+            await self.governor.acquire_async(get_endpoint_class(request, private))
+
+    async def send_request(self, http_method, request_url, method_name, sign=False):
+        session = self.get_session()
+        for attempt in range(self.config.max_retries + 1):
+            # Every attempt counts against the rate limits
+            await self.throttle(method_name, private=sign)
+            # Private requests are signed on every attempt so the nonce keeps increasing
+            headers = self.create_header(request_url) if sign else None
+            async with session.request(
+                http_method, request_url, headers=headers
+            ) as response:
+                text = await response.text()
+                if response.status == 429:
+                    self.on_rate_limited(
+                        method_name, sign, response.headers.get("Retry-After")
+                    )
+                if (
+                    self.is_retry(http_method, response.status)
+                    and attempt < self.config.max_retries
+                ):
+                    delay = self.get_retry_delay(attempt, response)
+                    self.log.warning(
+                        method_name,
+                        f"{request_url} returned {response.status}, retrying in {delay}s",
+                    )
+                else:
+                    if response.status >= 400:
+                        return self.log.handle_request_error(
+                            f"{response.status} {response.reason} for url: {request_url}",
+                            response.status,
+                            method_name,
+                            text,
+                        )
+                    data = await response.json(content_type=None)
+                    self.log.info(
+                        method_name,
+                        f"{request_url} Request successful <{response.status}> data[{len(data)}]",
+                    )
+                    return data
+            await asyncio.sleep(delay)
+
+    async def public_request(self, request, **kwargs):
+        try:
+            request_url = self.construct_request_url(request, **kwargs)
+            return await self.send_request("GET", request_url, request)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
+            return self.log.handle_request_error(req_err, method_name=request)
+
+    async def private_request(self, request, **kwargs):
+        """
+        Make a private request to the exchange API.
+
+        Parameters:
+            :request: API endpoint.
+            :kwargs: Request parameters.
+
+        Returns:
+        - Response from the API.
+        """
+        if "get" in request:
+            http_method = "GET"
+        elif "post" in request:
+            http_method = "POST"
+        elif "delet" in request:
+            http_method = "DELETE"
+        else:
+            return ValueError(
+                "Invalid HTTP method. Supported methods: GET, POST, DELETE"
+            )
+        try:
+            request_url = self.construct_request_url(request, **kwargs)
+            return await self.send_request(http_method, request_url, request, sign=True)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
+            return self.log.handle_request_error(req_err, method_name=request)
+
+    async def get_market_data(self, pairs, order_books=False, trades=True):
+        """
+        Market data
+        Fetch ticker and public trades for every pair concurrently over the
+        shared connection pool.
+
+        Parameters:
+            :pairs Pairs (e.g., ["btc_jpy", "eth_jpy"])
+            :order_books Also fetch the Order Book (default False)
+            :trades Fetch the public trades (default True)
+        Returns:
+            :tickers Ticker per pair
+            :trades Public trades per pair (only if requested)
+            :order_books Order Book per pair (only if requested)
+        """
+        requests = {"tickers": self.get_ticker}
+        if trades:
+            requests["trades"] = self.get_public_trades
+        if order_books:
+            requests["order_books"] = self.get_order_books
+        results = iter(
+            await asyncio.gather(
+                *(request(pair) for request in requests.values() for pair in pairs)
+            )
+        )
+        return {name: {pair: next(results) for pair in pairs} for name in requests}
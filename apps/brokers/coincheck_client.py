@@ -8,6 +8,8 @@ import requests
 from logger_util import UtxLogger as log
 
 from apps.brokers.config import coincheck_cfg
+from apps.brokers.rate_limit import get_endpoint_class, get_governor
+from apps.brokers.session_pool import get_session
 
 
 class CoincheckClient:
@@ -17,17 +19,30 @@ class CoincheckClient:
         btc_jpy, etc_jpy, lsk_jpy, mona_jpy, plt_jpy, fnct_jpy, dai_jpy, wbtc_jpy.
     """
 
-    def __init__(self):
-        api_config = coincheck_cfg
-        self.api_key = api_config.api_key
-        self.secret_key = api_config.secret_key
+    def __init__(self, config=coincheck_cfg):
+        self.config = config
+        self.api_key = config.api_key
+        self.secret_key = config.secret_key
+        self.session = get_session(config)
+        self.governor = get_governor(config)
         self.log = log(self.__class__.__name__)
 
     def get_method_name(self):
         return inspect.currentframe().f_back.f_code.co_name
 
+    def throttle(self, request, private=False):
+        """Wait for the shared rate-limit budget of the request, if any."""
+        if self.governor is not None:
+            self.governor.acquire(get_endpoint_class(request, private))
+
+    def on_rate_limited(self, request, private, retry_after=None):
+        """Hold the requests of the endpoint class after a 429 (Retry-After seconds)."""
+        if self.governor is not None:
+            seconds = float(retry_after) if str(retry_after).isdigit() else 1.0
+            self.governor.block(get_endpoint_class(request, private), seconds)
+
     def construct_request_url(self, request, pair=None, id=None, **kwargs):
-        request_endpoint = coincheck_cfg.api_urls.get(request)
+        request_endpoint = self.config.api_urls.get(request)
 
         if not request_endpoint:
             return ValueError(f"Invalid request: {request}")
@@ -46,20 +61,66 @@ class CoincheckClient:
             if param or kwargs
             else f"?{param}" if param else ""
         )
-        return f"{coincheck_cfg.base_url}{formatted_endpoint}{parameters}"
+        return f"{self.config.base_url}{formatted_endpoint}{parameters}"
+
+    def get_retry_delay(self, attempt, response):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        return self.config.backoff_factor * (2**attempt)
+
+    def is_retry(self, http_method, status):
+        if status not in self.config.retry_status_codes:
+            return False
+        return http_method != "POST" or status == 429
+
+    def send_request(
+        self, http_method, request_url, method_name, sign=False, request=None
+    ):
+        """
+        Send a request, retrying on config.retry_status_codes (POST only on
+        429, as a 5xx may come after the order was accepted).
+
+        Every attempt waits for the rate-limit budget of `request` (the API
+        request name, method_name when None), and a 429 holds its endpoint
+        class before the next attempt.
+        """
+        request = request or method_name
+        for attempt in range(self.config.max_retries + 1):
+            # Every attempt counts against the rate limits
+            self.throttle(request, private=sign)
+            # Private requests are signed on every attempt so the nonce keeps increasing
+            headers = self.create_header(request_url) if sign else None
+            response = self.session.request(
+                http_method, request_url, headers=headers, timeout=self.config.timeout
+            )
+            if response.status_code == 429:
+                self.on_rate_limited(request, sign, response.headers.get("Retry-After"))
+            if not (
+                self.is_retry(http_method, response.status_code)
+                and attempt < self.config.max_retries
+            ):
+                break
+            delay = self.get_retry_delay(attempt, response)
+            self.log.warning(
+                method_name,
+                f"{request_url} returned {response.status_code}, retrying in {delay}s",
+            )
+            time.sleep(delay)
+        response.raise_for_status()  # Raises HTTPError for bad responses
+        self.log.info(
+            method_name,
+            f"{request_url} Request successful {response} data[{len(response.json())}]",
+        )
+        return response.json()
 
     def public_request(self, request, **kwargs):
         method_name = self.get_method_name()
         try:
             request_url = self.construct_request_url(request, **kwargs)
-            response = requests.get(request_url)
-            response.raise_for_status()  # Raises HTTPError for bad responses
-            self.log.info(
-                method_name,
-                f"{request_url} Request successful {response} data[{len(response.json())}]",
-            )
-            return response.json()
+            return self.send_request("GET", request_url, method_name, request=request)
         except requests.exceptions.HTTPError as http_err:
+            response = http_err.response
             return self.log.handle_request_error(
                 http_err, response.status_code, method_name, response.text
             )
@@ -78,28 +139,25 @@ class CoincheckClient:
         - Response from the API.
         """
         method_name = self.get_method_name()
+        # Choose the appropriate HTTP method
+        if "get" in request:
+            http_method = "GET"
+        elif "post" in request:
+            http_method = "POST"
+        elif "delet" in request:
+            http_method = "DELETE"
+        else:
+            return ValueError(
+                "Invalid HTTP method. Supported methods: GET, POST, DELETE"
+            )
         try:
             request_url = self.construct_request_url(request, **kwargs)
-            headers = self.create_header(request_url)
-            # Choose the appropriate HTTP method
-            if "get" in request:
-                response = requests.get(request_url, headers=headers)
-            elif "post" in request:
-                response = requests.post(request_url, headers=headers)
-            elif "delet" in request:
-                response = requests.delete(request_url, headers=headers)
-            else:
-                return ValueError(
-                    "Invalid HTTP method. Supported methods: GET, POST, DELETE"
-                )
-            response.raise_for_status()  # Raises HTTPError for bad responses
-            self.log.info(
-                method_name,
-                f"{request_url} Request successful {response} data[{len(response.json())}]",
+            return self.send_request(
+                http_method, request_url, method_name, sign=True, request=request
             )
-            return response.json()
 
         except requests.exceptions.HTTPError as http_err:
+            response = http_err.response
             return self.log.handle_request_error(
                 http_err, response.status_code, method_name, response.text
             )
@@ -160,18 +218,21 @@ class CoincheckClient:
         self.log.info(method_name, f"Fetching Public trades for pair: {pair}")
         return self.public_request(method_name, pair=pair)
 
-    def get_order_books(self):
+    def get_order_books(self, pair=None):
         """
         Order Book
         Fetch order book information.
+        If pair is not specified, the exchange returns btc_jpy.
 
+        Parameters:
+            :param pair Pair (e.g., "btc_jpy")
         Returns:
             :asks Sell order status
             :bids Buy order status
         """
         method_name = self.get_method_name()
-        self.log.info(method_name, "Fetching Order Book")
-        return self.public_request(method_name)
+        self.log.info(method_name, f"Fetching Order Book for pair: {pair}")
+        return self.public_request(method_name, pair=pair)
 
     def get_calc_rate(self, pair, order_type, amount="", price=""):
         """
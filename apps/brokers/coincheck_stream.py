@@ -0,0 +1,140 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timezone
+
+import aiohttp
+from logger_util import UtxLogger as log
+
+from apps.brokers.config import coincheck_cfg
+
+
+def parse_trades(message):
+    """
+    Convert a trades channel message to dicts shaped like the public trades
+    response, oldest first.
+
+    The channel sends a list of
+    [timestamp, id, pair, rate, amount, order_type, taker_id, maker_id];
+    older servers send a single [id, pair, rate, amount, order_type].
+    """
+    rows = message if message and isinstance(message[0], list) else [message]
+    trades = []
+    for row in rows:
+        if len(row) >= 6:
+            timestamp, trade_id, pair, rate, amount, order_type = row[:6]
+        else:
+            timestamp = None
+            trade_id, pair, rate, amount, order_type = row[:5]
+        trade = {
+            "id": int(trade_id),
+            "amount": str(amount),
+            "rate": str(rate),
+            "pair": pair,
+            "order_type": order_type,
+        }
+        if timestamp is not None:
+            trade["created_at"] = datetime.fromtimestamp(
+                float(timestamp), tz=timezone.utc
+            ).isoformat()
+        trades.append(trade)
+    return trades
+
+
+class CoincheckStream:
+    """
+    Client of the Coincheck WebSocket API (trades and orderbook channels).
+
+    Messages are passed to a handler object:
+        await handler.on_connect()                 after every (re)connection
+        await handler.on_trades(pair, trades)      see parse_trades
+        await handler.on_order_book(pair, book)    {"asks", "bids", "last_update_at"}
+                                                   changed levels, size 0 removed
+
+    The connection is re-established with exponential backoff and jitter
+    when it drops; the handler is expected to backfill what it missed in
+    on_connect.
+
+    document: https://coincheck.com/documents/exchange/api#websocket
+    """
+
+    def __init__(
+        self,
+        pairs,
+        handler,
+        config=coincheck_cfg,
+        channels=("trades", "orderbook"),
+        initial_backoff=0.5,
+        max_backoff=30.0,
+        heartbeat=15.0,
+    ):
+        self.pairs = pairs
+        self.handler = handler
+        self.config = config
+        self.channels = channels
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.heartbeat = heartbeat
+        self.connections = 0
+        self.running = False
+        self.ws = None
+        self.log = log(self.__class__.__name__)
+
+    async def run(self):
+        """Stream until stop() is called, reconnecting when the connection drops."""
+        self.running = True
+        backoff = self.initial_backoff
+        async with aiohttp.ClientSession() as session:
+            while self.running:
+                try:
+                    received = await self.stream(session)
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    self.log.warning("run", f"WebSocket error: {e}")
+                    received = False
+                if not self.running:
+                    break
+                # A connection that delivered data resets the backoff
+                backoff = self.initial_backoff if received else backoff
+                delay = backoff * random.uniform(0.5, 1.5)
+                self.log.warning("run", f"Reconnecting in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def stream(self, session):
+        received = False
+        async with session.ws_connect(
+            self.config.ws_url, heartbeat=self.heartbeat
+        ) as ws:
+            self.ws = ws
+            self.connections += 1
+            for pair in self.pairs:
+                for channel in self.channels:
+                    await ws.send_json(
+                        {"type": "subscribe", "channel": f"{pair}-{channel}"}
+                    )
+            self.log.info("stream", f"Subscribed to {self.channels} of {self.pairs}")
+            await self.handler.on_connect()
+
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+                received = True
+                await self.dispatch(json.loads(message.data))
+        self.ws = None
+        return received
+
+    async def dispatch(self, message):
+        if not message:
+            return
+        if isinstance(message[0], list) or len(message) in (5, 8):
+            trades = parse_trades(message)
+            await self.handler.on_trades(trades[0]["pair"], trades)
+        elif len(message) == 2 and isinstance(message[1], dict):
+            await self.handler.on_order_book(message[0], message[1])
+        else:
+            self.log.warning("dispatch", f"Unexpected message: {message}")
+
+    async def stop(self):
+        self.running = False
+        if self.ws is not None:
+            await self.ws.close()
@@ -1,3 +1,6 @@
+import os
+
+
 class BrokersConfig:
     def __init__(
         self,
@@ -6,6 +9,14 @@ class BrokersConfig:
         account_id=None,
         base_url=None,
         api_urls=None,
+        ws_url=None,
+        pairs=("btc_jpy",),
+        pool_size=10,
+        timeout=(3.05, 10),
+        max_retries=3,
+        backoff_factor=0.5,
+        retry_status_codes=(429, 500, 502, 503, 504),
+        rate_limits=None,
         **kwargs
     ):
         self.api_key = access_key
@@ -13,6 +24,19 @@ class BrokersConfig:
         self.account_id = account_id
         self.base_url = base_url
         self.api_urls = api_urls
+        self.ws_url = ws_url
+        # Pairs ingested and traded
+        self.pairs = list(pairs)
+        # HTTP session settings: connections kept alive per base_url,
+        # (connect, read) timeout in seconds and retry policy.
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.retry_status_codes = retry_status_codes
+        # {"total" or endpoint class: (requests per second, burst)} enforced
+        # client-side by rate_limit.RateLimitGovernor; None for no limit
+        self.rate_limits = rate_limits
         self.additional_params = kwargs
 
 
@@ -20,12 +44,23 @@ class BrokersConfig:
 coincheck_cfg = BrokersConfig(
     access_key="",
     secret_access_key="",
-    base_url="https://coincheck.com",
+    # Point UTX_COINCHECK_BASE_URL at the mock exchange to run offline
+    base_url=os.getenv("UTX_COINCHECK_BASE_URL", "https://coincheck.com"),
+    ws_url=os.getenv("UTX_COINCHECK_WS_URL", "wss://ws-api.coincheck.com/"),
+    # Comma-separated, e.g. btc_jpy,etc_jpy,lsk_jpy,mona_jpy,plt_jpy,fnct_jpy,dai_jpy,wbtc_jpy
+    pairs=os.getenv("UTX_PAIRS", "btc_jpy").split(","),
+    # Kept below the exchange limits; order requests come first when tight
+    rate_limits={
+        "total": (10, 20),
+        "public": (10, 20),
+        "private": (5, 10),
+        "order": (4, 4),
+    },
     api_urls={
         # Public API
         "get_ticker": "/api/ticker",
         "get_public_trades": "/api/trades",
-        "get_orderbooks": "/api/order_books",
+        "get_order_books": "/api/order_books",
         "get_calc_rate": "/api/exchange/orders/rate",
         "get_standard_rate": "/api/rate/{}",
         "get_accounts": "/api/accounts",
@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+
+from logger_util import UtxLogger as log
+
+# Requests of cancel_orders in flight at the same time
+CANCEL_CONCURRENCY = 10
+
+
+def _to_float(value):
+    return None if value in (None, "") else float(value)
+
+
+@dataclass
+class ManagedOrder:
+    """
+    Order state kept by the OrderManager. pending_amount is the base amount
+    left, or the quote amount left of a market buy (pending_market_buy_amount).
+    """
+
+    id: int
+    pair: str
+    order_type: str
+    rate: float = None
+    amount: float = None
+    pending_amount: float = None
+    filled_amount: float = 0.0
+    status: str = "open"
+    created_at: str = None
+    # Monotonic time the manager started tracking the order
+    tracked_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def side(self):
+        return self.order_type.replace("market_", "")
+
+    @property
+    def is_open(self):
+        return self.status in ("open", "cancelling")
+
+
+class OrderManager:
+    """
+    In-memory state of the account's orders, so trading decisions read
+    what is open without a private request.
+
+    Orders placed and cancelled through the manager update the state
+    right away. reconcile() brings it in line with the exchange in one
+    sweep of two concurrent requests, whatever the number of orders: the
+    unsettled order list and the transaction history. New transactions
+    are applied as fills, orders open at the exchange but unknown here
+    (placed elsewhere, or before a restart) are added, and tracked
+    orders no longer listed are closed as filled or cancelled.
+
+    The state is shared between the client's event loop, which runs the
+    coroutines, and the threads reading it.
+    """
+
+    def __init__(self, client, cancel_concurrency=CANCEL_CONCURRENCY):
+        self.client = client
+        self.cancel_concurrency = cancel_concurrency
+        self.orders = {}
+        self.last_transaction_id = None
+        self.lock = threading.Lock()
+        self.log = log(self.__class__.__name__)
+
+    # Queries
+    def get_order(self, order_id):
+        with self.lock:
+            return self.orders.get(order_id)
+
+    def get_open_orders(self, pair=None):
+        with self.lock:
+            return [
+                order
+                for order in self.orders.values()
+                if order.is_open and (pair is None or order.pair == pair)
+            ]
+
+    def get_open_amount(self, pair, side):
+        """Base amount left on the open orders of a pair and side."""
+        return sum(
+            order.pending_amount or 0.0
+            for order in self.get_open_orders(pair)
+            if order.side == side and order.order_type != "market_buy"
+        )
+
+    # Updates
+    def track(self, response):
+        """Track an order from a new order or unsettled order list response."""
+        pending = response.get("pending_amount")
+        if pending is None:
+            pending = response.get("pending_market_buy_amount")
+        if pending is None:
+            pending = response.get("amount") or response.get("market_buy_amount")
+        order = ManagedOrder(
+            id=response["id"],
+            pair=response["pair"],
+            order_type=response["order_type"],
+            rate=_to_float(response.get("rate")),
+            amount=_to_float(response.get("amount")),
+            pending_amount=_to_float(pending),
+            created_at=response.get("created_at"),
+        )
+        with self.lock:
+            return self.orders.setdefault(order.id, order)
+
+    def apply_fill(self, transaction):
+        """Apply a transaction history entry to its order."""
+        with self.lock:
+            order = self.orders.get(transaction["order_id"])
+            if order is None:
+                return None
+            base, quote = order.pair.split("_")
+            funds = transaction.get("funds", {})
+            amount = abs(float(funds.get(base, 0)))
+            order.filled_amount += amount
+            if order.pending_amount is not None:
+                if order.order_type == "market_buy":
+                    order.pending_amount -= abs(float(funds.get(quote, 0)))
+                else:
+                    order.pending_amount -= amount
+                if order.pending_amount <= 1e-12:
+                    order.pending_amount = 0.0
+                    order.status = "filled"
+            return order
+
+    def close(self, order_id, status):
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is not None and order.is_open:
+                order.status = status
+            return order
+
+    def forget_closed(self):
+        """Drop the closed orders from memory."""
+        with self.lock:
+            for order_id in [i for i, o in self.orders.items() if not o.is_open]:
+                del self.orders[order_id]
+
+    # Exchange requests
+    async def place_order(self, pair, order_type, rate, amount, **kwargs):
+        """post_new_order, tracking the order when the exchange accepts it."""
+        response = await self.client.post_new_order(
+            pair, order_type, rate, amount, **kwargs
+        )
+        if response.get("success"):
+            self.track(response)
+        return response
+
+    async def cancel_order(self, order_id):
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is not None and order.is_open:
+                order.status = "cancelling"
+        response = await self.client.delet_cancel_order(order_id)
+        if response.get("success"):
+            self.close(order_id, "cancelled")
+        else:
+            # Still open as far as we know; the next reconcile() tells
+            self.close(order_id, "open")
+            self.log.warning("cancel_order", f"Cancel of {order_id} failed: {response}")
+        return response
+
+    async def cancel_orders(self, order_ids=None, pair=None):
+        """
+        Cancel orders concurrently, at most cancel_concurrency requests at a
+        time; all the open orders (of a pair) when order_ids is None.
+
+        Returns:
+            :{order_id: response}
+        """
+        if order_ids is None:
+            order_ids = [order.id for order in self.get_open_orders(pair)]
+        semaphore = asyncio.Semaphore(self.cancel_concurrency)
+
+        async def cancel(order_id):
+            async with semaphore:
+                return await self.cancel_order(order_id)
+
+        responses = await asyncio.gather(*(cancel(i) for i in order_ids))
+        return dict(zip(order_ids, responses))
+
+    async def reconcile(self):
+        """
+        Sync the state with the exchange.
+
+        Returns:
+            :False if a request failed and nothing was changed
+        """
+        started = time.monotonic()
+        unsettled, history = await asyncio.gather(
+            self.client.get_unsettled_order_list(),
+            self.client.get_transaction_history(),
+        )
+        if not unsettled.get("success") or not history.get("success"):
+            self.log.error(
+                "reconcile", f"Reconciliation skipped: {unsettled}, {history}"
+            )
+            return False
+
+        # The history lists the newest first
+        transactions = sorted(history["transactions"], key=lambda t: t["id"])
+        for transaction in transactions:
+            if (
+                self.last_transaction_id is None
+                or transaction["id"] > self.last_transaction_id
+            ):
+                self.apply_fill(transaction)
+        if transactions:
+            self.last_transaction_id = max(
+                self.last_transaction_id or 0, transactions[-1]["id"]
+            )
+
+        listed = {}
+        for response in unsettled["orders"]:
+            order = self.track(response)
+            listed[order.id] = response
+        with self.lock:
+            for order in self.orders.values():
+                if not order.is_open:
+                    continue
+                response = listed.get(order.id)
+                if response is not None:
+                    pending = response.get("pending_amount")
+                    if pending is None:
+                        pending = response.get("pending_market_buy_amount")
+                    order.pending_amount = _to_float(pending)
+                # Orders placed after the list was requested are not in it yet
+                elif order.tracked_at < started:
+                    # Whatever the fills did not take was cancelled
+                    cancelled = order.status == "cancelling" or order.pending_amount
+                    order.status = "cancelled" if cancelled else "filled"
+        return True
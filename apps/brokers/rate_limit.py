@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+# Endpoint classes, highest priority first
+ORDER, PRIVATE, PUBLIC = "order", "private", "public"
+PRIORITIES = {ORDER: 0, PRIVATE: 1, PUBLIC: 2}
+# Requests placing or cancelling orders
+ORDER_REQUESTS = frozenset({"post_new_order", "delet_cancel_order"})
+# Share of the total budget a priority leaves to the higher ones
+RESERVES = {0: 0.0, 1: 0.1, 2: 0.25}
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_endpoint_class(request, private):
+    if request in ORDER_REQUESTS:
+        return ORDER
+    return PRIVATE if private else PUBLIC
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity` (the burst)."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def time_until(self, tokens):
+        """Seconds until the bucket holds `tokens`, 0 if it already does."""
+        now = self.refill()
+        wait = max(0.0, (tokens - self.tokens) / self.rate)
+        return max(wait, self.blocked_until - now)
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds):
+        """Empty the bucket and hold it for `seconds`, e.g. after a 429."""
+        now = self.refill()
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class RateLimitGovernor:
+    """
+    Client-side rate limits shared by every thread and asyncio task using
+    the broker.
+
+    A request takes a token from the bucket of its endpoint class (public,
+    private or order) and from the total bucket of the account. When the
+    total budget is tight, priorities decide who goes first: order
+    requests may use the whole budget, private requests leave 10% of it
+    and public ones 25%, and no request starts while a higher priority
+    one is waiting. Market-data polling therefore slows down before an
+    order is delayed.
+
+    Parameters:
+        :limits {class or "total": (requests per second, burst)}; a class
+            without limits only counts against the total.
+    """
+
+    def __init__(self, limits, clock=time.monotonic):
+        self.clock = clock
+        self.buckets = {
+            name: TokenBucket(rate, burst, clock)
+            for name, (rate, burst) in limits.items()
+        }
+        self.waiting = defaultdict(int)
+        self.granted = defaultdict(int)
+        self.throttled = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def try_acquire(self, endpoint_class, priority=None):
+        """
+        Take a token if the budget allows it.
+
+        Returns:
+            :0 when acquired, else the seconds to wait before trying again
+        """
+        priority = PRIORITIES[endpoint_class] if priority is None else priority
+        with self.lock:
+            bucket = self.buckets.get(endpoint_class)
+            total = self.buckets.get("total")
+            wait = bucket.time_until(1) if bucket is not None else 0.0
+            if total is not None:
+                reserve = total.capacity * RESERVES.get(priority, RESERVES[2])
+                wait = max(wait, total.time_until(1 + reserve))
+                if any(self.waiting[p] for p in range(priority)):
+                    # Let the higher priority request take the next token
+                    wait = max(wait, 1 / total.rate)
+            if wait > 0:
+                return wait
+            for name in (endpoint_class, "total"):
+                if name in self.buckets:
+                    self.buckets[name].take()
+            self.granted[endpoint_class] += 1
+            return 0.0
+
+    def enter(self, endpoint_class, priority):
+        priority = PRIORITIES[endpoint_class] if priority is None else priority
+        with self.lock:
+            self.waiting[priority] += 1
+            self.throttled[endpoint_class] += 1
+        return priority
+
+    def leave(self, priority):
+        with self.lock:
+            self.waiting[priority] -= 1
+
+    def acquire(self, endpoint_class, priority=None):
+        """Block the calling thread until a token of endpoint_class is taken."""
+        wait = self.try_acquire(endpoint_class, priority)
+        if not wait:
+            return
+        priority = self.enter(endpoint_class, priority)
+        try:
+            while wait:
+                time.sleep(wait)
+                wait = self.try_acquire(endpoint_class, priority)
+        finally:
+            self.leave(priority)
+
+    async def acquire_async(self, endpoint_class, priority=None):
+        """Like acquire, sleeping on the event loop instead of blocking it."""
+        wait = self.try_acquire(endpoint_class, priority)
+        if not wait:
+            return
+        priority = self.enter(endpoint_class, priority)
+        try:
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self.try_acquire(endpoint_class, priority)
+        finally:
+            self.leave(priority)
+
+    def block(self, endpoint_class, seconds):
+        """Hold the requests of a class after the exchange answered 429."""
+        with self.lock:
+            bucket = self.buckets.get(endpoint_class) or self.buckets.get("total")
+            if bucket is not None:
+                bucket.block(seconds)
+
+
+def get_governor(config):
+    """
+    Return the governor shared by the clients of config.base_url, or None
+    when config.rate_limits is not set.
+    """
+    if not config.rate_limits:
+        return None
+    with _governors_lock:
+        governor = _governors.get(config.base_url)
+        if governor is None:
+            governor = _governors[config.base_url] = RateLimitGovernor(
+                config.rate_limits
+            )
+        return governor
@@ -0,0 +1,50 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(config):
+    """Create a keep-alive session configured from a BrokersConfig."""
+    # Only connection errors are retried here: the request never reached the
+    # exchange, so its signature is still unused. Status codes are retried by
+    # CoincheckClient.send_request, which signs every attempt again.
+    retry = Retry(
+        total=config.max_retries,
+        connect=config.max_retries,
+        read=0,
+        status=0,
+        backoff_factor=config.backoff_factor,
+        allowed_methods=frozenset({"GET", "POST", "DELETE"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=config.pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount(config.base_url, adapter)
+    return session
+
+
+def get_session(config):
+    """Return the shared session for config.base_url, creating it on first use."""
+    with _sessions_lock:
+        session = _sessions.get(config.base_url)
+        if session is None:
+            session = create_session(config)
+            _sessions[config.base_url] = session
+        return session
+
+
+def close_sessions():
+    """Close every pooled session, e.g. when the batch process stops."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,157 @@
+import threading
+
+import numpy as np
+from cache.ring_buffer import RingBuffer
+
+DEFAULT_CAPACITY = 10000
+# Bar resolutions and their length in seconds, finest first
+RESOLUTIONS = {"1s": 1, "1m": 60, "5m": 300, "1h": 3600}
+# Columns of a bar row; start is in epoch seconds
+START, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+def trades_to_bars(rates, amounts, timestamps):
+    """One zero-length bar per trade, to be aggregated like any other bar."""
+    rates = np.asarray(rates, dtype=np.float64)
+    return np.column_stack(
+        (
+            np.asarray(timestamps, dtype=np.float64),
+            rates,
+            rates,
+            rates,
+            rates,
+            np.asarray(amounts, dtype=np.float64),
+        )
+    )
+
+
+def aggregate_bars(bars, seconds):
+    """
+    Aggregate bar rows sorted by start into bars of `seconds`, one row per
+    period that has data.
+    """
+    bars = np.asarray(bars, dtype=np.float64).reshape(-1, 6)
+    if not len(bars):
+        return bars
+    starts = bars[:, START] // seconds * seconds
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, len(bars) - 1]
+    return np.column_stack(
+        (
+            starts[first],
+            bars[first, OPEN],
+            np.maximum.reduceat(bars[:, HIGH], first),
+            np.minimum.reduceat(bars[:, LOW], first),
+            bars[last, CLOSE],
+            np.add.reduceat(bars[:, VOLUME], first),
+        )
+    )
+
+
+class BarAggregator:
+    """
+    Incremental OHLCV bars per pair at several resolutions.
+
+    Trades are aggregated into the finest resolution; every bar that closes
+    is rolled up into the next coarser one, so each trade is only touched
+    once. A bar closes when a trade of a later period arrives. Closed bars
+    are kept in a RingBuffer per pair and resolution and passed to the
+    listeners registered with add_listener(callback) as
+    (pair, resolution, bars), under the aggregator lock.
+
+    Trades older than the open bar of a resolution are counted in that bar
+    instead of reopening closed ones.
+    """
+
+    def __init__(self, resolutions=tuple(RESOLUTIONS), capacity=DEFAULT_CAPACITY):
+        self.resolutions = sorted(resolutions, key=RESOLUTIONS.__getitem__)
+        self.capacity = capacity
+        self.closed = {}
+        self.current = {}
+        self.listeners = []
+        self.lock = threading.RLock()
+
+    def add_listener(self, callback):
+        with self.lock:
+            if callback not in self.listeners:
+                self.listeners.append(callback)
+
+    def get_buffer(self, pair, resolution):
+        buffer = self.closed.get((pair, resolution))
+        if buffer is None:
+            buffer = self.closed[(pair, resolution)] = RingBuffer(
+                self.capacity, columns=6
+            )
+        return buffer
+
+    def add_trades(self, pair, rates, amounts, timestamps):
+        """Add trades of a pair; timestamps in epoch seconds, oldest first."""
+        bars = trades_to_bars(rates, amounts, timestamps)
+        if not len(bars):
+            return
+        latest = float(bars[:, START].max())
+        with self.lock:
+            for resolution in self.resolutions:
+                bars = self.add_bars(pair, resolution, bars, latest)
+
+    def add_bars(self, pair, resolution, bars, latest):
+        """Merge bars into the open bar of a resolution and return the ones that closed."""
+        seconds = RESOLUTIONS[resolution]
+        current = self.current.get((pair, resolution))
+        if current is not None:
+            bars = bars.copy()
+            bars[:, START] = np.maximum(bars[:, START], current[START])
+            bars = np.vstack((current, bars))
+        bars = bars[np.argsort(bars[:, START], kind="stable")]
+        bars = aggregate_bars(bars, seconds)
+        if not len(bars):
+            return bars
+        closed, current = bars[:-1], bars[-1]
+        if latest // seconds * seconds > current[START]:
+            closed, current = bars, None
+        self.current[(pair, resolution)] = current
+        if len(closed):
+            self.get_buffer(pair, resolution).extend(closed)
+            for callback in self.listeners:
+                callback(pair, resolution, closed)
+        return closed
+
+    def get_bars(self, pair, resolution, n=None, include_current=False):
+        """
+        Return the last n closed bars of a pair as an (n, 6) array of
+        start, open, high, low, close and volume, oldest first. With
+        include_current, the open bar is appended, including the trades
+        the finer resolutions have not rolled up yet.
+        """
+        with self.lock:
+            buffer = self.closed.get((pair, resolution))
+            bars = buffer.latest(n) if buffer is not None else np.empty((0, 6))
+            current = self.get_current_bar(pair, resolution)
+        if include_current and current is not None:
+            bars = np.vstack((bars, current))
+            if n is not None:
+                bars = bars[-n:]
+        return bars
+
+    def get_current_bar(self, pair, resolution):
+        """Open bar of a resolution, or None if no trade arrived since the last one closed."""
+        with self.lock:
+            index = self.resolutions.index(resolution)
+            parts = [
+                self.current.get((pair, finer))
+                for finer in reversed(self.resolutions[: index + 1])
+            ]
+            parts = [part for part in parts if part is not None]
+            if not parts:
+                return None
+            # The open bars of the finer resolutions all fall in this one
+            return aggregate_bars(np.vstack(parts), RESOLUTIONS[resolution])[0]
+
+    def clear(self, pair=None):
+        with self.lock:
+            for store in (self.closed, self.current):
+                for key in [key for key in store if pair is None or key[0] == pair]:
+                    del store[key]
+
+
+bar_aggregator = BarAggregator()
@@ -0,0 +1,281 @@
+import threading
+
+import numpy as np
+
+DEFAULT_CAPACITY = 64
+
+
+class BookSide:
+    """
+    Price levels of one side of a book in preallocated NumPy arrays, best
+    first. Bid keys are negated prices so both sides are sorted ascending
+    and found with a binary search; arrays double when full.
+    """
+
+    def __init__(self, is_bid, capacity=DEFAULT_CAPACITY):
+        self.is_bid = is_bid
+        self.sign = -1.0 if is_bid else 1.0
+        self.keys = np.empty(capacity, dtype=np.float64)
+        self.sizes = np.empty(capacity, dtype=np.float64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def load(self, prices, sizes):
+        """Replace every level; prices and sizes in any order, size 0 levels skipped."""
+        prices = np.asarray(prices, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+        keep = sizes > 0
+        keys = self.sign * prices[keep]
+        order = np.argsort(keys, kind="stable")
+        count = len(order)
+        if count > len(self.keys):
+            self.keys = np.empty(count * 2, dtype=np.float64)
+            self.sizes = np.empty(count * 2, dtype=np.float64)
+        self.keys[:count] = keys[order]
+        self.sizes[:count] = sizes[keep][order]
+        self.count = count
+
+    def index(self, price):
+        """Position of a price, or where it would be inserted."""
+        return int(np.searchsorted(self.keys[: self.count], self.sign * price))
+
+    def set(self, price, size):
+        """Set the size of a level in O(log n); size 0 removes it."""
+        key = self.sign * price
+        count = self.count
+        i = self.index(price)
+        exists = i < count and self.keys[i] == key
+        if size > 0:
+            if exists:
+                self.sizes[i] = size
+                return
+            if count == len(self.keys):
+                self.keys = np.concatenate((self.keys, np.empty(count)))
+                self.sizes = np.concatenate((self.sizes, np.empty(count)))
+            self.keys[i + 1 : count + 1] = self.keys[i:count]
+            self.sizes[i + 1 : count + 1] = self.sizes[i:count]
+            self.keys[i] = key
+            self.sizes[i] = size
+            self.count += 1
+        elif exists:
+            self.keys[i : count - 1] = self.keys[i + 1 : count]
+            self.sizes[i : count - 1] = self.sizes[i + 1 : count]
+            self.count -= 1
+
+    def size_at(self, price):
+        i = self.index(price)
+        if i < self.count and self.keys[i] == self.sign * price:
+            return float(self.sizes[i])
+        return 0.0
+
+    def get_prices(self, depth=None):
+        return self.sign * self.keys[: self.count][:depth]
+
+    def get_sizes(self, depth=None):
+        return self.sizes[: self.count][:depth]
+
+    def copy(self, depth=None):
+        """Copy of the side, keeping only its best `depth` levels if given."""
+        count = self.count if depth is None else min(self.count, depth)
+        side = BookSide(self.is_bid, max(count, 1))
+        side.keys[:count] = self.keys[:count]
+        side.sizes[:count] = self.sizes[:count]
+        side.count = count
+        return side
+
+
+class L2OrderBook:
+    """
+    Array-backed L2 order book of one pair.
+
+    Levels are updated in O(log n) and top-of-book queries read the first
+    array elements, so strategies can call them in the hot path. The book
+    itself is not thread-safe: writers go through OrderBookCache, which
+    swaps whole books in on snapshots and serializes diffs.
+    """
+
+    ASK, BID = "asks", "bids"
+
+    def __init__(self, asks=(), bids=(), pair=None, timestamp=None):
+        self.pair = pair
+        self.timestamp = timestamp
+        self.sides = {self.ASK: BookSide(False), self.BID: BookSide(True)}
+        self.apply_snapshot(asks, bids)
+
+    @staticmethod
+    def parse_levels(levels):
+        return [(float(price), float(size)) for price, size in levels]
+
+    @classmethod
+    def from_response(cls, data, pair=None, timestamp=None):
+        """Build a book from a get_order_books response."""
+        return cls(data.get("asks", []), data.get("bids", []), pair, timestamp)
+
+    def __len__(self):
+        return len(self.sides[self.ASK]) + len(self.sides[self.BID])
+
+    def copy(self, depth=None):
+        book = L2OrderBook(pair=self.pair, timestamp=self.timestamp)
+        book.sides = {name: side.copy(depth) for name, side in self.sides.items()}
+        return book
+
+    # Updates
+    def apply_snapshot(self, asks, bids):
+        """Replace the whole book with (price, size) levels."""
+        for name, levels in ((self.ASK, asks), (self.BID, bids)):
+            levels = np.asarray(self.parse_levels(levels), dtype=np.float64)
+            levels = levels.reshape(-1, 2)
+            self.sides[name].load(levels[:, 0], levels[:, 1])
+
+    def set_level(self, side, price, size):
+        self.sides[side].set(float(price), float(size))
+
+    def apply_diff(self, asks=(), bids=()):
+        """Apply changed (price, size) levels, size 0 meaning removed."""
+        for name, levels in ((self.ASK, asks), (self.BID, bids)):
+            side = self.sides[name]
+            for price, size in self.parse_levels(levels):
+                side.set(price, size)
+
+    def diff(self, asks, bids):
+        """
+        Return the changed levels from this book to a full snapshot, as
+        (asks, bids) lists of (price, size); removed levels have size 0.
+        """
+        changes = []
+        for name, levels in ((self.ASK, asks), (self.BID, bids)):
+            side = self.sides[name]
+            current = dict(zip(side.get_prices().tolist(), side.get_sizes().tolist()))
+            target = {price: size for price, size in self.parse_levels(levels) if size}
+            side_changes = [
+                (price, size)
+                for price, size in target.items()
+                if current.get(price) != size
+            ]
+            side_changes += [(price, 0.0) for price in current if price not in target]
+            changes.append(side_changes)
+        return tuple(changes)
+
+    # Queries
+    def get_levels(self, side, depth=None):
+        """(price, size) levels of a side, best first."""
+        book_side = self.sides[side]
+        return list(
+            zip(
+                book_side.get_prices(depth).tolist(),
+                book_side.get_sizes(depth).tolist(),
+            )
+        )
+
+    def to_dict(self, depth=None):
+        return {
+            self.ASK: [list(level) for level in self.get_levels(self.ASK, depth)],
+            self.BID: [list(level) for level in self.get_levels(self.BID, depth)],
+        }
+
+    @property
+    def best_ask(self):
+        side = self.sides[self.ASK]
+        return float(side.keys[0]) if side.count else None
+
+    @property
+    def best_bid(self):
+        side = self.sides[self.BID]
+        return float(-side.keys[0]) if side.count else None
+
+    @property
+    def spread(self):
+        ask, bid = self.best_ask, self.best_bid
+        return None if ask is None or bid is None else ask - bid
+
+    @property
+    def mid(self):
+        ask, bid = self.best_ask, self.best_bid
+        return None if ask is None or bid is None else (ask + bid) / 2
+
+    def depth_at(self, price):
+        """Size resting at a price, on whichever side holds it."""
+        return self.sides[self.ASK].size_at(price) or self.sides[self.BID].size_at(
+            price
+        )
+
+    def depth_to(self, side, price):
+        """Total size of a side's levels at or better than a price."""
+        book_side = self.sides[side]
+        stop = np.searchsorted(
+            book_side.keys[: book_side.count], book_side.sign * price, side="right"
+        )
+        return float(book_side.sizes[:stop].sum())
+
+    def vwap(self, side, amount):
+        """
+        Average price of taking `amount` from a side ("asks" to buy, "bids"
+        to sell), or None if the side holds less than that.
+        """
+        book_side = self.sides[side]
+        sizes = book_side.get_sizes()
+        cumulative = np.cumsum(sizes)
+        if not len(cumulative) or cumulative[-1] < amount:
+            return None
+        last = int(np.searchsorted(cumulative, amount))
+        taken = sizes[: last + 1].copy()
+        taken[last] -= cumulative[last] - amount
+        prices = book_side.get_prices(last + 1)
+        return float(prices @ taken / amount)
+
+    def imbalance(self, depth=None):
+        """(bid size - ask size) / total size over the top depth levels, in [-1, 1]."""
+        bid_size = float(self.sides[self.BID].get_sizes(depth).sum())
+        ask_size = float(self.sides[self.ASK].get_sizes(depth).sum())
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total else 0.0
+
+
+class OrderBookCache:
+    """
+    Latest L2OrderBook per pair for the strategies.
+
+    update() builds a new book from a full order book response and swaps
+    it in, so a reader holding a book never sees it change halfway.
+    apply_diff() updates the live book in place under the cache lock.
+    """
+
+    def __init__(self):
+        self.books = {}
+        self.lock = threading.Lock()
+
+    def update(self, pair, data, timestamp=None):
+        book = L2OrderBook.from_response(data, pair, timestamp)
+        with self.lock:
+            self.books[pair] = book
+        return book
+
+    def apply_diff(self, pair, asks=(), bids=(), timestamp=None):
+        with self.lock:
+            book = self.books.get(pair)
+            if book is None:
+                book = self.books[pair] = L2OrderBook(pair=pair)
+            book.apply_diff(asks, bids)
+            book.timestamp = timestamp
+            return book
+
+    def get(self, pair):
+        return self.books.get(pair)
+
+    def get_copy(self, pair, depth=None):
+        """Copy of the book of a pair that later diffs do not touch, or None."""
+        with self.lock:
+            book = self.books.get(pair)
+            return None if book is None else book.copy(depth)
+
+    def clear(self, pair=None):
+        with self.lock:
+            if pair is None:
+                self.books.clear()
+            else:
+                self.books.pop(pair, None)
+
+
+order_book_cache = OrderBookCache()
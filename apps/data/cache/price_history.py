@@ -0,0 +1,72 @@
+import threading
+
+import numpy as np
+from cache.ring_buffer import RingBuffer
+
+DEFAULT_CAPACITY = 10000
+
+
+class PriceHistoryCache:
+    """
+    In-process cache of recent trade rates and timestamps per pair.
+
+    Ingestion appends new trades with add_trades(); strategies read NumPy
+    arrays with get_history() without touching the database or the ORM.
+    Listeners registered with add_listener(callback) are called with
+    (pair, rates, timestamps) for every batch added, under the cache lock.
+    """
+
+    RATE, TIMESTAMP = 0, 1
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.histories = {}
+        self.listeners = []
+        self.lock = threading.RLock()
+
+    def add_listener(self, callback):
+        with self.lock:
+            if callback not in self.listeners:
+                self.listeners.append(callback)
+
+    def get_buffer(self, pair):
+        buffer = self.histories.get(pair)
+        if buffer is None:
+            buffer = self.histories[pair] = RingBuffer(self.capacity, columns=2)
+        return buffer
+
+    def add_trades(self, pair, rates, timestamps):
+        """Append trades of a pair; rates and timestamps (epoch seconds) oldest first."""
+        rates = np.asarray(rates, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if not len(rates):
+            return
+        with self.lock:
+            self.get_buffer(pair).extend(np.column_stack((rates, timestamps)))
+            for callback in self.listeners:
+                callback(pair, rates, timestamps)
+
+    def has_pair(self, pair):
+        with self.lock:
+            return len(self.histories.get(pair, ())) > 0
+
+    def get_history(self, pair, n=None):
+        """Return (rates, timestamps) arrays of the last n trades, oldest first."""
+        with self.lock:
+            buffer = self.histories.get(pair)
+            rows = buffer.latest(n) if buffer is not None else np.empty((0, 2))
+        return rows[:, self.RATE], rows[:, self.TIMESTAMP]
+
+    def get_last_rate(self, pair):
+        with self.lock:
+            return float(self.histories[pair].last()[self.RATE])
+
+    def clear(self, pair=None):
+        with self.lock:
+            if pair is None:
+                self.histories.clear()
+            else:
+                self.histories.pop(pair, None)
+
+
+price_history_cache = PriceHistoryCache()
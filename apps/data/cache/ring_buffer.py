@@ -0,0 +1,42 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity 2D NumPy ring buffer.
+    Rows are appended at the end; once full, the oldest rows are overwritten.
+    """
+
+    def __init__(self, capacity, columns=1, dtype=np.float64):
+        self.capacity = capacity
+        self.columns = columns
+        self.data = np.zeros((capacity, columns), dtype=dtype)
+        self.end = 0  # Total number of rows ever appended
+
+    def __len__(self):
+        return min(self.end, self.capacity)
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=self.data.dtype).reshape(-1, self.columns)
+        rows = rows[-self.capacity :]
+        positions = (self.end + np.arange(len(rows))) % self.capacity
+        self.data[positions] = rows
+        self.end += len(rows)
+
+    def append(self, row):
+        self.extend([row])
+
+    def latest(self, n=None):
+        """Return a copy of the last n rows (all rows if n is None), oldest first."""
+        size = len(self) if n is None else min(n, len(self))
+        positions = (self.end - size + np.arange(size)) % self.capacity
+        return self.data[positions]
+
+    def last(self):
+        """Return the most recent row."""
+        if not len(self):
+            raise IndexError("last from empty RingBuffer")
+        return self.data[(self.end - 1) % self.capacity]
+
+    def clear(self):
+        self.end = 0
@@ -0,0 +1,126 @@
+import logging
+from datetime import datetime
+
+import numpy as np
+from batch_util import batch_writer
+from cache.bars import RESOLUTIONS, aggregate_bars, trades_to_bars
+from django.db import models
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from models.trade import Trade
+from util import UtxUtils
+
+logger = logging.getLogger(__name__)
+
+
+class Bar(models.Model):
+    """OHLCV bar of a pair at a resolution of cache.bars.RESOLUTIONS."""
+
+    BRIN_FIELDS = ("start",)
+    # Resolutions written by save_closed_bars; 1s bars stay in memory
+    PERSISTED_RESOLUTIONS = ("1m", "5m", "1h")
+
+    utx_id = models.BigAutoField(primary_key=True)
+    pair = models.CharField(max_length=10)
+    resolution = models.CharField(max_length=3)
+    start = models.DateTimeField()
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.FloatField()
+
+    class Meta:
+        app_label = "data"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pair", "resolution", "start"], name="data_bar_uniq"
+            )
+        ]
+
+    @classmethod
+    def from_rows(cls, pair, resolution, bars):
+        """Model instances of bar rows (start in epoch seconds, open, high, low, close, volume)."""
+        instances = [
+            cls(
+                pair=pair,
+                resolution=resolution,
+                start=datetime.fromtimestamp(start),
+                open=bar_open,
+                high=high,
+                low=low,
+                close=close,
+                volume=volume,
+            )
+            for start, bar_open, high, low, close, volume in np.asarray(bars).tolist()
+        ]
+        for instance, utx_id in zip(
+            instances, UtxUtils.generate_utx_ids(len(instances))
+        ):
+            instance.utx_id = utx_id
+        return instances
+
+    @classmethod
+    def save_closed_bars(cls, pair, resolution, bars):
+        """
+        BarAggregator listener queuing the closed bars on batch_writer:
+            bar_aggregator.add_listener(Bar.save_closed_bars)
+        """
+        if resolution in cls.PERSISTED_RESOLUTIONS:
+            for instance in cls.from_rows(pair, resolution, bars):
+                batch_writer.add(instance)
+
+    @classmethod
+    def create_bars(cls, pair, resolution, bars):
+        """Insert bar rows in one statement, skipping periods already stored."""
+        instances = cls.from_rows(pair, resolution, bars)
+        cls.objects.bulk_create(instances, batch_size=1000, ignore_conflicts=True)
+        logger.debug(f"Created {len(instances)} {resolution} {pair} bars")
+        return len(instances)
+
+    @classmethod
+    def get_bars(cls, pair, resolution, start_datetime=None, end_datetime=None):
+        """Stored bars of a period as an (n, 6) array like BarAggregator.get_bars."""
+        queryset = cls.objects.filter(pair=pair, resolution=resolution)
+        if start_datetime is not None:
+            queryset = queryset.filter(start__gte=start_datetime)
+        if end_datetime is not None:
+            queryset = queryset.filter(start__lt=end_datetime)
+        rows = queryset.order_by("start").values_list(
+            "start", "open", "high", "low", "close", "volume"
+        )
+        return np.array(
+            [(start.timestamp(), *values) for start, *values in rows],
+            dtype=np.float64,
+        ).reshape(-1, 6)
+
+    @classmethod
+    def create_from_trades(cls, pair, start_datetime, end_datetime, resolution="1m"):
+        """Aggregate the stored trades of a period into bars, e.g. to backfill history."""
+        rows = list(
+            Trade.objects.filter(
+                pair=pair, created_at__range=(start_datetime, end_datetime)
+            )
+            .order_by("created_at")
+            .values_list(
+                Cast("rate", FloatField()),
+                Cast("amount", FloatField()),
+                "created_at",
+            )
+        )
+        bars = trades_to_bars(
+            [rate for rate, _, _ in rows],
+            [amount for _, amount, _ in rows],
+            [created_at.timestamp() for _, _, created_at in rows],
+        )
+        return cls.create_bars(
+            pair, resolution, aggregate_bars(bars, RESOLUTIONS[resolution])
+        )
+
+    @classmethod
+    def roll_up(cls, pair, resolution, to_resolution, start_datetime, end_datetime):
+        """Build and store coarser bars of a period from stored finer ones."""
+        bars = cls.get_bars(pair, resolution, start_datetime, end_datetime)
+        return cls.create_bars(
+            pair, to_resolution, aggregate_bars(bars, RESOLUTIONS[to_resolution])
+        )
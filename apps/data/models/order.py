@@ -1,5 +1,6 @@
 import logging
 
+from batch_util import batch_writer
 from django.db import models
 from util import UtxUtils
 
@@ -18,9 +19,13 @@ class Order(models.Model):
     pair = models.CharField(max_length=10, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
-        try:
+    def save(self, *args, buffered=False, **kwargs):
+        if not self.utx_id:
             self.utx_id = UtxUtils().generate_utx_id()
+        if buffered:
+            batch_writer.add(self)
+            return
+        try:
             super().save(*args, **kwargs)
         except Exception as e:
             logger.error(f"Error saving Order instance: {e}")
@@ -35,3 +40,4 @@ class Order(models.Model):
 
     class Meta:
         app_label = "data"
+        indexes = [models.Index(fields=["pair", "created_at"])]
@@ -1,5 +1,7 @@
 import logging
+from itertools import zip_longest
 
+from batch_util import batch_writer
 from django.db import models
 from django.utils import timezone
 from util import UtxUtils
@@ -24,18 +26,24 @@ class OrderBook(models.Model):
 
     @classmethod
     def create_order_book(cls, data):
+        """
+        Store the levels of an order book response, one row per level pair,
+        in a single statement. The deeper side keeps its extra levels.
+        """
         ask_data = data.get("asks", [])
         bid_data = data.get("bids", [])
-        entries = []
-
-        for ask, bid in zip(ask_data, bid_data):
-            entry = cls.objects.create(
-                ask_price=ask[0],
-                ask_quantity=ask[1],
-                bid_price=bid[0],
-                bid_quantity=bid[1],
+        entries = [
+            cls(
+                ask_price=ask[0] if ask else None,
+                ask_quantity=ask[1] if ask else None,
+                bid_price=bid[0] if bid else None,
+                bid_quantity=bid[1] if bid else None,
             )
-            entries.append(entry)
+            for ask, bid in zip_longest(ask_data, bid_data)
+        ]
+        for entry, utx_id in zip(entries, UtxUtils.generate_utx_ids(len(entries))):
+            entry.utx_id = utx_id
+        cls.objects.bulk_create(entries)
 
         return {
             "asks": [
@@ -52,7 +60,7 @@ class OrderBook(models.Model):
 
     @classmethod
     def get_order_book(cls):
-        entries = cls.objects.all()
+        entries = cls.objects.order_by("utx_id")
         return {
             "asks": [
                 (entry.ask_price, entry.ask_quantity)
@@ -66,9 +74,13 @@ class OrderBook(models.Model):
             ],
         }
 
-    def save(self, *args, **kwargs):
-        try:
+    def save(self, *args, buffered=False, **kwargs):
+        if not self.utx_id:
             self.utx_id = UtxUtils().generate_utx_id()
+        if buffered:
+            batch_writer.add(self)
+            return
+        try:
             super().save(*args, **kwargs)
         except Exception as e:
             logger.error(f"Error saving Order instance: {e}")
@@ -0,0 +1,241 @@
+import logging
+import threading
+
+from cache.order_book import L2OrderBook
+from django.db import models, transaction
+from django.utils import timezone
+from util import UtxUtils
+
+logger = logging.getLogger(__name__)
+
+
+class OrderBookSnapshot(models.Model):
+    """Full order book of a pair at a point in time, levels as [[price, size], ...]."""
+
+    BRIN_FIELDS = ("timestamp",)
+
+    utx_id = models.BigAutoField(primary_key=True)
+    pair = models.CharField(max_length=10)
+    timestamp = models.DateTimeField()
+    asks = models.JSONField()
+    bids = models.JSONField()
+
+    class Meta:
+        app_label = "data"
+        indexes = [models.Index(fields=["pair", "timestamp"])]
+
+
+class OrderBookDiff(models.Model):
+    """Levels of a pair's order book changed since the previous record; size 0 removes a level."""
+
+    BRIN_FIELDS = ("timestamp",)
+
+    utx_id = models.BigAutoField(primary_key=True)
+    pair = models.CharField(max_length=10)
+    timestamp = models.DateTimeField()
+    asks = models.JSONField()
+    bids = models.JSONField()
+
+    class Meta:
+        app_label = "data"
+        indexes = [models.Index(fields=["pair", "timestamp"])]
+
+
+class OrderBookStore:
+    """
+    Records order books per pair as periodic snapshots plus diffs.
+
+    record() keeps an L2OrderBook per pair up to date and stores only the
+    changed levels, with a full snapshot every `snapshot_interval` records
+    (and on the first record of a pair). Rows are buffered and written with
+    one bulk insert per table once `flush_size` records are pending; when
+    that fails, the rows are written one at a time and those that still
+    fail are logged and dropped.
+
+    utx_ids are generated in record order, so snapshots and diffs are
+    replayed by utx_id; book_as_of() loads the last snapshot before a time
+    and applies the diffs after it.
+    """
+
+    def __init__(self, snapshot_interval=100, flush_size=50):
+        self.snapshot_interval = snapshot_interval
+        self.flush_size = flush_size
+        self.books = {}
+        self.diffs_since_snapshot = {}
+        self.pending = []
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def record(self, pair, data, timestamp=None):
+        """
+        Record an order book response ({"asks": [...], "bids": [...]}).
+
+        Returns:
+            :The live order book of the pair
+        """
+        timestamp = timestamp or timezone.now()
+        asks = L2OrderBook.parse_levels(data.get("asks", []))
+        bids = L2OrderBook.parse_levels(data.get("bids", []))
+        with self.lock:
+            book = self.books.get(pair)
+            if (
+                book is None
+                or self.diffs_since_snapshot[pair] >= self.snapshot_interval
+            ):
+                book = self.books[pair] = L2OrderBook(asks, bids, pair, timestamp)
+                self.diffs_since_snapshot[pair] = 0
+                row = OrderBookSnapshot(
+                    pair=pair, timestamp=timestamp, **book.to_dict()
+                )
+            else:
+                ask_changes, bid_changes = book.diff(asks, bids)
+                if not ask_changes and not bid_changes:
+                    return book
+                book.apply_diff(ask_changes, bid_changes)
+                self.diffs_since_snapshot[pair] += 1
+                row = OrderBookDiff(
+                    pair=pair,
+                    timestamp=timestamp,
+                    asks=[list(level) for level in ask_changes],
+                    bids=[list(level) for level in bid_changes],
+                )
+            self.append(row)
+        return book
+
+    def record_diff(self, pair, asks=(), bids=(), timestamp=None):
+        """
+        Record changed levels (size 0 removes a level), as received from a
+        streaming order book channel. Diffs are ignored until record() gave
+        the pair a snapshot to apply them to.
+
+        Returns:
+            :The live order book of the pair, or None
+        """
+        timestamp = timestamp or timezone.now()
+        asks = L2OrderBook.parse_levels(asks)
+        bids = L2OrderBook.parse_levels(bids)
+        with self.lock:
+            book = self.books.get(pair)
+            if book is None:
+                return None
+            book.apply_diff(asks, bids)
+            book.timestamp = timestamp
+            self.diffs_since_snapshot[pair] += 1
+            if self.diffs_since_snapshot[pair] >= self.snapshot_interval:
+                # The snapshot already includes this diff
+                self.diffs_since_snapshot[pair] = 0
+                row = OrderBookSnapshot(
+                    pair=pair, timestamp=timestamp, **book.to_dict()
+                )
+            else:
+                row = OrderBookDiff(
+                    pair=pair,
+                    timestamp=timestamp,
+                    asks=[list(level) for level in asks],
+                    bids=[list(level) for level in bids],
+                )
+            self.append(row)
+        return book
+
+    def append(self, row):
+        row.utx_id = UtxUtils.generate_utx_id()
+        self.pending.append(row)
+        if len(self.pending) >= self.flush_size:
+            self.flush_pending()
+
+    def flush(self):
+        with self.lock:
+            self.flush_pending()
+
+    def flush_pending(self):
+        if not self.pending:
+            return
+        snapshots = [row for row in self.pending if isinstance(row, OrderBookSnapshot)]
+        diffs = [row for row in self.pending if isinstance(row, OrderBookDiff)]
+        rows, self.pending = self.pending, []
+        try:
+            with transaction.atomic():
+                OrderBookSnapshot.objects.bulk_create(snapshots)
+                OrderBookDiff.objects.bulk_create(diffs)
+        except Exception as e:
+            logger.error(f"Error bulk saving {len(rows)} order book rows: {e}")
+            self.write_each(rows)
+            return
+        logger.debug(f"Saved {len(snapshots)} snapshots and {len(diffs)} diffs")
+
+    def write_each(self, rows):
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    row.save(force_insert=True)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error saving {type(row).__name__} instance: {e}")
+
+    def get_live_book(self, pair):
+        with self.lock:
+            return self.books.get(pair)
+
+    @staticmethod
+    def get_records(pair, after_utx_id=0, start_datetime=None, end_datetime=None):
+        """
+        Snapshots and diffs of a pair in record order, as
+        (timestamp, is_snapshot, asks, bids) tuples.
+        """
+        records = []
+        for model in (OrderBookSnapshot, OrderBookDiff):
+            queryset = model.objects.filter(pair=pair, utx_id__gt=after_utx_id)
+            if start_datetime is not None:
+                queryset = queryset.filter(timestamp__gt=start_datetime)
+            if end_datetime is not None:
+                queryset = queryset.filter(timestamp__lte=end_datetime)
+            is_snapshot = model is OrderBookSnapshot
+            records += [
+                (utx_id, timestamp, is_snapshot, asks, bids)
+                for utx_id, timestamp, asks, bids in queryset.values_list(
+                    "utx_id", "timestamp", "asks", "bids"
+                )
+            ]
+        records.sort(key=lambda record: record[0])
+        return [record[1:] for record in records]
+
+    @classmethod
+    def book_as_of(cls, pair, timestamp):
+        """Rebuild the order book of a pair as of a time, or None if nothing was recorded."""
+        snapshot = (
+            OrderBookSnapshot.objects.filter(pair=pair, timestamp__lte=timestamp)
+            .order_by("-utx_id")
+            .first()
+        )
+        if snapshot is None:
+            return None
+        book = L2OrderBook(snapshot.asks, snapshot.bids)
+        for _, _, asks, bids in cls.get_records(
+            pair, snapshot.utx_id, end_datetime=timestamp
+        ):
+            book.apply_diff(asks, bids)
+        return book
+
+    @classmethod
+    def replay(cls, pair, start_datetime, end_datetime):
+        """
+        Yield (timestamp, book) for the book as of start_datetime and after
+        every later record of a pair until end_datetime. The same
+        L2OrderBook is updated and yielded every time.
+        """
+        book = cls.book_as_of(pair, start_datetime)
+        if book is not None:
+            yield start_datetime, book
+        for timestamp, is_snapshot, asks, bids in cls.get_records(
+            pair, start_datetime=start_datetime, end_datetime=end_datetime
+        ):
+            if is_snapshot:
+                if book is None:
+                    book = L2OrderBook()
+                book.apply_snapshot(asks, bids)
+            elif book is None:
+                # Diffs without a snapshot before them cannot be applied
+                continue
+            else:
+                book.apply_diff(asks, bids)
+            yield timestamp, book
@@ -0,0 +1,50 @@
+import logging
+from datetime import datetime
+
+from batch_util import batch_writer
+from django.db import models
+from util import UtxUtils
+
+logger = logging.getLogger(__name__)
+
+
+class PaperFill(models.Model):
+    """Fill of a paper-trading order, written behind by batch_writer."""
+
+    BRIN_FIELDS = ("created_at",)
+
+    utx_id = models.BigAutoField(primary_key=True)
+    account = models.CharField(max_length=50)
+    order_id = models.BigIntegerField()
+    pair = models.CharField(max_length=10)
+    side = models.CharField(max_length=4)
+    rate = models.FloatField()
+    amount = models.FloatField()
+    fee = models.FloatField()
+    liquidity = models.CharField(max_length=1)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        app_label = "data"
+        indexes = [models.Index(fields=["account", "pair", "created_at"])]
+
+    @classmethod
+    def save_fills(cls, fills):
+        """Queue paper_trading.Fill records on batch_writer."""
+        utx_ids = UtxUtils.generate_utx_ids(len(fills))
+        for fill, utx_id in zip(fills, utx_ids):
+            batch_writer.add(
+                cls(
+                    utx_id=utx_id,
+                    account=fill.account,
+                    order_id=fill.order_id,
+                    pair=fill.pair,
+                    side=fill.side,
+                    rate=fill.rate,
+                    amount=fill.amount,
+                    fee=fill.fee,
+                    liquidity=fill.liquidity,
+                    created_at=datetime.fromtimestamp(fill.timestamp),
+                )
+            )
+        logger.debug(f"Queued {len(fills)} paper fills")
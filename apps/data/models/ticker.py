@@ -1,13 +1,21 @@
+import io
 import logging
 from datetime import datetime
 
-from django.db import models
+import pandas as pd
+from batch_util import batch_writer
+from django.conf import settings
+from django.db import connection, models
 from util import UtxUtils
 
 logger = logging.getLogger(__name__)
 
 
 class Ticker(models.Model):
+    DATA_FIELDS = ("last", "bid", "ask", "high", "low", "volume", "timestamp")
+    BRIN_FIELDS = ("timestamp",)
+    PARTITION_FIELD = "timestamp"
+
     utx_id = models.CharField(primary_key=True, max_length=255)
     last = models.FloatField()
     bid = models.FloatField()
@@ -18,7 +26,7 @@ class Ticker(models.Model):
     timestamp = models.DateTimeField()
 
     @classmethod
-    def create_ticker_data(cls, data, is_simulation=False):
+    def create_ticker_data(cls, data, is_simulation=False, buffered=False):
         data.pop("id", None)
         if "timestamp" in data:
             data["timestamp"] = datetime.fromtimestamp(data["timestamp"])
@@ -32,11 +40,59 @@ class Ticker(models.Model):
             volume=data.get("volume"),
             timestamp=data.get("timestamp"),  # Already converted to datetime if present
         )
-        ticker.save(is_simulation=is_simulation)
+        ticker.save(is_simulation=is_simulation, buffered=buffered)
 
         logger.debug(f"Created Ticker with data: {data}")
         return ticker
 
+    @classmethod
+    def bulk_create_ticker_data(cls, chunk, is_simulation=False):
+        """
+        Persist a chunk of tickers in one statement.
+
+        Parameters:
+            :chunk Mapping of field name to equal-length arrays (last, bid, ask,
+                high, low, volume and timestamp in epoch seconds).
+            :is_simulation Prefix the ids with SIM_.
+        Returns:
+            :Number of rows written
+        """
+        frame = pd.DataFrame({field: chunk[field] for field in cls.DATA_FIELDS})
+        # Naive local time, as datetime.fromtimestamp gives in create_ticker_data
+        frame["timestamp"] = (
+            pd.to_datetime(frame["timestamp"], unit="s", utc=True)
+            .dt.tz_convert(settings.TIME_ZONE)
+            .dt.tz_localize(None)
+        )
+        prefix = "SIM_" if is_simulation else ""
+        frame.insert(
+            0,
+            "utx_id",
+            [f"{prefix}{utx_id}" for utx_id in UtxUtils.generate_utx_ids(len(frame))],
+        )
+
+        if connection.vendor == "postgresql":
+            cls.copy_frame(frame)
+        else:
+            cls.objects.bulk_create(
+                [cls(**row) for row in frame.to_dict("records")], batch_size=1000
+            )
+        logger.debug(f"Bulk created {len(frame)} Ticker rows")
+        return len(frame)
+
+    @classmethod
+    def copy_frame(cls, frame):
+        """Stream a DataFrame into the ticker table with PostgreSQL COPY."""
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        columns = ", ".join(frame.columns)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {cls._meta.db_table} ({columns}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
     @classmethod
     def read_all_ticker_data(cls):
         return cls.objects.all()
@@ -52,12 +108,15 @@ class Ticker(models.Model):
             setattr(self, field, value)
         self.save()
 
-    def save(self, *args, is_simulation=False, **kwargs):
+    def save(self, *args, is_simulation=False, buffered=False, **kwargs):
         if not self.utx_id:
             if is_simulation:
                 self.utx_id = f"SIM_{UtxUtils().generate_utx_id()}"
             else:
                 self.utx_id = UtxUtils().generate_utx_id()
+        if buffered:
+            batch_writer.add(self)
+            return
 
         try:
             super().save(*args, **kwargs)
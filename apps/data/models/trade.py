@@ -1,33 +1,237 @@
 import logging
+from datetime import datetime
 
+import numpy as np
+from batch_util import batch_writer
+from cache.bars import bar_aggregator
+from cache.price_history import price_history_cache
+from django.conf import settings
 from django.db import models
+from django.db.models import F, FloatField, Max, Min, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from util import UtxUtils
 
 logger = logging.getLogger(__name__)
 
 
 class Trade(models.Model):
+    BRIN_FIELDS = ("created_at",)
+    PARTITION_FIELD = "created_at"
+
     utx_id = models.BigAutoField(primary_key=True)
-    id = models.FloatField()
-    amount = models.CharField(max_length=20)
-    rate = models.CharField(max_length=20)
+    id = models.BigIntegerField()
+    amount = models.DecimalField(max_digits=20, decimal_places=8)
+    rate = models.DecimalField(max_digits=20, decimal_places=8)
     pair = models.CharField(max_length=10)
     order_type = models.CharField(max_length=10)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Time of the trade at the exchange. It is part of the (pair, id,
+    # created_at) key of partitioned tables, so it must not depend on when
+    # the trade is stored.
+    created_at = models.DateTimeField(default=timezone.now)
+    # Callbacks of the newly inserted trades, see add_listener
+    listeners = []
+
+    @classmethod
+    def add_listener(cls, callback):
+        """
+        Call callback(pair, rates, amounts, timestamps) with the trades of
+        every create_trades_data that were inserted, oldest first.
+        """
+        if callback not in cls.listeners:
+            cls.listeners.append(callback)
 
     @classmethod
     def create_trade_data(cls, data):
         return cls.objects.create(**data)
 
-    @staticmethod
-    def create_trades_data(public_trades):
+    @classmethod
+    def create_trades_data(cls, public_trades):
+        """
+        Insert the trades of one public trades response in a single statement.
+        Trades whose (pair, id) is already stored, or repeated within the
+        response, are skipped, including those another writer (stream,
+        backfill or batch processing) inserts between the lookup and the
+        insert. Only the trades actually inserted are counted and fed to
+        the price history.
+
+        Returns:
+            :inserted Number of rows inserted
+            :skipped Number of duplicate trades skipped
+        """
         trades_data = public_trades.get("data", [])
+        unique_trades = {}
         for trade_data in trades_data:
-            Trade.create_trade_data(trade_data)
+            key = (trade_data.get("pair"), trade_data.get("id"))
+            unique_trades.setdefault(key, trade_data)
+
+        existing_keys = cls.get_stored_keys(unique_trades)
+        new_trades_data = [
+            data for key, data in unique_trades.items() if key not in existing_keys
+        ]
+        now = timezone.now()
+        new_trades = [
+            cls(**{**data, "created_at": cls.get_created_at(data, now)})
+            for data in new_trades_data
+        ]
+        utx_ids = UtxUtils.generate_utx_ids(len(new_trades))
+        for trade, utx_id in zip(new_trades, utx_ids):
+            trade.utx_id = utx_id
 
-    def save(self, *args, **kwargs):
         try:
+            # Trades inserted concurrently since the lookup hit the unique constraint
+            cls.objects.bulk_create(new_trades, ignore_conflicts=True)
+        except Exception as e:
+            logger.error(f"Error bulk saving {len(new_trades)} Trade instances: {e}")
+            raise
+
+        if new_trades:
+            # Rows dropped as conflicts do not exist under their utx_id
+            inserted_ids = set(
+                cls.objects.filter(utx_id__in=utx_ids).values_list("utx_id", flat=True)
+            )
+            new_trades_data = [
+                data
+                for data, utx_id in zip(new_trades_data, utx_ids)
+                if utx_id in inserted_ids
+            ]
+        cls.add_to_price_history(new_trades_data)
+        result = {
+            "inserted": len(new_trades_data),
+            "skipped": len(trades_data) - len(new_trades_data),
+        }
+        logger.debug(f"Created trades data: {result}")
+        return result
+
+    @classmethod
+    def get_stored_keys(cls, keys):
+        """The (pair, id) keys among `keys` already in the table."""
+        # Exchange ids are only unique within a pair
+        return set(
+            cls.objects.filter(
+                pair__in={pair for pair, _ in keys},
+                id__in={trade_id for _, trade_id in keys},
+            ).values_list("pair", "id")
+        )
+
+    @staticmethod
+    def get_created_at(data, default):
+        """
+        Exchange time of a trade payload, or default when it has none.
+        Without USE_TZ it is converted to naive time in settings.TIME_ZONE,
+        like the other stored datetimes.
+        """
+        created_at = data.get("created_at")
+        if not isinstance(created_at, datetime):
+            created_at = parse_datetime(str(created_at or ""))
+        if created_at is None:
+            return default
+        if not settings.USE_TZ and timezone.is_aware(created_at):
+            # In the default time zone, settings.TIME_ZONE
+            created_at = timezone.make_naive(created_at)
+        return created_at
+
+    @classmethod
+    def add_to_price_history(cls, trades_data):
+        """
+        Feed newly inserted trades to the in-process price history, the bar
+        aggregator and the listeners, oldest first.
+        """
+        now = timezone.now()
+        by_pair = {}
+        for data in sorted(trades_data, key=lambda data: data["id"]):
+            timestamp = cls.get_created_at(data, now).timestamp()
+            rates, amounts, timestamps = by_pair.setdefault(data["pair"], ([], [], []))
+            rates.append(float(data["rate"]))
+            amounts.append(float(data.get("amount", 0)))
+            timestamps.append(timestamp)
+        for pair, (rates, amounts, timestamps) in by_pair.items():
+            price_history_cache.add_trades(pair, rates, timestamps)
+            bar_aggregator.add_trades(pair, rates, amounts, timestamps)
+            for callback in cls.listeners:
+                callback(pair, rates, amounts, timestamps)
+
+    @classmethod
+    def get_recent_rates(cls, pair, limit):
+        """
+        Return (rates, timestamps) NumPy arrays of the last `limit` trades of a
+        pair, oldest first, without instantiating model objects.
+        """
+        rows = list(
+            cls.objects.filter(pair=pair)
+            .order_by("-created_at")
+            .values_list(Cast("rate", FloatField()), "created_at")[:limit]
+        )
+        rows.reverse()
+        return cls.rows_to_arrays(rows)
+
+    @classmethod
+    def get_rates_between(cls, start_datetime, end_datetime, pair=None):
+        """Return (rates, timestamps) NumPy arrays of a time range, oldest first."""
+        queryset = cls.objects.filter(created_at__range=(start_datetime, end_datetime))
+        if pair is not None:
+            queryset = queryset.filter(pair=pair)
+        rows = queryset.order_by("created_at").values_list(
+            Cast("rate", FloatField()), "created_at"
+        )
+        return cls.rows_to_arrays(rows)
+
+    @classmethod
+    def filter_period(cls, pair, start_datetime=None, end_datetime=None):
+        queryset = cls.objects.filter(pair=pair)
+        if start_datetime is not None:
+            queryset = queryset.filter(created_at__gte=start_datetime)
+        if end_datetime is not None:
+            queryset = queryset.filter(created_at__lt=end_datetime)
+        return queryset
+
+    @classmethod
+    def get_vwap(cls, pair, start_datetime=None, end_datetime=None):
+        """Volume-weighted average rate of a period computed in SQL, or None without trades."""
+        totals = cls.filter_period(pair, start_datetime, end_datetime).aggregate(
+            notional=Sum(F("rate") * F("amount")), volume=Sum("amount")
+        )
+        if not totals["volume"]:
+            return None
+        return totals["notional"] / totals["volume"]
+
+    @classmethod
+    def get_ohlcv(cls, pair, start_datetime=None, end_datetime=None):
+        """
+        Open, high, low, close and volume of a period computed in SQL, as
+        Decimals, or None without trades.
+        """
+        queryset = cls.filter_period(pair, start_datetime, end_datetime)
+        totals = queryset.aggregate(
+            high=Max("rate"), low=Min("rate"), volume=Sum("amount")
+        )
+        if totals["volume"] is None:
+            return None
+        ordered = queryset.order_by("created_at", "id").values_list("rate", flat=True)
+        return {
+            "open": ordered.first(),
+            "high": totals["high"],
+            "low": totals["low"],
+            "close": ordered.last(),
+            "volume": totals["volume"],
+        }
+
+    @staticmethod
+    def rows_to_arrays(rows):
+        rates = np.array([rate for rate, _ in rows], dtype=np.float64)
+        timestamps = np.array(
+            [created_at.timestamp() for _, created_at in rows], dtype=np.float64
+        )
+        return rates, timestamps
+
+    def save(self, *args, buffered=False, **kwargs):
+        if not self.utx_id:
             self.utx_id = UtxUtils().generate_utx_id()
+        if buffered:
+            batch_writer.add(self)
+            return
+        try:
             super().save(*args, **kwargs)
         except Exception as e:
             logger.error(f"Error saving Trade instance: {e}")
@@ -42,3 +246,9 @@ class Trade(models.Model):
 
     class Meta:
         app_label = "data"
+        indexes = [models.Index(fields=["pair", "created_at"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pair", "id"], name="data_trade_pair_id_uniq"
+            )
+        ]
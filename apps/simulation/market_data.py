@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+def to_api_time(timestamp):
+    """Format epoch seconds like the exchange API, e.g. 2015-01-10T05:55:38.000Z."""
+    moment = datetime.fromtimestamp(float(timestamp), tz=timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def generate_trades(
+    prices,
+    timestamps,
+    rng,
+    pair="btc_jpy",
+    trades_per_step=5.0,
+    mean_amount=0.05,
+    spread=0.0005,
+    first_id=1,
+):
+    """
+    Generate a synthetic trade stream around a simulated price path.
+
+    The number of trades per step is Poisson distributed, buys trade half a
+    spread above the price and sells half a spread below it, and amounts are
+    exponentially distributed. Trades are ordered by timestamp.
+
+    Returns:
+        dict: Arrays of id, rate, amount, order_type, timestamp and step (the
+        index of the price the trade belongs to), and the pair.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    step_seconds = np.diff(timestamps).mean() if len(timestamps) > 1 else 1.0
+
+    counts = rng.poisson(trades_per_step, size=len(prices))
+    steps = np.repeat(np.arange(len(prices)), counts)
+    offsets = rng.random(len(steps))
+    order = np.lexsort((offsets, steps))
+    steps, offsets = steps[order], offsets[order]
+
+    is_buy = rng.random(len(steps)) < 0.5
+    return {
+        "id": first_id + np.arange(len(steps), dtype=np.int64),
+        "rate": prices[steps] * (1 + np.where(is_buy, spread, -spread) / 2),
+        "amount": rng.exponential(mean_amount, size=len(steps)),
+        "order_type": np.where(is_buy, "buy", "sell"),
+        "timestamp": timestamps[steps] + offsets * step_seconds,
+        "step": steps,
+        "pair": pair,
+    }
+
+
+def generate_order_books(
+    mid_prices, rng, depth=20, tick_size=1.0, spread=0.0005, mean_size=0.1
+):
+    """
+    Generate one synthetic L2 order book per mid price.
+
+    Best levels sit half a spread around the mid price, rounded to the tick
+    size; deeper levels are 1 to 3 ticks apart and hold larger sizes.
+
+    Returns:
+        tuple: asks and bids arrays of shape (len(mid_prices), depth, 2) holding
+        (price, size), best level first.
+    """
+    mid_prices = np.asarray(mid_prices, dtype=np.float64)
+    count = len(mid_prices)
+    half_spread = mid_prices * spread / 2
+    best_ask = np.ceil((mid_prices + half_spread) / tick_size) * tick_size
+    best_bid = np.floor((mid_prices - half_spread) / tick_size) * tick_size
+    best_bid = np.minimum(best_bid, best_ask - tick_size)
+
+    depth_factor = 1 + np.arange(depth) / depth
+    books = []
+    for best, side in ((best_ask, 1), (best_bid, -1)):
+        gaps = rng.integers(1, 4, size=(count, depth)) * tick_size
+        gaps[:, 0] = 0
+        prices = best[:, None] + side * np.cumsum(gaps, axis=1)
+        sizes = rng.exponential(mean_size, size=(count, depth)) * depth_factor
+        books.append(np.stack((prices, sizes), axis=2))
+    asks, bids = books
+    return asks, bids
+
+
+def trades_to_api_format(trades, start=0, stop=None):
+    """Convert generated trades to the public trades response of the exchange API."""
+    data = [
+        {
+            "id": int(trades["id"][i]),
+            "amount": f"{trades['amount'][i]:.8f}",
+            "rate": f"{trades['rate'][i]:.1f}",
+            "pair": trades["pair"],
+            "order_type": str(trades["order_type"][i]),
+            "created_at": to_api_time(trades["timestamp"][i]),
+        }
+        for i in range(start, len(trades["id"]) if stop is None else stop)
+    ]
+    return {"success": True, "data": data}
+
+
+def order_book_to_api_format(asks, bids):
+    """Convert one generated order book to the order book response of the exchange API."""
+    return {
+        "asks": [[f"{price:.1f}", f"{size:.8f}"] for price, size in asks],
+        "bids": [[f"{price:.1f}", f"{size:.8f}"] for price, size in bids],
+    }
@@ -0,0 +1,819 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+from aiohttp import WSMsgType, web
+from cache.order_book import L2OrderBook
+from logger_util import UtxLogger as log
+from models.trade import Trade
+
+from apps.simulation.market_data import (
+    generate_order_books,
+    generate_trades,
+    order_book_to_api_format,
+    to_api_time,
+    trades_to_api_format,
+)
+from apps.simulation.processes import GeometricBrownianMotion
+
+TRADES_PER_RESPONSE = 50
+
+
+class MarketReplay:
+    """
+    Replays the prices, trades and order books of one pair step by step.
+
+    Trades and order books are generated around the prices up front, and
+    every public response is encoded once per step, so serving a request
+    is a dictionary lookup.
+
+    Parameters:
+        :pair Pair (e.g., "btc_jpy").
+        :prices Price of every step.
+        :timestamps Epoch seconds of every step.
+        :seed Seed or np.random.Generator of the trades and order books.
+        :loop Start again from the first step after the last one. Trade ids
+            and timestamps repeat on every lap.
+    """
+
+    def __init__(
+        self,
+        pair,
+        prices,
+        timestamps,
+        seed=None,
+        depth=20,
+        trades_per_step=5.0,
+        window=1440,
+        loop=True,
+    ):
+        self.pair = pair
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(self.prices) == 0:
+            raise ValueError(f"No prices to replay for {pair}.")
+        rng = np.random.default_rng(seed)
+        self.trades = generate_trades(
+            self.prices,
+            self.timestamps,
+            rng,
+            pair=pair,
+            trades_per_step=trades_per_step,
+        )
+        self.asks, self.bids = generate_order_books(self.prices, rng, depth=depth)
+        # trades[:trade_stops[i]] happened at or before step i
+        self.trade_stops = np.searchsorted(
+            self.trades["step"], np.arange(len(self.prices)), side="right"
+        )
+        self.cumulative_volume = np.concatenate(
+            ([0.0], np.cumsum(self.trades["amount"]))
+        )
+        self.window = window
+        self.loop = loop
+        self.step = 0
+        self.responses = {}
+
+    @classmethod
+    def simulate(
+        cls,
+        pair,
+        steps,
+        start_price=5_000_000,
+        process=None,
+        seed=None,
+        step_seconds=60,
+        start_time=None,
+        **kwargs,
+    ):
+        """Replay a simulated price path, see processes.py."""
+        process = process or GeometricBrownianMotion(0.0, 0.001)
+        rng = np.random.default_rng(seed)
+        prices, _ = process.simulate(start_price, steps, rng)
+        start = int(time.time() if start_time is None else start_time)
+        timestamps = start + step_seconds * np.arange(steps)
+        return cls(pair, prices[0], timestamps, seed=rng, **kwargs)
+
+    @classmethod
+    def from_trades(cls, pair, rates, timestamps, step_seconds=60, **kwargs):
+        """Replay recorded trades, resampled to the last rate of every step."""
+        rates = np.asarray(rates, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(rates) == 0:
+            raise ValueError(f"No recorded trades to replay for {pair}.")
+        bins = ((timestamps - timestamps[0]) // step_seconds).astype(np.int64)
+        last_of_bin = np.flatnonzero(np.diff(bins, append=bins[-1] + 1))
+        step_timestamps = timestamps[0] + bins[last_of_bin] * step_seconds
+        return cls(pair, rates[last_of_bin], step_timestamps, **kwargs)
+
+    @classmethod
+    def from_db(cls, pair, start_datetime, end_datetime, **kwargs):
+        """Replay the trades stored for a time range."""
+        rates, timestamps = Trade.get_rates_between(start_datetime, end_datetime, pair)
+        return cls.from_trades(pair, rates, timestamps, **kwargs)
+
+    def advance(self):
+        if self.step + 1 < len(self.prices):
+            self.step += 1
+        elif self.loop:
+            self.step = 0
+        self.responses.clear()
+
+    @property
+    def timestamp(self):
+        return self.timestamps[self.step]
+
+    @property
+    def book(self):
+        """Asks and bids of the current step, arrays of (price, size)."""
+        return self.asks[self.step], self.bids[self.step]
+
+    def get_ticker(self):
+        step = self.step
+        first = max(0, step - self.window + 1)
+        trade_stop = self.trade_stops[step]
+        trade_start = self.trade_stops[first - 1] if first else 0
+        volume = (
+            self.cumulative_volume[trade_stop] - self.cumulative_volume[trade_start]
+        )
+        return {
+            "last": round(float(self.prices[step]), 1),
+            "bid": float(self.bids[step, 0, 0]),
+            "ask": float(self.asks[step, 0, 0]),
+            "high": round(float(self.prices[first : step + 1].max()), 1),
+            "low": round(float(self.prices[first : step + 1].min()), 1),
+            "volume": f"{volume:.8f}",
+            "timestamp": int(self.timestamp),
+        }
+
+    def get_public_trades(self):
+        stop = int(self.trade_stops[self.step])
+        response = trades_to_api_format(
+            self.trades, max(0, stop - TRADES_PER_RESPONSE), stop
+        )
+        # Newest first, like the exchange
+        response["data"].reverse()
+        return response
+
+    def get_order_books(self):
+        return order_book_to_api_format(*self.book)
+
+    def get_stream_messages(self, previous_step):
+        """
+        Encoded trades and orderbook channel messages of the changes from
+        previous_step to the current step, None when nothing changed.
+        """
+        step = self.step
+        if step == previous_step:
+            return None, None
+        trade_ids = range(
+            self.trade_stops[previous_step] if step > previous_step else 0,
+            self.trade_stops[step],
+        )
+        trades = [
+            [
+                str(int(self.trades["timestamp"][i])),
+                str(self.trades["id"][i]),
+                self.pair,
+                f"{self.trades['rate'][i]:.1f}",
+                f"{self.trades['amount'][i]:.8f}",
+                str(self.trades["order_type"][i]),
+                "0",
+                "0",
+            ]
+            for i in trade_ids
+        ]
+        previous_book = L2OrderBook(self.asks[previous_step], self.bids[previous_step])
+        asks, bids = previous_book.diff(self.asks[step], self.bids[step])
+        order_book = [
+            self.pair,
+            {
+                "asks": [[f"{price:.1f}", f"{size:.8f}"] for price, size in asks],
+                "bids": [[f"{price:.1f}", f"{size:.8f}"] for price, size in bids],
+                "last_update_at": str(int(self.timestamp)),
+            },
+        ]
+        return json.dumps(trades) if trades else None, json.dumps(order_book)
+
+    def response(self, method):
+        """The encoded response of a public API method for the current step."""
+        if method not in self.responses:
+            self.responses[method] = json.dumps(getattr(self, method)()).encode()
+        return self.responses[method]
+
+
+def walk_book(levels, side, amount=None, funds=None, rate=None, fee_rate=0.0):
+    """
+    Fills of an order taking liquidity from one side of a book.
+
+    Parameters:
+        :levels (price, size) levels, best first.
+        :side "buy" or "sell".
+        :amount Base amount to trade, or
+        :funds Quote amount to spend (market buy).
+        :rate Limit rate, levels beyond it are not taken.
+    Returns:
+        :List of (price, amount) fills.
+    """
+    fills = []
+    for price, size in levels:
+        if rate is not None and (price > rate if side == "buy" else price < rate):
+            break
+        if funds is not None:
+            fill = min(size, funds / (price * (1 + fee_rate)))
+            funds -= fill * price * (1 + fee_rate)
+        else:
+            fill = min(size, amount)
+            amount -= fill
+        if fill <= 0:
+            break
+        fills.append((float(price), float(fill)))
+        if (funds if funds is not None else amount) <= 1e-12:
+            break
+    return fills
+
+
+class ExchangeAccount:
+    """
+    Balances, open orders and transactions of one mock exchange account.
+
+    Orders take liquidity from the replayed books without consuming it, and
+    resting limit orders are matched again after every step. Fees are
+    charged in the quote currency.
+    """
+
+    def __init__(self, balances=None, fee_rate=0.0):
+        self.balances = defaultdict(float, balances or {"jpy": 10_000_000, "btc": 1})
+        self.reserved = defaultdict(float)
+        self.fee_rate = fee_rate
+        self.orders = {}
+        self.open_orders = {}
+        self.transactions = []
+        self.order_ids = itertools.count(1)
+        self.transaction_ids = itertools.count(1)
+
+    def available(self, currency):
+        return self.balances[currency] - self.reserved[currency]
+
+    def place_order(self, replay, order_type, rate=None, amount=None, **options):
+        """Place an order, raising ValueError when the exchange would reject it."""
+        base, quote = replay.pair.split("_")
+        side = order_type.replace("market_", "")
+        is_market = order_type.startswith("market_")
+        if side not in ("buy", "sell"):
+            raise ValueError(f"Invalid order_type: {order_type}")
+        rate = None if is_market else _positive(rate, "rate")
+        market_buy_amount = None
+        if order_type == "market_buy":
+            amount = None
+            market_buy_amount = _positive(
+                options.get("market_buy_amount"), "market_buy_amount"
+            )
+        else:
+            amount = _positive(amount, "amount")
+
+        if side == "buy":
+            currency = quote
+            reserve = market_buy_amount or rate * amount * (1 + self.fee_rate)
+        else:
+            currency, reserve = base, amount
+        if reserve > self.available(currency) + 1e-9:
+            raise ValueError("Amount is insufficient")
+
+        order = {
+            "id": next(self.order_ids),
+            "pair": replay.pair,
+            "order_type": order_type,
+            "side": side,
+            "rate": rate,
+            "amount": amount,
+            "pending_amount": amount,
+            "pending_market_buy_amount": market_buy_amount,
+            "stop_loss_rate": options.get("stop_loss_rate") or None,
+            "time_in_force": options.get("time_in_force") or "good_til_cancelled",
+            "reserve_currency": currency,
+            "reserved": reserve,
+            "created_at": to_api_time(replay.timestamp),
+            "cancel": False,
+        }
+        asks, bids = replay.book
+        levels = asks if side == "buy" else bids
+        if order["time_in_force"] == "post_only" and walk_book(
+            levels[:1], side, amount=amount, rate=rate
+        ):
+            raise ValueError("post_only order would take liquidity")
+
+        self.reserved[currency] += reserve
+        self.orders[order["id"]] = order
+        self.match(order, replay, liquidity="T")
+        if is_market:
+            self.close(order)
+        elif not self.is_filled(order):
+            self.open_orders[order["id"]] = order
+        return order
+
+    def match(self, order, replay, liquidity="M"):
+        asks, bids = replay.book
+        fills = walk_book(
+            asks if order["side"] == "buy" else bids,
+            order["side"],
+            amount=order["pending_amount"],
+            funds=order["pending_market_buy_amount"],
+            rate=order["rate"],
+            fee_rate=self.fee_rate,
+        )
+        for price, amount in fills:
+            self.execute(order, price, amount, liquidity, replay.timestamp)
+        return fills
+
+    def match_open_orders(self, replay):
+        for order in list(self.open_orders.values()):
+            if order["pair"] == replay.pair and self.match(order, replay):
+                if self.is_filled(order):
+                    self.close(order)
+
+    def execute(self, order, price, amount, liquidity, timestamp):
+        base, quote = order["pair"].split("_")
+        cost = price * amount
+        fee = cost * self.fee_rate
+        if order["side"] == "buy":
+            spent = cost + fee
+            self.balances[quote] -= spent
+            self.balances[base] += amount
+            self.reserved[quote] -= spent
+            order["reserved"] -= spent
+            funds = {base: amount, quote: -spent}
+        else:
+            self.balances[base] -= amount
+            self.balances[quote] += cost - fee
+            self.reserved[base] -= amount
+            order["reserved"] -= amount
+            funds = {base: -amount, quote: cost - fee}
+        if order["pending_market_buy_amount"] is not None:
+            order["pending_market_buy_amount"] -= cost + fee
+        else:
+            order["pending_amount"] -= amount
+
+        self.transactions.append(
+            {
+                "id": next(self.transaction_ids),
+                "order_id": order["id"],
+                "created_at": to_api_time(timestamp),
+                "funds": {
+                    currency: f"{value:.8f}" for currency, value in funds.items()
+                },
+                "pair": order["pair"],
+                "rate": f"{price:.1f}",
+                "fee_currency": quote.upper(),
+                "fee": f"{fee:.8f}",
+                "liquidity": liquidity,
+                "side": order["side"],
+            }
+        )
+
+    def is_filled(self, order):
+        pending = order["pending_market_buy_amount"]
+        return (order["pending_amount"] if pending is None else pending) <= 1e-12
+
+    def close(self, order):
+        """Release what is left of the reservation of an order."""
+        self.reserved[order["reserve_currency"]] -= max(order["reserved"], 0)
+        order["reserved"] = 0
+        self.open_orders.pop(order["id"], None)
+
+    def cancel_order(self, order_id):
+        order = self.open_orders.get(order_id)
+        if order is None:
+            raise ValueError(f"The order {order_id} is not open")
+        order["cancel"] = True
+        self.close(order)
+        return order
+
+    def get_balance(self):
+        balance = {"success": True}
+        for currency in sorted(set(self.balances) | set(self.reserved)):
+            balance[currency] = f"{self.available(currency):.8f}"
+            balance[f"{currency}_reserved"] = f"{self.reserved[currency]:.8f}"
+        return balance
+
+
+def _positive(value, name):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} is required")
+    if value <= 0:
+        raise ValueError(f"{name} must be positive")
+    return value
+
+
+def _format_order(order):
+    return {
+        "id": order["id"],
+        "order_type": order["order_type"],
+        "rate": order["rate"],
+        "pair": order["pair"],
+        "pending_amount": (
+            None
+            if order["pending_amount"] is None
+            else f"{order['pending_amount']:.8f}"
+        ),
+        "pending_market_buy_amount": (
+            None
+            if order["pending_market_buy_amount"] is None
+            else f"{order['pending_market_buy_amount']:.8f}"
+        ),
+        "stop_loss_rate": order["stop_loss_rate"],
+        "created_at": order["created_at"],
+    }
+
+
+class MockExchange:
+    """
+    Local stand-in for the Coincheck API, for offline runs and load tests.
+
+    Serves the public endpoints of coincheck_cfg.api_urls from MarketReplay
+    instances and matches private orders in-process, with one
+    ExchangeAccount per ACCESS-KEY. Signatures are required but not verified.
+    The WebSocket API is served on /ws: every step is pushed to the
+    subscribers of the {pair}-trades and {pair}-orderbook channels.
+
+    Parameters:
+        :replays MarketReplay per pair; the first one is the default pair.
+        :steps_per_second Steps replayed per second of wall time. With 0, a
+            pair advances one step on every ticker request, so a client sees
+            the same data on every run whatever the load.
+        :latency Seconds added to every response.
+        :jitter Mean of exponentially distributed extra latency, drawn from
+            a generator seeded with seed.
+        :max_requests_per_second Answer 429 above this rate (None = no limit).
+
+    Example:
+        exchange = MockExchange([MarketReplay.simulate("btc_jpy", 10_000, seed=1)])
+        exchange.run(port=8765)
+        # UTX_COINCHECK_BASE_URL=http://127.0.0.1:8765 python manage.py batch_processing
+        # UTX_COINCHECK_WS_URL=ws://127.0.0.1:8765/ws for the --stream option
+    """
+
+    def __init__(
+        self,
+        replays,
+        steps_per_second=0,
+        latency=0.0,
+        jitter=0.0,
+        max_requests_per_second=None,
+        balances=None,
+        fee_rate=0.0,
+        seed=None,
+    ):
+        self.replays = {replay.pair: replay for replay in replays}
+        self.default_pair = next(iter(self.replays))
+        self.steps_per_second = steps_per_second
+        self.latency = latency
+        self.jitter = jitter
+        self.max_requests_per_second = max_requests_per_second
+        self.rng = np.random.default_rng(seed)
+        self.accounts = defaultdict(lambda: ExchangeAccount(balances, fee_rate))
+        self.request_counts = defaultdict(int)
+        self.rate_window = (0, 0)
+        # WebSocket -> (subscribed channels, queue of messages to send)
+        self.subscriptions = {}
+        self.runner = None
+        self.base_url = None
+        self.log = log(self.__class__.__name__)
+
+    def create_app(self):
+        app = web.Application(middlewares=[self.simulate_network])
+        app.router.add_get("/api/ticker", self.ticker)
+        app.router.add_get("/api/trades", self.public_trades)
+        app.router.add_get("/api/order_books", self.order_books)
+        app.router.add_get("/api/exchange/orders/rate", self.calc_rate)
+        app.router.add_get("/api/rate/{pair}", self.standard_rate)
+        app.router.add_post("/api/exchange/orders", self.new_order)
+        app.router.add_get("/api/exchange/orders/opens", self.unsettled_orders)
+        app.router.add_get(
+            "/api/exchange/orders/cancel_status", self.cancellation_status
+        )
+        app.router.add_get("/api/exchange/orders/transactions", self.transactions)
+        app.router.add_get(
+            "/api/exchange/orders/transactions_pagination",
+            self.transactions_pagination,
+        )
+        app.router.add_delete("/api/exchange/orders/{id}", self.cancel_order)
+        app.router.add_get("/api/accounts/balance", self.balance)
+        app.router.add_get("/api/accounts", self.account_information)
+        app.router.add_get("/ws", self.websocket)
+        app.router.add_post("/mock/step", self.step)
+        app.router.add_get("/mock/stats", self.stats)
+        app.on_startup.append(self.start_clock)
+        app.on_cleanup.append(self.stop_clock)
+        return app
+
+    def run(self, host="127.0.0.1", port=8765):
+        web.run_app(self.create_app(), host=host, port=port)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Serve from the running event loop and return the base_url."""
+        self.runner = web.AppRunner(self.create_app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        host, port = self.runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+        self.log.info("start", f"Mock exchange listening on {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def start_clock(self, app):
+        self.clock = None
+        if self.steps_per_second:
+            self.clock = asyncio.ensure_future(self.run_clock())
+
+    async def stop_clock(self, app):
+        if self.clock is not None:
+            self.clock.cancel()
+
+    async def run_clock(self):
+        interval = 1 / self.steps_per_second
+        next_step = time.monotonic()
+        while True:
+            next_step += interval
+            await asyncio.sleep(max(0.0, next_step - time.monotonic()))
+            for replay in self.replays.values():
+                self.advance(replay)
+
+    def advance(self, replay):
+        previous_step = replay.step
+        replay.advance()
+        for account in self.accounts.values():
+            account.match_open_orders(replay)
+        if self.subscriptions:
+            self.publish(replay, previous_step)
+
+    def publish(self, replay, previous_step):
+        trades, order_book = replay.get_stream_messages(previous_step)
+        for channels, outbox in self.subscriptions.values():
+            if trades and f"{replay.pair}-trades" in channels:
+                outbox.put_nowait(trades)
+            if order_book and f"{replay.pair}-orderbook" in channels:
+                outbox.put_nowait(order_book)
+
+    async def close_websockets(self):
+        """Drop every WebSocket connection, as a network failure would."""
+        for ws in list(self.subscriptions):
+            await ws.close()
+
+    @web.middleware
+    async def simulate_network(self, request, handler):
+        self.request_counts[request.path] += 1
+        if self.max_requests_per_second and self.is_rate_limited():
+            return web.json_response(
+                {"success": False, "error": "too many requests"},
+                status=429,
+                headers={"Retry-After": "1"},
+            )
+        delay = self.latency
+        if self.jitter:
+            delay += self.rng.exponential(self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        return await handler(request)
+
+    def is_rate_limited(self):
+        second = int(time.monotonic())
+        window, count = self.rate_window
+        count = count + 1 if window == second else 1
+        self.rate_window = (second, count)
+        return count > self.max_requests_per_second
+
+    def get_replay(self, request):
+        pair = request.match_info.get("pair") or request.query.get("pair")
+        replay = self.replays.get(pair or self.default_pair)
+        if replay is None:
+            raise web.HTTPBadRequest(
+                text=json.dumps({"success": False, "error": f"Invalid pair: {pair}"}),
+                content_type="application/json",
+            )
+        return replay
+
+    def get_account(self, request):
+        if not all(
+            request.headers.get(header)
+            for header in ("ACCESS-KEY", "ACCESS-NONCE", "ACCESS-SIGNATURE")
+        ):
+            raise web.HTTPUnauthorized(
+                text=json.dumps({"success": False, "error": "invalid authentication"}),
+                content_type="application/json",
+            )
+        return self.accounts[request.headers["ACCESS-KEY"]]
+
+    @staticmethod
+    def encoded_response(body):
+        return web.Response(body=body, content_type="application/json")
+
+    @staticmethod
+    def error_response(error):
+        return web.json_response({"success": False, "error": str(error)}, status=400)
+
+    # Public API
+    async def ticker(self, request):
+        replay = self.get_replay(request)
+        if not self.steps_per_second:
+            self.advance(replay)
+        return self.encoded_response(replay.response("get_ticker"))
+
+    async def public_trades(self, request):
+        replay = self.get_replay(request)
+        return self.encoded_response(replay.response("get_public_trades"))
+
+    async def order_books(self, request):
+        replay = self.get_replay(request)
+        return self.encoded_response(replay.response("get_order_books"))
+
+    async def calc_rate(self, request):
+        replay = self.get_replay(request)
+        side = request.query.get("order_type", "buy")
+        asks, bids = replay.book
+        levels = asks if side == "buy" else bids
+        try:
+            if request.query.get("amount"):
+                fills = walk_book(
+                    levels, side, amount=_positive(request.query["amount"], "amount")
+                )
+            else:
+                fills = walk_book(
+                    levels, side, funds=_positive(request.query.get("price"), "price")
+                )
+        except ValueError as e:
+            return self.error_response(e)
+        amount = sum(fill for _, fill in fills)
+        price = sum(rate * fill for rate, fill in fills)
+        return web.json_response(
+            {
+                "success": True,
+                "rate": price / amount if amount else None,
+                "price": price,
+                "amount": amount,
+            }
+        )
+
+    async def standard_rate(self, request):
+        replay = self.get_replay(request)
+        return web.json_response({"rate": f"{replay.prices[replay.step]:.1f}"})
+
+    # Private API
+    async def new_order(self, request):
+        account = self.get_account(request)
+        replay = self.get_replay(request)
+        parameters = dict(request.query)
+        if request.can_read_body:
+            parameters.update(await request.post())
+        try:
+            order = account.place_order(
+                replay,
+                parameters.pop("order_type", ""),
+                parameters.pop("rate", None),
+                parameters.pop("amount", None),
+                **parameters,
+            )
+        except ValueError as e:
+            return self.error_response(e)
+        return web.json_response(
+            {
+                "success": True,
+                "id": order["id"],
+                "rate": order["rate"] and f"{order['rate']:.1f}",
+                "amount": order["amount"] and f"{order['amount']:.8f}",
+                "order_type": order["order_type"],
+                "time_in_force": order["time_in_force"],
+                "stop_loss_rate": order["stop_loss_rate"],
+                "pair": order["pair"],
+                "created_at": order["created_at"],
+            }
+        )
+
+    async def unsettled_orders(self, request):
+        account = self.get_account(request)
+        orders = [_format_order(order) for order in account.open_orders.values()]
+        return web.json_response({"success": True, "orders": orders})
+
+    async def cancel_order(self, request):
+        account = self.get_account(request)
+        try:
+            order = account.cancel_order(int(request.match_info["id"]))
+        except ValueError as e:
+            return self.error_response(e)
+        return web.json_response({"success": True, "id": order["id"]})
+
+    async def cancellation_status(self, request):
+        account = self.get_account(request)
+        order = account.orders.get(int(request.query.get("id", 0)))
+        if order is None:
+            return self.error_response("Order not found")
+        return web.json_response(
+            {
+                "success": True,
+                "id": order["id"],
+                "cancel": order["cancel"],
+                "created_at": order["created_at"],
+            }
+        )
+
+    async def transactions(self, request):
+        account = self.get_account(request)
+        transactions = account.transactions[::-1]
+        return web.json_response({"success": True, "transactions": transactions})
+
+    async def transactions_pagination(self, request):
+        account = self.get_account(request)
+        limit = int(request.query.get("limit", 25))
+        return web.json_response(
+            {
+                "success": True,
+                "pagination": {"limit": limit, "order": "desc"},
+                "data": account.transactions[::-1][:limit],
+            }
+        )
+
+    async def balance(self, request):
+        return web.json_response(self.get_account(request).get_balance())
+
+    async def account_information(self, request):
+        account = self.get_account(request)
+        fee = f"{account.fee_rate * 100:.2f}"
+        return web.json_response(
+            {
+                "success": True,
+                "id": 1,
+                "email": "mock@localhost",
+                "identity_status": "identity_verified",
+                "taker_fee": fee,
+                "maker_fee": fee,
+                "exchange_fees": {
+                    pair: {"maker_fee_rate": fee, "taker_fee_rate": fee}
+                    for pair in self.replays
+                },
+            }
+        )
+
+    # WebSocket API
+    async def websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        channels, outbox = set(), asyncio.Queue()
+        self.subscriptions[ws] = (channels, outbox)
+        sender = asyncio.ensure_future(self.send_messages(ws, outbox))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    break
+                data = json.loads(message.data)
+                if data.get("type") == "subscribe":
+                    channels.add(data.get("channel"))
+        finally:
+            self.subscriptions.pop(ws, None)
+            sender.cancel()
+        return ws
+
+    @staticmethod
+    async def send_messages(ws, outbox):
+        # One sender per connection keeps the messages in step order
+        while True:
+            await ws.send_str(await outbox.get())
+
+    # Control of the mock exchange
+    async def step(self, request):
+        replay = self.get_replay(request)
+        self.advance(replay)
+        return web.json_response({"pair": replay.pair, "step": replay.step})
+
+    async def stats(self, request):
+        return web.json_response(
+            {
+                "requests": dict(self.request_counts),
+                "steps": {pair: replay.step for pair, replay in self.replays.items()},
+            }
+        )
+
+
+async def benchmark(client, requests=10_000, concurrency=100, pair="btc_jpy"):
+    """
+    Send ticker requests through an AsyncCoincheckClient and return the
+    number of successful requests per second.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request():
+        async with semaphore:
+            return await client.get_ticker(pair)
+
+    start = time.monotonic()
+    results = await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.monotonic() - start
+    succeeded = sum("error" not in result for result in results)
+    return succeeded / elapsed
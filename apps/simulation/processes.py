@@ -0,0 +1,161 @@
+import numpy as np
+
+
+class PriceProcess:
+    """
+    Base class of the simulated price processes.
+
+    simulate() generates `steps` prices for every start price at once, as an
+    array of shape (paths, steps). The returned state continues the process
+    in the next call, so long simulations can be generated chunk by chunk.
+    """
+
+    def simulate(self, start_prices, steps, rng, state=None):
+        raise NotImplementedError
+
+    @staticmethod
+    def as_paths(start_prices):
+        return np.atleast_1d(np.asarray(start_prices, dtype=np.float64))
+
+
+class ArithmeticProcess(PriceProcess):
+    """Additive Gaussian steps clipped at zero (the original simulator)."""
+
+    def __init__(self, volatility):
+        self.volatility = volatility
+
+    def simulate(self, start_prices, steps, rng, state=None):
+        start_prices = self.as_paths(start_prices)
+        changes = rng.normal(0, self.volatility, size=(len(start_prices), steps))
+        prices = start_prices[:, None] + np.cumsum(changes, axis=1)
+        return np.maximum(prices, 0), state
+
+
+class GeometricBrownianMotion(PriceProcess):
+    """
+    dS = drift * S dt + volatility * S dW, simulated exactly in log space.
+    drift and volatility are per unit of time, dt is the step length.
+    """
+
+    def __init__(self, drift, volatility, dt=1.0):
+        self.drift = drift
+        self.volatility = volatility
+        self.dt = dt
+
+    def log_returns(self, shape, rng):
+        mean = (self.drift - 0.5 * self.volatility**2) * self.dt
+        return mean + self.volatility * np.sqrt(self.dt) * rng.standard_normal(shape)
+
+    def simulate(self, start_prices, steps, rng, state=None):
+        start_prices = self.as_paths(start_prices)
+        log_returns = self.log_returns((len(start_prices), steps), rng)
+        return start_prices[:, None] * np.exp(np.cumsum(log_returns, axis=1)), state
+
+
+class JumpDiffusion(GeometricBrownianMotion):
+    """
+    Merton jump-diffusion: GBM plus Poisson jumps with normally distributed
+    log sizes. jump_intensity is the expected number of jumps per unit of time.
+    """
+
+    def __init__(self, drift, volatility, jump_intensity, jump_mean, jump_std, dt=1.0):
+        super().__init__(drift, volatility, dt)
+        self.jump_intensity = jump_intensity
+        self.jump_mean = jump_mean
+        self.jump_std = jump_std
+
+    def simulate(self, start_prices, steps, rng, state=None):
+        start_prices = self.as_paths(start_prices)
+        shape = (len(start_prices), steps)
+        jumps = rng.poisson(self.jump_intensity * self.dt, size=shape)
+        # The sum of n normal jumps is normal with n times the mean and variance
+        jump_sizes = jumps * self.jump_mean + np.sqrt(jumps) * self.jump_std * (
+            rng.standard_normal(shape)
+        )
+        log_returns = self.log_returns(shape, rng) + jump_sizes
+        return start_prices[:, None] * np.exp(np.cumsum(log_returns, axis=1)), state
+
+
+class GarchProcess(PriceProcess):
+    """
+    GARCH(1,1) log returns, for volatility clustering:
+        r_t = drift + sigma_t * z_t
+        sigma_t^2 = omega + alpha * (r_{t-1} - drift)^2 + beta * sigma_{t-1}^2
+    The recursion runs over steps, vectorized over paths.
+    """
+
+    def __init__(self, omega, alpha, beta, drift=0.0):
+        if alpha + beta >= 1:
+            raise ValueError("GARCH requires alpha + beta < 1 to be stationary.")
+        self.omega = omega
+        self.alpha = alpha
+        self.beta = beta
+        self.drift = drift
+
+    @property
+    def long_run_variance(self):
+        return self.omega / (1 - self.alpha - self.beta)
+
+    def simulate(self, start_prices, steps, rng, state=None):
+        start_prices = self.as_paths(start_prices)
+        paths = len(start_prices)
+        if state is None:
+            state = {
+                "variance": np.full(paths, self.long_run_variance),
+                "shock": np.zeros(paths),
+            }
+        variance, shock = state["variance"], state["shock"]
+
+        shocks = rng.standard_normal((paths, steps))
+        log_returns = np.empty((paths, steps))
+        for step in range(steps):
+            variance = self.omega + self.alpha * shock**2 + self.beta * variance
+            shock = np.sqrt(variance) * shocks[:, step]
+            log_returns[:, step] = self.drift + shock
+
+        prices = start_prices[:, None] * np.exp(np.cumsum(log_returns, axis=1))
+        return prices, {"variance": variance, "shock": shock}
+
+
+class RegimeSwitchingProcess(PriceProcess):
+    """
+    GBM whose drift and volatility follow a Markov chain of regimes.
+
+    Parameters:
+        :regimes List of (drift, volatility) per regime.
+        :transition_matrix transition_matrix[i][j] is the probability of moving
+            from regime i to regime j in one step.
+    """
+
+    def __init__(self, regimes, transition_matrix, dt=1.0, initial_regime=0):
+        self.drifts, self.volatilities = map(np.asarray, zip(*regimes))
+        self.transition_matrix = np.asarray(transition_matrix, dtype=np.float64)
+        if not np.allclose(self.transition_matrix.sum(axis=1), 1):
+            raise ValueError("Every row of the transition matrix must sum to 1.")
+        self.cumulative_transitions = np.cumsum(self.transition_matrix, axis=1)
+        self.dt = dt
+        self.initial_regime = initial_regime
+
+    def simulate(self, start_prices, steps, rng, state=None):
+        start_prices = self.as_paths(start_prices)
+        paths = len(start_prices)
+        regime = (
+            np.full(paths, self.initial_regime) if state is None else state["regime"]
+        )
+
+        draws = rng.random((paths, steps))
+        regimes = np.empty((paths, steps), dtype=np.int64)
+        for step in range(steps):
+            thresholds = self.cumulative_transitions[regime]
+            regime = np.minimum(
+                (draws[:, step, None] > thresholds).sum(axis=1), len(self.drifts) - 1
+            )
+            regimes[:, step] = regime
+
+        drifts = self.drifts[regimes]
+        volatilities = self.volatilities[regimes]
+        log_returns = (drifts - 0.5 * volatilities**2) * self.dt + (
+            volatilities * np.sqrt(self.dt) * rng.standard_normal((paths, steps))
+        )
+        prices = start_prices[:, None] * np.exp(np.cumsum(log_returns, axis=1))
+        return prices, {"regime": regime, "regimes": regimes}
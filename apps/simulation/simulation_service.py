@@ -1,17 +1,29 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import numpy as np
-import pandas as pd
 from db_util import UtxDBService
 from models.ticker import Ticker
 
+from apps.simulation.market_data import generate_order_books, generate_trades
+from apps.simulation.processes import ArithmeticProcess
+
+SECONDS_PER_STEP = 60
+
 
 class SimulationService:
     """
     A class to generate simulated financial data.
     """
 
-    def __init__(self, start_price, days, volatility):
+    def __init__(
+        self,
+        start_price,
+        days,
+        volatility,
+        seed=None,
+        chunk_size=10000,
+        process=None,
+    ):
         """
         Initialize the simulation data generator.
 
@@ -19,59 +31,157 @@ class SimulationService:
             start_price (float): The initial price of the asset.
             days (int): The number of data points to generate.
             volatility (float): The standard deviation of the price changes.
+            seed (int, optional): Seed of the random generator, for reproducible data.
+            chunk_size (int): The number of data points generated and persisted at once.
+            process (PriceProcess, optional): The price process, see processes.py.
+                Defaults to additive Gaussian steps with the given volatility.
         """
         self.start_price = start_price
         self.days = days
         self.volatility = volatility
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.process = process or ArithmeticProcess(volatility)
         UtxDBService().create_models_tables()
 
-    def generate_data(self):
+    def generate_chunks(self, start_time=None):
+        """
+        Generate the simulated financial data chunk by chunk.
+
+        Memory use is bounded by chunk_size, whatever the number of data points.
+
+        Args:
+            start_time (datetime, optional): Time of the first data point, defaults to now.
+
+        Yields:
+            dict: Arrays of at most chunk_size values for last, bid, ask, high,
+            low, volume and timestamp (epoch seconds).
+        """
+        rng = np.random.default_rng(self.seed)
+        start_timestamp = int((start_time or datetime.now()).timestamp())
+        last_price = self.start_price
+        state = None
+
+        for offset in range(0, self.days, self.chunk_size):
+            size = min(self.chunk_size, self.days - offset)
+            timestamps = start_timestamp + SECONDS_PER_STEP * np.arange(
+                offset, offset + size, dtype=np.int64
+            )
+
+            # Continue the price process from the end of the previous chunk
+            prices, state = self.process.simulate(last_price, size, rng, state)
+            last_prices = prices[0]
+            last_price = last_prices[-1]
+
+            # Generate bid, ask, high, and low prices with random adjustments
+            bids = last_prices - rng.uniform(0.01, 0.05, size=size)
+            asks = last_prices + rng.uniform(0.01, 0.05, size=size)
+            highs = last_prices + rng.uniform(0.05, 0.1, size=size)
+            lows = last_prices - rng.uniform(0.05, 0.1, size=size)
+            lows = np.maximum(lows, 0)  # Ensure no negative prices
+
+            # Generate random volumes
+            volumes = rng.uniform(10, 100, size=size)
+
+            yield {
+                "last": np.round(last_prices, 2),
+                "bid": np.round(bids, 2),
+                "ask": np.round(asks, 2),
+                "high": np.round(highs, 2),
+                "low": np.round(lows, 2),
+                "volume": np.round(volumes, 8),
+                "timestamp": timestamps,
+            }
+
+    def generate_paths(self, paths, start_time=None, rng=None):
         """
-        Generate the simulated financial data.
+        Generate many independent price paths in one array operation.
+
+        Args:
+            paths (int): The number of paths.
+            rng (numpy.random.Generator, optional): Defaults to one seeded with seed.
+
+        Returns:
+            tuple: Prices of shape (paths, days) and their timestamps (epoch seconds).
+        """
+        if rng is None:
+            rng = np.random.default_rng(self.seed)
+        start_timestamp = int((start_time or datetime.now()).timestamp())
+        start_prices = np.full(paths, self.start_price, dtype=np.float64)
+        prices, _ = self.process.simulate(start_prices, self.days, rng)
+        timestamps = start_timestamp + SECONDS_PER_STEP * np.arange(self.days)
+        return prices, timestamps
+
+    def generate_market_data(self, pair="btc_jpy", depth=20, start_time=None, **kwargs):
+        """
+        Generate a price path with matching synthetic trades and order books.
+
+        Args:
+            pair (str): The pair of the trades.
+            depth (int): The number of levels per order book side.
+            kwargs: Passed to market_data.generate_trades.
+
+        Returns:
+            dict: prices and timestamps, trades (see market_data.generate_trades)
+            and asks and bids of shape (days, depth, 2).
+        """
+        # Independent streams for the path, the trades and the books, so
+        # none of them replays the draws of another
+        path_rng, trade_rng, book_rng = (
+            np.random.default_rng(seed)
+            for seed in np.random.SeedSequence(self.seed).spawn(3)
+        )
+        prices, timestamps = self.generate_paths(1, start_time, path_rng)
+        trades = generate_trades(prices[0], timestamps, trade_rng, pair=pair, **kwargs)
+        asks, bids = generate_order_books(prices[0], book_rng, depth=depth)
+        return {
+            "prices": prices[0],
+            "timestamps": timestamps,
+            "trades": trades,
+            "asks": asks,
+            "bids": bids,
+        }
+
+    def generate_to_db(self, start_time=None):
+        """
+        Generate the simulated financial data and persist it one chunk per statement.
+
+        Returns:
+            int: The number of data points persisted.
+        """
+        return sum(
+            Ticker.bulk_create_ticker_data(chunk, True)
+            for chunk in self.generate_chunks(start_time)
+        )
+
+    def generate_data(self, start_time=None):
+        """
+        Generate and persist the simulated financial data.
 
         Returns:
             list: A list of dictionaries containing simulated financial data.
         """
-        # Generate timestamps
-        current_time = datetime.now()
-        timestamps = [
-            int((current_time + timedelta(minutes=i)).timestamp())
-            for i in range(self.days)
-        ]
-
-        # Generate random price changes based on normal distribution
-        price_changes = np.random.normal(loc=0, scale=self.volatility, size=self.days)
-        last_prices = self.start_price + np.cumsum(price_changes)
-        last_prices = np.maximum(last_prices, 0)  # Ensure no negative prices
-
-        # Generate bid, ask, high, and low prices with random adjustments
-        bids = last_prices - np.random.uniform(0.01, 0.05, size=self.days)
-        asks = last_prices + np.random.uniform(0.01, 0.05, size=self.days)
-        highs = last_prices + np.random.uniform(0.05, 0.1, size=self.days)
-        lows = last_prices - np.random.uniform(0.05, 0.1, size=self.days)
-        lows = np.maximum(lows, 0)  # Ensure no negative prices
-
-        # Generate random volumes
-        volumes = np.random.uniform(10, 100, size=self.days)
-
-        # Compile the generated data into a list of dictionaries
         data = []
-        for i in range(self.days):
-            record = {
-                "last": round(last_prices[i], 2),
-                "bid": round(bids[i], 2),
-                "ask": round(asks[i], 2),
-                "high": round(highs[i], 2),
-                "low": round(lows[i], 2),
-                "volume": f"{volumes[i]:.8f}",
-                "timestamp": timestamps[i],
-            }
-            Ticker.create_ticker_data(record, True)
-            data.append(record)
+        for chunk in self.generate_chunks(start_time):
+            Ticker.bulk_create_ticker_data(chunk, True)
+            data.extend(
+                {
+                    "last": float(last),
+                    "bid": float(bid),
+                    "ask": float(ask),
+                    "high": float(high),
+                    "low": float(low),
+                    "volume": f"{volume:.8f}",
+                    "timestamp": int(timestamp),
+                }
+                for last, bid, ask, high, low, volume, timestamp in zip(
+                    *(chunk[field] for field in Ticker.DATA_FIELDS)
+                )
+            )
         return data
 
 
 # Example usage:
-# generator = SimulationDataGenerator(start_price=100, days=10, volatility=1)
+# generator = SimulationService(start_price=100, days=10, volatility=1, seed=42)
 # simulation_data = generator.generate_data()
-# print(simulation_data)
+# rows = SimulationService(100, 5_000_000, 1, seed=42).generate_to_db()
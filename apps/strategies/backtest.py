@@ -0,0 +1,199 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from models.trade import Trade
+
+from apps.strategies.config import StrategiesConfig
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+
+def rolling_mean_std(rates, window):
+    """
+    Rolling mean and sample standard deviation over `window` values, computed
+    with cumulative sums. The first window - 1 values are NaN.
+    """
+    size = len(rates)
+    mean = np.full(size, np.nan)
+    std = np.full(size, np.nan)
+    if size < window or window < 2:
+        return mean, std
+
+    # Shift by the first rate so the cumulative sums keep their precision
+    shifted = rates - rates[0]
+    cumsum = np.concatenate(([0.0], np.cumsum(shifted)))
+    cumsum_sq = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    window_sum = cumsum[window:] - cumsum[:-window]
+    window_sum_sq = cumsum_sq[window:] - cumsum_sq[:-window]
+
+    window_mean = window_sum / window
+    variance = (window_sum_sq - window_sum * window_mean) / (window - 1)
+    mean[window - 1 :] = window_mean + rates[0]
+    std[window - 1 :] = np.sqrt(np.maximum(variance, 0.0))
+    return mean, std
+
+
+def wilder_rsi(rates, period):
+    """
+    Wilder-smoothed RSI for every rate, matching WilderRSI. The first
+    `period` values are NaN.
+    """
+    rsi = np.full(len(rates), np.nan)
+    deltas = np.diff(rates)
+    if len(deltas) < period:
+        return rsi
+
+    gains = np.maximum(deltas, 0.0)
+    losses = np.maximum(-deltas, 0.0)
+    # Seed with the simple mean of the first period changes, then smooth with
+    # alpha = 1 / period, which is Wilder's recursion
+    gains = gains[period - 1 :].copy()
+    losses = losses[period - 1 :].copy()
+    gains[0] = np.mean(np.maximum(deltas[:period], 0.0))
+    losses[0] = np.mean(np.maximum(-deltas[:period], 0.0))
+    average_gain = pd.Series(gains).ewm(alpha=1 / period, adjust=False).mean()
+    average_loss = pd.Series(losses).ewm(alpha=1 / period, adjust=False).mean()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = average_gain.to_numpy() / average_loss.to_numpy()
+        rsi[period:] = np.where(
+            average_loss.to_numpy() == 0, 100.0, 100 - 100 / (1 + rs)
+        )
+    return rsi
+
+
+@dataclass
+class BacktestResult:
+    timestamps: np.ndarray
+    rates: np.ndarray
+    indicators: dict
+    positions: np.ndarray
+    equity: np.ndarray
+    stats: dict = field(default_factory=dict)
+
+    def to_frame(self):
+        return pd.DataFrame(
+            {
+                "DateTime": pd.to_datetime(self.timestamps, unit="s"),
+                "CurrentPrice": self.rates,
+                **self.indicators,
+                "Position": self.positions,
+                "Equity": self.equity,
+            }
+        )
+
+
+class Backtester:
+    """
+    Vectorized backtest of the BTCStrategy rule over a whole price history.
+
+    The strategy is long when the rate is above its rolling mean and flat
+    otherwise. A signal computed on a trade is filled `fill_delay` trades
+    later; each position change costs `fee_rate` plus `slippage` of the
+    traded value. Starting equity is 1.0.
+    """
+
+    def __init__(
+        self,
+        config: StrategiesConfig = StrategiesConfig(),
+        fee_rate=0.0,
+        slippage=0.0,
+        fill_delay=1,
+        volatility_window=200,
+    ):
+        self.config = config
+        self.volatility_window = volatility_window
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.fill_delay = fill_delay
+
+    def compute_indicators(self, rates):
+        rolling_mean, rolling_std = rolling_mean_std(
+            rates, self.config.moving_average_window
+        )
+        rsi = wilder_rsi(rates, self.config.rsi_period)
+        _, volatility = rolling_mean_std(rates, self.volatility_window)
+        width = rolling_std * self.config.std_dev_multiplier
+        return {
+            "RollingMean": rolling_mean,
+            "UpperBand": rolling_mean + width,
+            "LowerBand": rolling_mean - width,
+            "NormalizedRSI": (rsi - 50) * 0.02,
+            "Volatility": volatility,
+        }
+
+    def compute_signals(self, rates, indicators):
+        """1 where the strategy says BUY, 0 for SELL or while indicators warm up."""
+        with np.errstate(invalid="ignore"):
+            return (indicators["RollingMean"] < rates).astype(np.int8)
+
+    def compute_positions(self, signals):
+        positions = np.zeros(len(signals), dtype=np.int8)
+        if self.fill_delay < len(signals):
+            positions[self.fill_delay :] = signals[: len(signals) - self.fill_delay]
+        return positions
+
+    def compute_equity(self, rates, positions):
+        returns = np.zeros(len(rates))
+        returns[1:] = rates[1:] / rates[:-1] - 1
+        held = np.zeros(len(rates))
+        held[1:] = positions[:-1]
+        trades = np.abs(np.diff(positions, prepend=0))
+        cost = trades * (self.fee_rate + self.slippage)
+        return np.cumprod((1 + held * returns) * (1 - cost))
+
+    def compute_stats(self, timestamps, positions, equity):
+        step_returns = equity / np.concatenate(([1.0], equity[:-1])) - 1
+        running_max = np.maximum.accumulate(equity)
+        drawdown = equity / running_max - 1
+
+        entries = np.flatnonzero(np.diff(positions, prepend=0) == 1)
+        exits = np.flatnonzero(np.diff(positions, prepend=0) == -1)
+        exits = np.append(exits, len(equity) - 1)[: len(entries)]
+        equity_before = np.concatenate(([1.0], equity))
+        round_trips = equity[exits] / equity_before[entries] - 1
+
+        duration = timestamps[-1] - timestamps[0] if len(timestamps) > 1 else 0
+        sharpe = float("nan")
+        if duration > 0 and step_returns.std() > 0:
+            steps_per_year = (len(equity) - 1) * SECONDS_PER_YEAR / duration
+            sharpe = step_returns.mean() / step_returns.std() * np.sqrt(steps_per_year)
+
+        return {
+            "TotalReturn": float(equity[-1] - 1),
+            "MaxDrawdown": float(drawdown.min()),
+            "Sharpe": float(sharpe),
+            "Trades": int(np.abs(np.diff(positions, prepend=0)).sum()),
+            "WinRate": (
+                float((round_trips > 0).mean()) if len(round_trips) else float("nan")
+            ),
+            "Exposure": float(positions.mean()),
+        }
+
+    def run(self, rates, timestamps):
+        """Backtest arrays of rates and timestamps (epoch seconds), oldest first."""
+        rates = np.asarray(rates, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(rates) == 0:
+            raise ValueError("Cannot backtest an empty price history.")
+
+        indicators = self.compute_indicators(rates)
+        positions = self.compute_positions(self.compute_signals(rates, indicators))
+        equity = self.compute_equity(rates, positions)
+        return BacktestResult(
+            timestamps=timestamps,
+            rates=rates,
+            indicators=indicators,
+            positions=positions,
+            equity=equity,
+            stats=self.compute_stats(timestamps, positions, equity),
+        )
+
+    def run_range(self, start_date, end_date, pair="btc_jpy"):
+        """Load the trades of a date range with a single query and backtest them."""
+        start_datetime = datetime.strptime(start_date, "%Y-%m-%d %H:%M:%S")
+        end_datetime = datetime.strptime(end_date, "%Y-%m-%d %H:%M:%S")
+        rates, timestamps = Trade.get_rates_between(start_datetime, end_datetime, pair)
+        return self.run(rates, timestamps)
@@ -1,14 +1,26 @@
 from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
-from indexes import Indexes
+from backtest import Backtester
+from cache.order_book import order_book_cache
+from cache.price_history import price_history_cache
+from indexes import Indexes, StreamingIndexes
 from logger_util import UtxLogger as log
 from models.order import Order
 from models.trade import Trade
+from paper_trading import paper_engine
+from registry import DataRequirements, MarketSnapshot, strategy_registry
 from util import UtxUtils as uti
 
 from apps.strategies.config import StrategiesConfig
 
+# Number of most recent trades the strategy looks at
+HISTORY_SIZE = 200
+# Order book levels per side the execution rate is taken from
+BOOK_DEPTH = 50
+ORDER_AMOUNT = "0.05"
+
 
 def log_method_call(method):
     def wrapper(*args, **kwargs):
@@ -20,46 +32,96 @@ def log_method_call(method):
 
 
 class BTCStrategy:
-    def __init__(self, config: StrategiesConfig = StrategiesConfig()):
+    # Streaming indicator engines shared by all instances, keyed by pair and config
+    indicator_engines = {}
+    requirements = DataRequirements(
+        history=HISTORY_SIZE, book_depth=BOOK_DEPTH, last_order=True
+    )
+
+    def __init__(
+        self,
+        config: StrategiesConfig = StrategiesConfig(),
+        pair="btc_jpy",
+        account=None,
+    ):
+        """
+        With `account`, decisions are traded on that paper_engine account
+        instead of being saved as Order rows, e.g. registered with
+        strategy_registry.register("paper", partial(BTCStrategy, account="paper")).
+        """
         self.config = config
+        self.pair = pair
+        self.account = account
         self.indexs = Indexes()
         self.uti = uti()
         self.log = log(self.__class__.__name__)
 
-    def execute_strategy(self):
-        trades = Trade.objects.all().order_by("-created_at")[:200]
-        rates = pd.Series([float(trade.rate) for trade in trades])
-        current_price = rates.iloc[0]
-        maw = self.config.moving_average_window
-        sdm = self.config.std_dev_multiplier
-        rsi_period = self.config.rsi_period
-        rolling_mean, upper_band, lower_band = self.indexs.calculate_bollinger_bands(
-            rates, maw, sdm
+    @classmethod
+    def update_indicator_engines(cls, pair, rates, timestamps):
+        """PriceHistoryCache listener: feed new rates to the engines of the pair."""
+        for key, engine in cls.indicator_engines.items():
+            if key[0] == pair:
+                engine.update_many(rates)
+
+    def load_snapshot(self):
+        """MarketSnapshot of the pair; the history is loaded from the database once."""
+        return MarketSnapshot.load(self.pair, self.requirements)
+
+    def get_indicators(self, rates=None):
+        """
+        Return the current indicator values of the pair from its streaming
+        engine, creating and warming the engine on first use from `rates`,
+        or from the cache.
+        """
+        key = (
+            self.pair,
+            self.config.moving_average_window,
+            self.config.std_dev_multiplier,
+            self.config.rsi_period,
         )
-        normalized_rsi = self.indexs.calculate_rsi(rates, rsi_period)
-        volatility = self.indexs.calculate_price_volatility(rates)
+        with price_history_cache.lock:
+            engine = self.indicator_engines.get(key)
+            if engine is None:
+                if rates is None:
+                    rates, _ = price_history_cache.get_history(self.pair, HISTORY_SIZE)
+                engine = StreamingIndexes(
+                    *key[1:], volatility_window=HISTORY_SIZE
+                ).update_many(rates)
+                self.indicator_engines[key] = engine
+            rolling_mean, upper_band, lower_band = engine.bollinger_bands
+            return {
+                "RollingMean": rolling_mean,
+                "UpperBand": upper_band,
+                "LowerBand": lower_band,
+                "NormalizedRSI": engine.normalized_rsi,
+                "Volatility": engine.volatility,
+            }
+
+    def execute_strategy(self, snapshot=None):
+        snapshot = snapshot or self.load_snapshot()
+        rates, timestamps = snapshot.rates, snapshot.timestamps
+        if len(rates) == 0:
+            self.log.info("execute_strategy", f"No trades cached for {self.pair}.")
+            return
+        current_price = snapshot.current_price
+        indicators = self.get_indicators(rates)
 
         # Determine trade action based on the rolling mean, current price, and state
-        is_buy = rolling_mean.iloc[-1] < current_price
-        is_sell = rolling_mean.iloc[-1] > current_price
+        is_buy = indicators["RollingMean"] < current_price
 
         if is_buy:
             trade_action = "BUY"
         else:
             trade_action = "SELL"
 
-        # The rest of your method remains unchanged
         data = {
-            "DateTime": [trades[199].utx_id],
+            "DateTime": [datetime.fromtimestamp(timestamps[-1])],
             "CurrentPrice": [current_price],
-            "RollingMean": [rolling_mean.iloc[-1]],
-            "UpperBand": [upper_band.iloc[-1]],
-            "LowerBand": [lower_band.iloc[-1]],
-            "NormalizedRSI": [normalized_rsi.iloc[-1]],
-            "Volatility": [volatility],
+            **{name: [value] for name, value in indicators.items()},
             "TradeAction": [trade_action],
         }
-        self.uti.export_to_csv(data, "BtcStraTesting.csv")
+        # One file per pair, as pairs are evaluated concurrently
+        self.uti.export_to_csv(data, f"BtcStraTesting_{self.pair}.csv")
         return data
 
     def load_and_apply_strategy(self, start_date, end_date):
@@ -67,29 +129,29 @@ class BTCStrategy:
         start_datetime = datetime.strptime(start_date, "%Y-%m-%d %H:%M:%S")
         end_datetime = datetime.strptime(end_date, "%Y-%m-%d %H:%M:%S")
 
-        # Filter trades within the given date range and order by creation time
-        trades = Trade.objects.filter(
-            created_at__range=(start_datetime, end_datetime)
-        ).order_by("-created_at")[:200]
+        # Latest trades within the given date range, oldest first
+        rates, timestamps = Trade.get_rates_between(
+            start_datetime, end_datetime, self.pair
+        )
+        rates, timestamps = rates[-HISTORY_SIZE:], timestamps[-HISTORY_SIZE:]
 
-        if len(trades) == 0:
+        if len(rates) == 0:
             self.log.info(
                 "load_and_apply_strategy",
                 "No trades found in the specified date range.",
             )
             return
 
-        rates = pd.Series([float(trade.rate) for trade in trades])
-        current_price = rates.iloc[0]
+        rates = pd.Series(rates)
+        current_price = rates.iloc[-1]
         rolling_mean, upper_band, lower_band = self.indexs.calculate_bollinger_bands(
-            rates
+            rates, self.config.moving_average_window, self.config.std_dev_multiplier
         )
-        normalized_rsi = self.indexs.calculate_rsi(rates)
+        normalized_rsi = self.indexs.calculate_rsi(rates, self.config.rsi_period)
         volatility = self.indexs.calculate_price_volatility(rates)
 
         # Determine trade action based on the rolling mean, current price, and state
         is_buy = rolling_mean.iloc[-1] < current_price
-        is_sell = rolling_mean.iloc[-1] > current_price
 
         if is_buy:
             trade_action = "BUY"
@@ -98,10 +160,8 @@ class BTCStrategy:
 
         # Prepare the data for export
         data = {
-            "From": [
-                trades[19].created_at if len(trades) >= 20 else trades[-1].created_at
-            ],
-            "To": [trades[0].created_at],
+            "From": [datetime.fromtimestamp(timestamps[-min(len(timestamps), 20)])],
+            "To": [datetime.fromtimestamp(timestamps[-1])],
             "CurrentPrice": [current_price],
             "RollingMean": [rolling_mean.iloc[-1]],
             "UpperBand": [upper_band.iloc[-1]],
@@ -110,9 +170,15 @@ class BTCStrategy:
             "Volatility": [volatility],
             "TradeAction": [trade_action],
         }
-        self.uti.export_to_csv(data, "BtcStraTesting.csv")
+        self.uti.export_to_csv(data, f"BtcStraTesting_{self.pair}.csv")
         return data
 
+    def backtest(self, start_date, end_date, **kwargs):
+        """Backtest the strategy over a date range, see Backtester for kwargs."""
+        return Backtester(self.config, **kwargs).run_range(
+            start_date, end_date, self.pair
+        )
+
     def test_strategy_over_periods(self, start_date, end_date, period_days=None):
         start_datetime = datetime.strptime(start_date, "%Y-%m-%d %H:%M:%S")
         end_datetime = datetime.strptime(end_date, "%Y-%m-%d %H:%M:%S")
@@ -120,6 +186,16 @@ class BTCStrategy:
         if period_days is None:
             period_days = (end_datetime - start_datetime).days
 
+        try:
+            result = self.backtest(start_date, end_date)
+        except ValueError:
+            self.log.info(
+                "test_strategy_over_periods",
+                "No trades found in the specified date range.",
+            )
+            return
+
+        frame = result.to_frame()
         current_start_datetime = start_datetime
 
         while current_start_datetime < end_datetime:
@@ -127,26 +203,88 @@ class BTCStrategy:
             if current_end_datetime > end_datetime:
                 current_end_datetime = end_datetime
 
-            current_start_date_str = current_start_datetime.strftime(
-                "%Y-%m-%d %H:%M:%S"
+            # Strategy state at the last trade of the current period
+            first, last = np.searchsorted(
+                result.timestamps,
+                [current_start_datetime.timestamp(), current_end_datetime.timestamp()],
+                side="right",
             )
-            current_end_date_str = current_end_datetime.strftime("%Y-%m-%d %H:%M:%S")
+            if last > first:
+                row = frame.iloc[last - 1]
+                data = {
+                    "From": [current_start_datetime],
+                    "To": [current_end_datetime],
+                    "CurrentPrice": [row["CurrentPrice"]],
+                    "RollingMean": [row["RollingMean"]],
+                    "UpperBand": [row["UpperBand"]],
+                    "LowerBand": [row["LowerBand"]],
+                    "NormalizedRSI": [row["NormalizedRSI"]],
+                    "Volatility": [row["Volatility"]],
+                    "TradeAction": ["BUY" if row["Position"] else "SELL"],
+                    "PeriodReturn": [
+                        result.equity[last - 1] / result.equity[max(first - 1, 0)] - 1
+                    ],
+                }
+                self.uti.export_to_csv(data, f"BtcStraTesting_{self.pair}.csv")
 
-            # Apply the strategy for the current period
             self.log.info(
                 "test_strategy_over_periods",
-                f"Applying strategy from {current_start_date_str} to {current_end_date_str}",
+                f"Applied strategy from {current_start_datetime} to {current_end_datetime}",
             )
-            self.load_and_apply_strategy(current_start_date_str, current_end_date_str)
-
-            # Move to the next period
             current_start_datetime = current_end_datetime
 
+        self.log.info("test_strategy_over_periods", f"Backtest stats: {result.stats}")
+        return result
+
+    def get_execution_rate(self, trade_action, amount, default_rate, book=None):
+        """
+        Average rate of taking `amount` from the order book (the live one
+        if not given): the asks for a BUY, the bids for a SELL. Falls back
+        to default_rate when no book was received or it is too thin.
+        """
+        book = book or order_book_cache.get(self.pair)
+        if book is None:
+            return default_rate
+        side = book.ASK if trade_action == "BUY" else book.BID
+        rate = book.vwap(side, amount)
+        return default_rate if rate is None else rate
+
+    def paper_trade(self, trade_action):
+        """Hold ORDER_AMOUNT on the paper account after a BUY, nothing after a SELL."""
+        account = paper_engine.get_account(self.account)
+        if account.get_open_orders(self.pair):
+            return
+        position = account.get_position(self.pair).amount
+        if trade_action == "BUY" and position <= 0:
+            amount = float(ORDER_AMOUNT) - position
+            paper_engine.place_order(self.account, self.pair, "buy", amount)
+        elif trade_action == "SELL" and position > 0:
+            paper_engine.place_order(self.account, self.pair, "sell", position)
+
     def create_order_simulation(self):
-        last_order = Order.objects.order_by("-created_at").first()
-        strategy_result = self.execute_strategy()
+        return self.evaluate(self.load_snapshot())
+
+    def evaluate(self, snapshot):
+        """
+        Simulate an order when the trade action flips; StrategyRegistry entry point.
+
+        Returns:
+            :The strategy result, None without enough data
+        """
+        last_order = snapshot.last_order
+        strategy_result = self.execute_strategy(snapshot)
+        if strategy_result is None:
+            return
         trade_action = strategy_result.get("TradeAction")[0]
-        current_price = strategy_result.get("CurrentPrice")[0]
+        if self.account is not None:
+            self.paper_trade(trade_action)
+            return strategy_result
+        current_price = self.get_execution_rate(
+            trade_action,
+            float(ORDER_AMOUNT),
+            strategy_result.get("CurrentPrice")[0],
+            snapshot.order_book,
+        )
 
         self.log.info(
             "create_order_simulation",
@@ -159,15 +297,15 @@ class BTCStrategy:
             elif last_order.order_type == "SELL" and trade_action == "BUY":
                 new_order_type = "BUY"
             else:
-                return
+                return strategy_result
             new_order = Order(
                 order_type=new_order_type,
                 rate=current_price,
                 id="utx_simulation",
-                amount="0.05",
+                amount=ORDER_AMOUNT,
                 time_in_force="utx_simulation",
                 stop_loss_rate=None,
-                pair="btc_jpy",
+                pair=self.pair,
             )
             new_order.save()
 
@@ -177,9 +315,14 @@ class BTCStrategy:
                 order_type=new_order_type,
                 rate=current_price,
                 id="utx_simulation",
-                amount="0.05",
+                amount=ORDER_AMOUNT,
                 time_in_force="utx_simulation",
                 stop_loss_rate=None,
-                pair="btc_jpy",
+                pair=self.pair,
             )
             new_order.save()
+        return strategy_result
+
+
+price_history_cache.add_listener(BTCStrategy.update_indicator_engines)
+strategy_registry.register("btc_bollinger", BTCStrategy)
@@ -1,3 +1,7 @@
+import math
+from collections import deque
+
+
 class Indexes:
 
     def calculate_bollinger_bands(
@@ -23,3 +27,200 @@ class Indexes:
     def calculate_price_volatility(self, rates):
         volatility = rates.std()
         return volatility
+
+
+class RollingStats:
+    """
+    Mean and sample variance of the last `window` values, updated in O(1)
+    per value with Welford's algorithm (add the new value, remove the
+    value leaving the window).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    @property
+    def is_ready(self):
+        return self.count >= self.window
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def update(self, value):
+        self.values.append(value)
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.count > self.window:
+            oldest = self.values.popleft()
+            delta = oldest - self.mean
+            self.mean -= delta / self.count
+            self.m2 = max(self.m2 - delta * (oldest - self.mean), 0.0)
+        return self
+
+    def snapshot(self):
+        return {
+            "window": self.window,
+            "values": list(self.values),
+            "mean": self.mean,
+            "m2": self.m2,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        stats = cls(snapshot["window"])
+        stats.values = deque(snapshot["values"])
+        stats.mean = snapshot["mean"]
+        stats.m2 = snapshot["m2"]
+        return stats
+
+
+class WilderRSI:
+    """
+    Relative Strength Index with Wilder smoothing, updated in O(1) per value.
+    The first `period` price changes seed the averages with a simple mean.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.last_price = None
+        self.count = 0
+        self.average_gain = 0.0
+        self.average_loss = 0.0
+
+    @property
+    def is_ready(self):
+        return self.count >= self.period
+
+    @property
+    def rsi(self):
+        if not self.is_ready:
+            return float("nan")
+        if self.average_loss == 0:
+            return 100.0
+        rs = self.average_gain / self.average_loss
+        return 100 - (100 / (1 + rs))
+
+    @property
+    def normalized_rsi(self):
+        return (self.rsi - 50) * 0.02
+
+    def update(self, price):
+        if self.last_price is not None:
+            change = price - self.last_price
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self.count += 1
+            if self.count <= self.period:
+                self.average_gain += (gain - self.average_gain) / self.count
+                self.average_loss += (loss - self.average_loss) / self.count
+            else:
+                self.average_gain += (gain - self.average_gain) / self.period
+                self.average_loss += (loss - self.average_loss) / self.period
+        self.last_price = price
+        return self
+
+    def snapshot(self):
+        return {
+            "period": self.period,
+            "last_price": self.last_price,
+            "count": self.count,
+            "average_gain": self.average_gain,
+            "average_loss": self.average_loss,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        rsi = cls(snapshot["period"])
+        rsi.last_price = snapshot["last_price"]
+        rsi.count = snapshot["count"]
+        rsi.average_gain = snapshot["average_gain"]
+        rsi.average_loss = snapshot["average_loss"]
+        return rsi
+
+
+class StreamingIndexes:
+    """
+    Incremental counterpart of Indexes: Bollinger bands, normalized RSI and
+    price volatility are kept up to date one rate at a time, so the cost of
+    a new trade does not depend on the window sizes.
+    The state can be saved with snapshot() and restored with from_snapshot().
+    """
+
+    def __init__(
+        self,
+        moving_average_window=20,
+        std_dev_multiplier=2,
+        rsi_period=14,
+        volatility_window=200,
+    ):
+        self.std_dev_multiplier = std_dev_multiplier
+        self.bands = RollingStats(moving_average_window)
+        self.rsi = WilderRSI(rsi_period)
+        self.volatility_stats = RollingStats(volatility_window)
+        self.last_rate = None
+
+    def update(self, rate):
+        rate = float(rate)
+        self.bands.update(rate)
+        self.rsi.update(rate)
+        self.volatility_stats.update(rate)
+        self.last_rate = rate
+        return self
+
+    def update_many(self, rates):
+        for rate in rates:
+            self.update(rate)
+        return self
+
+    @property
+    def is_ready(self):
+        return self.bands.is_ready and self.rsi.is_ready
+
+    @property
+    def bollinger_bands(self):
+        """Return (rolling_mean, upper_band, lower_band) of the current window."""
+        if not self.bands.is_ready:
+            nan = float("nan")
+            return nan, nan, nan
+        mean = self.bands.mean
+        width = self.bands.std * self.std_dev_multiplier
+        return mean, mean + width, mean - width
+
+    @property
+    def normalized_rsi(self):
+        return self.rsi.normalized_rsi
+
+    @property
+    def volatility(self):
+        return self.volatility_stats.std
+
+    def snapshot(self):
+        return {
+            "std_dev_multiplier": self.std_dev_multiplier,
+            "bands": self.bands.snapshot(),
+            "rsi": self.rsi.snapshot(),
+            "volatility": self.volatility_stats.snapshot(),
+            "last_rate": self.last_rate,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        indexes = cls(std_dev_multiplier=snapshot["std_dev_multiplier"])
+        indexes.bands = RollingStats.from_snapshot(snapshot["bands"])
+        indexes.rsi = WilderRSI.from_snapshot(snapshot["rsi"])
+        indexes.volatility_stats = RollingStats.from_snapshot(snapshot["volatility"])
+        indexes.last_rate = snapshot["last_rate"]
+        return indexes
@@ -6,6 +6,8 @@ from django.core.management.base import BaseCommand
 from logger_util import UtxLogger as log
 from management.tasks import Tasks
 
+from apps.brokers.session_pool import close_sessions
+
 
 class Command(BaseCommand):
     help = "Run strategies as a background task"
@@ -15,7 +17,18 @@ class Command(BaseCommand):
             "--sleeping_seconds",
             type=int,
             default=5,
-            help="Number of seconds to sleep between iterations",
+            help="Default number of seconds between two runs of a task",
+        )
+        parser.add_argument(
+            "--tick_seconds",
+            type=float,
+            default=0.5,
+            help="Number of seconds between two checks for due tasks",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Stream trades and order books over the WebSocket API instead of polling them",
         )
 
     def __init__(self, *args, **kwargs):
@@ -29,17 +42,21 @@ class Command(BaseCommand):
         signal.signal(signal.SIGINT, self.handle_interrupt)
         self.stdout.write(self.style.SUCCESS("Successfully started batch processing."))
 
-        sleeping_seconds = options["sleeping_seconds"]
+        if options["stream"]:
+            self.tasks.start_streaming()
+        self.tasks.create_scheduler(options["sleeping_seconds"])
+        tick_seconds = options["tick_seconds"]
         while self._running:
-            self.execute_tasks(sleeping_seconds)
+            self.execute_tasks(tick_seconds)
+        self.tasks.close()
+        close_sessions()
 
-    def execute_tasks(self, sleeping_seconds):
+    def execute_tasks(self, tick_seconds):
         try:
-            self.tasks.run_all_tasks()
-            self.log_info(
-                f"Batch processing completed. Sleeping for {sleeping_seconds} seconds..."
-            )
-            time.sleep(sleeping_seconds)
+            started = self.tasks.run_pending_tasks()
+            if started:
+                self.log_info(f"Started {len(started)} due task(s).")
+            time.sleep(tick_seconds)
 
         except Exception as e:
             self.handle_exception(e)
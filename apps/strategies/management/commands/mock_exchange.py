@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from apps.brokers.async_coincheck_client import AsyncCoincheckClient
+from apps.brokers.config import BrokersConfig, coincheck_cfg
+from apps.simulation.mock_exchange import MarketReplay, MockExchange, benchmark
+
+
+class Command(BaseCommand):
+    help = "Serve a local stand-in of the Coincheck API from simulated or recorded data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--pairs",
+            nargs="+",
+            default=coincheck_cfg.pairs,
+            help="Defaults to the UTX_PAIRS list",
+        )
+        parser.add_argument(
+            "--steps", type=int, default=100_000, help="Simulated steps per pair"
+        )
+        parser.add_argument(
+            "--start_price", type=float, default=5_000_000, help="Simulated start price"
+        )
+        parser.add_argument(
+            "--replay_start",
+            help="Replay the trades stored from this date (%%Y-%%m-%%d %%H:%%M:%%S)",
+        )
+        parser.add_argument(
+            "--replay_end", help="Replay the trades stored until this date"
+        )
+        parser.add_argument(
+            "--steps_per_second",
+            type=float,
+            default=0,
+            help="Replay speed; 0 advances one step per ticker request",
+        )
+        parser.add_argument("--latency", type=float, default=0.0)
+        parser.add_argument("--jitter", type=float, default=0.0)
+        parser.add_argument("--max_requests_per_second", type=int, default=None)
+        parser.add_argument("--fee_rate", type=float, default=0.0)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument(
+            "--benchmark_requests",
+            type=int,
+            default=0,
+            help="Send this many ticker requests to the server, report the rate and exit",
+        )
+        parser.add_argument("--concurrency", type=int, default=100)
+
+    def handle(self, *args, **options):
+        exchange = MockExchange(
+            self.create_replays(options),
+            steps_per_second=options["steps_per_second"],
+            latency=options["latency"],
+            jitter=options["jitter"],
+            max_requests_per_second=options["max_requests_per_second"],
+            fee_rate=options["fee_rate"],
+            seed=options["seed"],
+        )
+        if options["benchmark_requests"]:
+            rate = asyncio.run(self.run_benchmark(exchange, options))
+            self.stdout.write(self.style.SUCCESS(f"{rate:.0f} requests per second"))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Mock exchange on http://{options['host']}:{options['port']}"
+            )
+        )
+        exchange.run(options["host"], options["port"])
+
+    def create_replays(self, options):
+        if options["replay_start"]:
+            start = datetime.strptime(options["replay_start"], "%Y-%m-%d %H:%M:%S")
+            end = datetime.strptime(options["replay_end"], "%Y-%m-%d %H:%M:%S")
+            return [
+                MarketReplay.from_db(pair, start, end, seed=options["seed"])
+                for pair in options["pairs"]
+            ]
+        return [
+            MarketReplay.simulate(
+                pair,
+                options["steps"],
+                start_price=options["start_price"],
+                seed=None if options["seed"] is None else options["seed"] + index,
+            )
+            for index, pair in enumerate(options["pairs"])
+        ]
+
+    async def run_benchmark(self, exchange, options):
+        base_url = await exchange.start(options["host"], options["port"])
+        config = BrokersConfig(
+            access_key="mock",
+            secret_access_key="mock",
+            base_url=base_url,
+            api_urls=coincheck_cfg.api_urls,
+            pool_size=options["concurrency"],
+        )
+        try:
+            async with AsyncCoincheckClient(config) as client:
+                return await benchmark(
+                    client,
+                    options["benchmark_requests"],
+                    options["concurrency"],
+                    options["pairs"][0],
+                )
+        finally:
+            await exchange.stop()
@@ -0,0 +1,50 @@
+import asyncio
+import signal
+
+from cache.bars import bar_aggregator
+from db_util import UtxDBService
+from django.core.management.base import BaseCommand
+from management.ingestion import MarketDataIngestor
+from models.bar import Bar
+
+from apps.brokers.config import coincheck_cfg
+
+
+class Command(BaseCommand):
+    help = "Stream trades and order books over the WebSocket API into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pairs",
+            nargs="+",
+            default=coincheck_cfg.pairs,
+            help="Defaults to the UTX_PAIRS list",
+        )
+        parser.add_argument(
+            "--max_batch", type=int, default=500, help="Rows per database write"
+        )
+        parser.add_argument(
+            "--max_delay",
+            type=float,
+            default=0.05,
+            help="Seconds a row may wait for its batch to fill",
+        )
+
+    def handle(self, *args, **options):
+        UtxDBService().create_models_tables()
+        bar_aggregator.add_listener(Bar.save_closed_bars)
+        asyncio.run(self.stream(options))
+        self.stdout.write(self.style.SUCCESS("Market data stream stopped."))
+
+    async def stream(self, options):
+        ingestor = MarketDataIngestor(
+            options["pairs"],
+            max_batch=options["max_batch"],
+            max_delay=options["max_delay"],
+        )
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(
+            signal.SIGINT, lambda: asyncio.ensure_future(ingestor.stop())
+        )
+        self.stdout.write(self.style.SUCCESS("Streaming market data."))
+        await ingestor.run()
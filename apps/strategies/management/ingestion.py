@@ -0,0 +1,231 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from math import inf
+
+from async_coincheck_client import AsyncCoincheckClient
+from cache.order_book import order_book_cache
+from coincheck_stream import CoincheckStream
+from django.utils import timezone
+from logger_util import UtxLogger as log
+from models.order_book_history import OrderBookStore
+from models.trade import Trade
+
+
+class AsyncBatchWriter:
+    """
+    Collects items on the event loop and writes them in batches on a
+    worker thread, so blocking ORM calls never stall the stream.
+
+    A batch is written once it holds max_batch items or its first item
+    waited max_delay seconds. put() waits while max_pending items are
+    queued, which pushes back on the producer instead of growing memory.
+    Batches are written in order by a single thread.
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, write, max_batch=500, max_delay=0.05, max_pending=10000):
+        self.write = write
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._queue = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.written = 0
+        self.failed_batches = 0
+        self.log = log(self.__class__.__name__)
+
+    @property
+    def queue(self):
+        # Created on first use so it belongs to the loop running the writer
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_pending)
+        return self._queue
+
+    async def put(self, item):
+        await self.queue.put(item)
+
+    async def put_many(self, items):
+        for item in items:
+            await self.queue.put(item)
+
+    async def next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch and batch[-1] is not self._CLOSE:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self.queue.get_nowait())
+        return batch
+
+    async def run(self):
+        """Write batches until close() is called and the queue is drained."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            closing = batch[-1] is self._CLOSE
+            items = batch[:-1] if closing else batch
+            if items:
+                try:
+                    await loop.run_in_executor(self.executor, self.write, items)
+                    self.written += len(items)
+                except Exception as e:
+                    self.failed_batches += 1
+                    self.log.error("run", f"Error writing {len(items)} items: {e}")
+            if closing:
+                break
+        self.executor.shutdown()
+
+    async def close(self):
+        await self.queue.put(self._CLOSE)
+
+
+class MarketDataIngestor:
+    """
+    Streams trades and order books from the exchange WebSocket into the
+    Trade table, order_book_cache and an OrderBookStore.
+
+    On every (re)connection the public trades and the order book of each
+    pair are fetched over REST: trades missed while disconnected are
+    backfilled (Trade.create_trades_data skips the ones already stored)
+    and the order book diffs are applied on top of a fresh snapshot. A
+    jump in the trade ids of a pair (detect_id_gaps) is backfilled the
+    same way, at most once per min_backfill_interval seconds.
+
+    Order book diffs update order_book_cache as they arrive; trades and
+    order book rows go to the database through AsyncBatchWriters, with
+    write_trades and write_order_books replacing the default writers.
+    """
+
+    def __init__(
+        self,
+        pairs,
+        rest_client=None,
+        order_book_store=None,
+        write_trades=None,
+        write_order_books=None,
+        detect_id_gaps=True,
+        min_backfill_interval=1.0,
+        max_batch=500,
+        max_delay=0.05,
+        **stream_kwargs,
+    ):
+        self.pairs = pairs
+        self.rest_client = rest_client or AsyncCoincheckClient()
+        self.order_book_store = order_book_store or OrderBookStore()
+        self.detect_id_gaps = detect_id_gaps
+        self.min_backfill_interval = min_backfill_interval
+        self.last_backfills = {}
+        self.trade_writer = AsyncBatchWriter(
+            write_trades or self.write_trades, max_batch, max_delay
+        )
+        self.order_book_writer = AsyncBatchWriter(
+            write_order_books or self.write_order_books, max_batch, max_delay
+        )
+        self.stream = CoincheckStream(
+            pairs, self, self.rest_client.config, **stream_kwargs
+        )
+        self.last_trade_ids = {}
+        self.gaps = 0
+        self.log = log(self.__class__.__name__)
+
+    async def run(self):
+        writers = [
+            asyncio.ensure_future(self.trade_writer.run()),
+            asyncio.ensure_future(self.order_book_writer.run()),
+        ]
+        try:
+            await self.stream.run()
+        finally:
+            await self.trade_writer.close()
+            await self.order_book_writer.close()
+            await asyncio.gather(*writers)
+            await self.rest_client.close()
+
+    async def stop(self):
+        await self.stream.stop()
+
+    @staticmethod
+    def write_trades(trades):
+        Trade.create_trades_data({"data": trades})
+
+    def write_order_books(self, records):
+        for is_snapshot, pair, data, timestamp in records:
+            if is_snapshot:
+                self.order_book_store.record(pair, data, timestamp)
+            else:
+                self.order_book_store.record_diff(
+                    pair, data.get("asks", ()), data.get("bids", ()), timestamp
+                )
+        self.order_book_store.flush()
+
+    # CoincheckStream handler
+    async def on_connect(self):
+        await asyncio.gather(
+            *(self.backfill_trades(pair, force=True) for pair in self.pairs),
+            *(self.sync_order_book(pair) for pair in self.pairs),
+        )
+
+    async def on_trades(self, pair, trades):
+        last_id = self.last_trade_ids.get(pair)
+        if last_id is not None:
+            trades = [trade for trade in trades if trade["id"] > last_id]
+            if not trades:
+                return
+            if self.detect_id_gaps and trades[0]["id"] > last_id + 1:
+                self.gaps += 1
+                self.log.warning(
+                    "on_trades",
+                    f"{pair} trade ids jumped from {last_id} to {trades[0]['id']}",
+                )
+                if await self.backfill_trades(pair):
+                    last_id = self.last_trade_ids[pair]
+                    trades = [trade for trade in trades if trade["id"] > last_id]
+        await self.add_trades(pair, trades)
+
+    async def on_order_book(self, pair, data):
+        timestamp = timezone.now()
+        order_book_cache.apply_diff(
+            pair, data.get("asks", ()), data.get("bids", ()), timestamp
+        )
+        await self.order_book_writer.put((False, pair, data, timestamp))
+
+    # REST backfill
+    async def add_trades(self, pair, trades):
+        if trades:
+            last_id = self.last_trade_ids.get(pair, 0)
+            self.last_trade_ids[pair] = max(last_id, trades[-1]["id"])
+            await self.trade_writer.put_many(trades)
+
+    async def backfill_trades(self, pair, force=False):
+        """Fetch the recent public trades of a pair; False when throttled or failed."""
+        loop = asyncio.get_running_loop()
+        last_backfill = self.last_backfills.get(pair, -inf)
+        if not force and loop.time() - last_backfill < self.min_backfill_interval:
+            return False
+        self.last_backfills[pair] = loop.time()
+        res = await self.rest_client.get_public_trades(pair)
+        if "error" in res:
+            return False
+        trades = sorted(res.get("data", []), key=lambda trade: trade["id"])
+        last_id = self.last_trade_ids.get(pair)
+        if last_id is not None:
+            trades = [trade for trade in trades if trade["id"] > last_id]
+        await self.add_trades(pair, trades)
+        return True
+
+    async def sync_order_book(self, pair):
+        res = await self.rest_client.get_order_books(pair)
+        if "error" in res:
+            return
+        timestamp = timezone.now()
+        order_book_cache.update(pair, res, timestamp)
+        await self.order_book_writer.put((True, pair, res, timestamp))
@@ -0,0 +1,202 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import partial
+
+from logger_util import UtxLogger as log
+
+
+def scheduled(interval=None, depends_on=(), group="default", per_pair=False):
+    """
+    Declare a Tasks method as a scheduled task.
+
+    Parameters:
+        :interval Seconds between two runs (None uses the scheduler default).
+        :depends_on Names of tasks that must finish before each run.
+        :group Concurrency group; tasks of a group share its worker limit.
+        :per_pair One task per pair, named "{name}:{pair}", calling the
+            method with the pair. It depends on the same pair's task of a
+            per-pair dependency; other tasks depend on every pair's task.
+    """
+
+    def decorator(method):
+        method.schedule = TaskSchedule(interval, tuple(depends_on), group, per_pair)
+        return method
+
+    return decorator
+
+
+@dataclass(frozen=True)
+class TaskSchedule:
+    interval: float = None
+    depends_on: tuple = ()
+    group: str = "default"
+    per_pair: bool = False
+
+
+@dataclass
+class ScheduledTask:
+    name: str
+    func: object
+    interval: float
+    depends_on: tuple = ()
+    group: str = "default"
+    last_started: float = None
+    last_finished: float = None
+    run_count: int = 0
+    running: bool = False
+
+
+class TaskScheduler:
+    """
+    Run tasks concurrently, each on its own interval.
+
+    A task is due when its interval has elapsed, it is not already running,
+    every dependency has finished since the task last started and its group
+    has a free slot. Due tasks are submitted to a thread pool, so a slow task
+    never delays the others.
+    """
+
+    def __init__(self, tasks, group_limits=None, max_workers=None):
+        self.log = log(self.__class__.__name__)
+        self.tasks = {task.name: task for task in tasks}
+        self.group_limits = group_limits or {}
+        self.group_running = {}
+        self.lock = threading.Lock()
+        self.validate_dependencies()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(len(self.tasks), 1),
+            thread_name_prefix="utx-task",
+        )
+
+    @classmethod
+    def from_object(cls, obj, default_interval, pairs=(), **kwargs):
+        """Build a scheduler from the @scheduled methods of obj."""
+        schedules = {}
+        for name in dir(obj):
+            method = getattr(obj, name)
+            schedule = getattr(method, "schedule", None)
+            if callable(method) and isinstance(schedule, TaskSchedule):
+                schedules[name] = (method, schedule)
+
+        def task_names(name, pair=None):
+            if not schedules.get(name, (None, TaskSchedule()))[1].per_pair:
+                return [name]
+            return [f"{name}:{pair}"] if pair else [f"{name}:{p}" for p in pairs]
+
+        tasks = []
+        for name, (method, schedule) in schedules.items():
+            interval = (
+                default_interval if schedule.interval is None else schedule.interval
+            )
+            for pair in pairs if schedule.per_pair else [None]:
+                depends_on = tuple(
+                    task_name
+                    for dependency in schedule.depends_on
+                    for task_name in task_names(dependency, pair)
+                )
+                tasks.append(
+                    ScheduledTask(
+                        name=task_names(name, pair)[0],
+                        func=partial(method, pair) if pair else method,
+                        interval=interval,
+                        depends_on=depends_on,
+                        group=schedule.group,
+                    )
+                )
+        return cls(tasks, **kwargs)
+
+    def validate_dependencies(self):
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected at task: {name}")
+            visiting.add(name)
+            for dependency in self.tasks[name].depends_on:
+                if dependency not in self.tasks:
+                    raise ValueError(
+                        f"Task {name} depends on unknown task: {dependency}"
+                    )
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.tasks:
+            visit(name)
+
+    def group_has_slot(self, group):
+        limit = self.group_limits.get(group)
+        return limit is None or self.group_running.get(group, 0) < limit
+
+    def dependencies_ready(self, task):
+        for dependency in map(self.tasks.get, task.depends_on):
+            if dependency.last_finished is None:
+                return False
+            if task.last_started is not None and (
+                dependency.last_finished < task.last_started
+            ):
+                return False
+        return True
+
+    def is_due(self, task, now):
+        if task.running or not self.group_has_slot(task.group):
+            return False
+        if task.last_started is not None and now - task.last_started < task.interval:
+            return False
+        return self.dependencies_ready(task)
+
+    def submit(self, task):
+        task.running = True
+        task.last_started = time.monotonic()
+        self.group_running[task.group] = self.group_running.get(task.group, 0) + 1
+        return self.executor.submit(self.execute, task)
+
+    def execute(self, task):
+        try:
+            task.func()
+        except Exception as e:
+            self.log.error(task.name, f"Error: {str(e)}")
+        finally:
+            with self.lock:
+                task.running = False
+                task.last_finished = time.monotonic()
+                task.run_count += 1
+                self.group_running[task.group] -= 1
+
+    def run_pending(self):
+        """Submit every due task and return immediately."""
+        futures = []
+        with self.lock:
+            now = time.monotonic()
+            for task in self.tasks.values():
+                if self.is_due(task, now):
+                    futures.append(self.submit(task))
+        return futures
+
+    def run_once(self):
+        """Run every task once, in dependency order, and wait for all of them."""
+        pending = set(self.tasks)
+        finished = set()
+        futures = {}
+        while pending or futures:
+            with self.lock:
+                for name in sorted(pending):
+                    task = self.tasks[name]
+                    ready = set(task.depends_on) <= finished
+                    if ready and not task.running and self.group_has_slot(task.group):
+                        futures[self.submit(task)] = name
+                        pending.discard(name)
+            if not futures:
+                # Only reachable if a task is still running from run_pending
+                time.sleep(0.01)
+                continue
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished.add(futures.pop(future))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -1,10 +1,33 @@
-import inspect
+import asyncio
+import os
+import threading
 
+from async_coincheck_client import AsyncCoincheckClient
+from batch_util import batch_writer
 from btc_strategy import BTCStrategy
+from cache.bars import bar_aggregator
+from cache.order_book import order_book_cache
 from coincheck_client import CoincheckClient
+from db_util import UtxDBService
 from logger_util import UtxLogger as log
+from management.ingestion import MarketDataIngestor
+from management.scheduler import TaskScheduler, scheduled
+from models.bar import Bar
+from models.order_book_history import OrderBookStore
 from models.ticker import Ticker
 from models.trade import Trade
+from order_manager import OrderManager
+from paper_trading import paper_engine
+from registry import strategy_registry
+
+from apps.brokers.config import coincheck_cfg
+
+DEFAULT_INTERVAL = 5
+PARTITION_MAINTENANCE_INTERVAL = 3600
+ORDER_RECONCILE_INTERVAL = 10
+# Maximum number of tasks of a group running at the same time: requests are
+# bounded by the client connection pool, strategy evaluations by the cores
+GROUP_LIMITS = {"io": coincheck_cfg.pool_size, "strategy": os.cpu_count() or 1}
 
 
 def log_task(method):
@@ -18,6 +41,7 @@ def log_task(method):
             task.log.error(f"{method.__name__}", f"{str(e)}")
             pass
 
+    wrapper.__name__ = method.__name__
     return wrapper
 
 
@@ -25,39 +49,131 @@ class Tasks:
     def __init__(self):
         self.log = log(self.__class__.__name__)
         self.coincheck = CoincheckClient()
+        self.async_coincheck = AsyncCoincheckClient()
+        # One loop for the lifetime of the tasks so the async client keeps its
+        # connections. It runs on its own thread so the per-pair tasks share it.
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(
+            target=self.loop.run_forever, name="async-client", daemon=True
+        )
+        self.loop_thread.start()
+        self.pairs = coincheck_cfg.pairs
+        self.order_manager = OrderManager(self.async_coincheck)
+        self.order_book_store = OrderBookStore(flush_size=12)
+        self.scheduler = None
+        # Persist the bars built from the ingested trades
+        bar_aggregator.add_listener(Bar.save_closed_bars)
+        self.ingestor = None
+        self.stream_loop = None
+        self.stream_thread = None
+
+    def create_scheduler(self, default_interval=DEFAULT_INTERVAL):
+        self.scheduler = TaskScheduler.from_object(
+            self, default_interval, pairs=self.pairs, group_limits=GROUP_LIMITS
+        )
+        return self.scheduler
 
     def run_all_tasks(self):
-        this_method = "run_all_tasks"
-        method_names = [
-            method_name
-            for method_name in dir(self)
-            if callable(getattr(self, method_name)) and not method_name.startswith("_")
-        ]
-        for method_name in method_names:
-            method = getattr(self, method_name)
-            if method_name != this_method:
-                try:
-                    method()
-                except Exception as e:
-                    self.log.error(f"{method_name}", f"Error: {str(e)}")
-                    pass
+        """Run every scheduled task once, respecting dependencies."""
+        (self.scheduler or self.create_scheduler()).run_once()
 
-    @log_task
-    def create_ticker_data(self):
-        res = self.coincheck.get_ticker()
-        Ticker.create_ticker_data(res)
+    def run_pending_tasks(self):
+        """Start the tasks that are due and return without waiting for them."""
+        return (self.scheduler or self.create_scheduler()).run_pending()
+
+    def run_async(self, coroutine):
+        """Run a coroutine on the client loop from any task thread."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def start_streaming(self, **kwargs):
+        """
+        Stream trades and order books over the WebSocket API on a background
+        thread. create_market_data then only polls the tickers.
+        """
+        self.ingestor = MarketDataIngestor(
+            self.pairs, order_book_store=self.order_book_store, **kwargs
+        )
+        self.stream_loop = asyncio.new_event_loop()
+        self.stream_thread = threading.Thread(
+            target=self.stream_loop.run_until_complete,
+            args=(self.ingestor.run(),),
+            name="market-data-stream",
+            daemon=True,
+        )
+        self.stream_thread.start()
 
+    def stop_streaming(self):
+        if self.stream_thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(
+            self.ingestor.stop(), self.stream_loop
+        ).result()
+        self.stream_thread.join()
+        self.stream_loop.close()
+        self.stream_thread = None
+
+    def close(self):
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        self.stop_streaming()
+        self.order_book_store.flush()
+        strategy_registry.shutdown()
+        batch_writer.close()
+        self.run_async(self.async_coincheck.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+
+    @scheduled(group="io", per_pair=True)
     @log_task
-    def create_trades_data(self):
-        res = self.coincheck.get_public_trades()
-        Trade.create_trades_data(res)
+    def create_market_data(self, pair):
+        # Trades and order books come from the stream while it runs
+        polling = self.stream_thread is None
+        res = self.run_async(
+            self.async_coincheck.get_market_data(
+                [pair], order_books=polling, trades=polling
+            )
+        )
+        # Written behind by batch_writer so polling never waits on the commit
+        Ticker.create_ticker_data(res["tickers"][pair], buffered=True)
+        if not polling:
+            return
+        order_book = res["order_books"][pair]
+        if "error" not in order_book:
+            order_book_cache.update(pair, order_book)
+            self.order_book_store.record(pair, order_book)
+        inserted = Trade.create_trades_data(res["trades"][pair])
+        self.log.info(
+            "create_market_data",
+            f"{pair} trades inserted: {inserted['inserted']}, skipped: {inserted['skipped']}",
+        )
 
+    @scheduled(depends_on=("create_market_data",), group="strategy", per_pair=True)
     @log_task
-    def run_strategies(self):
-        btcs = BTCStrategy()
-        btcs.create_order_simulation()
-        # btcs.execute_strategy()
+    def run_strategies(self, pair):
+        # Fill the paper orders of the last cycle against the book just received;
+        # the trades fill resting ones as they are inserted (Trade listener)
+        if paper_engine.accounts:
+            paper_engine.update_from_cache(pair)
+        # Every registered strategy (BTCStrategy registers itself) on one snapshot
+        strategy_registry.run(pair)
+        # btcs = BTCStrategy(pair=pair)
         # btcs.load_and_apply_strategy()
         # btcs.test_strategy_over_periods("2024-02-08 18:24:30", "2024-02-14 14:18:03", 1)
 
-    # add more task methods here
+    @scheduled(interval=PARTITION_MAINTENANCE_INTERVAL, group="io")
+    @log_task
+    def maintain_partitions(self):
+        UtxDBService().maintain_partitions()
+
+    @scheduled(interval=ORDER_RECONCILE_INTERVAL, group="io")
+    @log_task
+    def reconcile_orders(self):
+        # Private requests need the API keys
+        if not self.async_coincheck.api_key:
+            return
+        # Orders closed by the last sweep stay readable until this one
+        self.order_manager.forget_closed()
+        self.run_async(self.order_manager.reconcile())
+
+    # add more task methods here, declared with @scheduled
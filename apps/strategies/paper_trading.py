@@ -0,0 +1,411 @@
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from cache.order_book import L2OrderBook, order_book_cache
+from models.paper_fill import PaperFill
+from models.trade import Trade
+
+from apps.simulation.mock_exchange import walk_book
+
+# Fills kept in memory per account, older ones are only in the database
+FILL_HISTORY = 10000
+
+
+@dataclass
+class PaperOrder:
+    """
+    Simulated order. Market orders have no rate; they take what the book
+    holds when they arrive and the rest is cancelled. Limit orders rest
+    until filled or cancelled.
+    """
+
+    id: int
+    pair: str
+    side: str
+    amount: float
+    rate: float = None
+    created_at: float = 0.0
+    # Time the order reaches the simulated exchange, after the latency
+    active_at: float = 0.0
+    pending_amount: float = None
+    status: str = "pending"
+    # {price: size} the order already took from the levels within its rate
+    taken: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.pending_amount is None:
+            self.pending_amount = self.amount
+
+    @property
+    def is_open(self):
+        return self.status in ("pending", "open")
+
+
+@dataclass
+class Fill:
+    account: str
+    order_id: int
+    pair: str
+    side: str
+    rate: float
+    amount: float
+    fee: float
+    liquidity: str
+    timestamp: float
+
+
+@dataclass
+class Position:
+    """
+    Position of a pair, updated with every fill at average cost: amount is
+    positive when long and negative when short.
+    """
+
+    amount: float = 0.0
+    average_rate: float = 0.0
+    realized_pnl: float = 0.0
+    fees: float = 0.0
+
+    def apply(self, side, rate, amount, fee):
+        signed = amount if side == "buy" else -amount
+        if self.amount * signed >= 0:
+            total = abs(self.amount) + amount
+            self.average_rate = (
+                self.average_rate * abs(self.amount) + rate * amount
+            ) / total
+        else:
+            closed = min(amount, abs(self.amount))
+            direction = 1.0 if self.amount > 0 else -1.0
+            self.realized_pnl += closed * (rate - self.average_rate) * direction
+            if amount > closed:
+                # Flipped to the other side at this fill's rate
+                self.average_rate = rate
+        self.amount += signed
+        if abs(self.amount) <= 1e-12:
+            self.amount, self.average_rate = 0.0, 0.0
+        self.fees += fee
+
+    def unrealized_pnl(self, mark):
+        return self.amount * (mark - self.average_rate) if mark is not None else 0.0
+
+
+@dataclass
+class PaperAccount:
+    """
+    Orders, positions and PnL of one simulated account.
+
+    Parameters:
+        :taker_fee_rate Fee of the fills that take liquidity, as a fraction
+            of the traded value.
+        :maker_fee_rate Fee of the fills of resting orders by trades.
+        :slippage Fraction by which taker fills are worse than the levels
+            they take, for the impact the book snapshot does not show.
+        :latency Seconds before an order reaches the book.
+    """
+
+    name: str
+    cash: float = 0.0
+    taker_fee_rate: float = 0.0
+    maker_fee_rate: float = 0.0
+    slippage: float = 0.0
+    latency: float = 0.0
+    orders: dict = field(default_factory=dict)
+    positions: dict = field(default_factory=dict)
+    fills: deque = field(default_factory=lambda: deque(maxlen=FILL_HISTORY))
+
+    def get_position(self, pair):
+        position = self.positions.get(pair)
+        if position is None:
+            position = self.positions[pair] = Position()
+        return position
+
+    def get_open_orders(self, pair=None):
+        return [
+            order
+            for order in self.orders.values()
+            if order.is_open and (pair is None or order.pair == pair)
+        ]
+
+    def get_pnl(self, marks):
+        """Realized, unrealized and net PnL (after fees) at the given rates per pair."""
+        realized = sum(position.realized_pnl for position in self.positions.values())
+        unrealized = sum(
+            position.unrealized_pnl(marks.get(pair))
+            for pair, position in self.positions.items()
+        )
+        fees = sum(position.fees for position in self.positions.values())
+        return {
+            "realized": realized,
+            "unrealized": unrealized,
+            "fees": fees,
+            "net": realized + unrealized - fees,
+        }
+
+    def get_equity(self, marks):
+        """Cash plus the positions valued at the given rates per pair."""
+        return self.cash + sum(
+            position.amount * marks.get(pair, position.average_rate)
+            for pair, position in self.positions.items()
+        )
+
+    def match(self, order, asks, bids, timestamp):
+        """
+        Fill an order against (price, size) levels, best first.
+
+        The books are not consumed, so an order only takes the size a level
+        gained since the order last saw it. Fills against the book take
+        liquidity, including those of a resting order the book crossed.
+        """
+        levels = asks if order.side == "buy" else bids
+        available = []
+        taken = {}
+        for price, size in levels:
+            if order.rate is not None and (
+                price > order.rate if order.side == "buy" else price < order.rate
+            ):
+                break
+            # A level that shrank counts at most its size as already taken
+            taken[price] = min(order.taken.get(price, 0.0), size)
+            if size > taken[price]:
+                available.append((price, size - taken[price]))
+        factor = 1 + self.slippage if order.side == "buy" else 1 - self.slippage
+        fills = []
+        for price, amount in walk_book(
+            available, order.side, amount=order.pending_amount
+        ):
+            taken[price] += amount
+            fills.append(self.execute(order, price * factor, amount, True, timestamp))
+        order.taken = taken
+        self.update_status(order)
+        return fills
+
+    def match_trade(self, order, rate, amount, timestamp):
+        """
+        Fill a resting order as maker, at its own rate, from a trade printed
+        through that rate.
+        """
+        if order.side == "buy" and rate >= order.rate:
+            return None
+        if order.side == "sell" and rate <= order.rate:
+            return None
+        fill = self.execute(
+            order, order.rate, min(amount, order.pending_amount), False, timestamp
+        )
+        self.update_status(order)
+        return fill
+
+    @staticmethod
+    def update_status(order):
+        if order.pending_amount <= 1e-12:
+            order.status = "filled"
+        elif order.rate is None:
+            # Market orders never rest; what the book could not fill is dropped
+            order.status = "cancelled"
+        else:
+            order.status = "open"
+
+    def execute(self, order, price, amount, taker, timestamp):
+        value = price * amount
+        fee = value * (self.taker_fee_rate if taker else self.maker_fee_rate)
+        self.cash += (-value if order.side == "buy" else value) - fee
+        self.get_position(order.pair).apply(order.side, price, amount, fee)
+        order.pending_amount -= amount
+        fill = Fill(
+            self.name,
+            order.id,
+            order.pair,
+            order.side,
+            price,
+            amount,
+            fee,
+            "T" if taker else "M",
+            timestamp,
+        )
+        self.fills.append(fill)
+        return fill
+
+
+class PaperTradingEngine:
+    """
+    In-process paper trading for any number of accounts.
+
+    Orders are matched against the order books passed to on_book(), the
+    live ones from order_book_cache or replayed ones, without consuming
+    their liquidity, so the accounts do not affect each other. An order
+    is matched on the first book at or after its created_at + latency;
+    it takes liquidity up to its rate (partial fills when the book is
+    thin), and the remainder of a limit order rests. A resting order
+    takes the liquidity later books add at or through its rate, and is
+    filled as maker by the trades passed to on_trades() that print
+    through its rate. paper_engine gets the trades this process inserts
+    with Trade.create_trades_data, polled by Tasks or streamed by its
+    stream thread; a stream_market_data process of its own does not
+    feed it.
+
+    Positions and PnL are updated incrementally with every fill. With
+    persist, fills are written in batches as PaperFill rows by
+    batch_writer, so many accounts cost no database round trips.
+    """
+
+    def __init__(self, persist=True, clock=time.time):
+        self.persist = persist
+        self.clock = clock
+        self.accounts = {}
+        self.marks = {}
+        self.order_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def add_account(self, name, **kwargs):
+        """Create an account, see PaperAccount for the fee, slippage and latency kwargs."""
+        with self.lock:
+            if name in self.accounts:
+                raise ValueError(f"Paper account {name} already exists")
+            account = self.accounts[name] = PaperAccount(name, **kwargs)
+        return account
+
+    def get_account(self, name):
+        with self.lock:
+            account = self.accounts.get(name)
+            if account is None:
+                account = self.accounts[name] = PaperAccount(name)
+            return account
+
+    def place_order(self, account, pair, side, amount, rate=None, timestamp=None):
+        """Queue an order of an account; rate None for a market order."""
+        if side not in ("buy", "sell"):
+            raise ValueError(f"Invalid side: {side}")
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        with self.lock:
+            account = self.accounts[account]
+            created_at = self.clock() if timestamp is None else timestamp
+            order = PaperOrder(
+                id=next(self.order_ids),
+                pair=pair,
+                side=side,
+                amount=float(amount),
+                rate=None if rate is None else float(rate),
+                created_at=created_at,
+                active_at=created_at + account.latency,
+            )
+            account.orders[order.id] = order
+        return order
+
+    def cancel_order(self, account, order_id):
+        with self.lock:
+            order = self.accounts[account].orders[order_id]
+            if not order.is_open:
+                raise ValueError(f"The order {order_id} is not open")
+            order.status = "cancelled"
+        return order
+
+    def on_book(self, pair, asks, bids, timestamp=None):
+        """
+        Match the open orders of every account on a pair against a book.
+
+        Parameters:
+            :asks, bids (price, size) levels, best first.
+        Returns:
+            :Fills of this book
+        """
+        timestamp = self.clock() if timestamp is None else timestamp
+        fills = []
+        with self.lock:
+            if len(asks) and len(bids):
+                self.marks[pair] = (asks[0][0] + bids[0][0]) / 2
+            for account in self.accounts.values():
+                for order in account.get_open_orders(pair):
+                    if order.active_at <= timestamp:
+                        fills += account.match(order, asks, bids, timestamp)
+        if fills and self.persist:
+            PaperFill.save_fills(fills)
+        return fills
+
+    def on_trades(self, pair, trades, timestamp=None):
+        """
+        Fill the resting orders of every account on a pair from trades.
+
+        Parameters:
+            :trades (rate, amount) of the trades, oldest first. A trade
+                fills at most its amount of the orders of each account,
+                best priced orders first.
+        Returns:
+            :Fills of these trades
+        """
+        timestamp = self.clock() if timestamp is None else timestamp
+        fills = []
+        with self.lock:
+            for account in self.accounts.values():
+                orders = [
+                    order
+                    for order in account.get_open_orders(pair)
+                    if order.status == "open"
+                ]
+                orders.sort(key=lambda o: -o.rate if o.side == "buy" else o.rate)
+                for rate, amount in trades:
+                    for order in orders:
+                        if amount <= 1e-12:
+                            break
+                        if not order.is_open:
+                            continue
+                        fill = account.match_trade(order, rate, amount, timestamp)
+                        if fill is not None:
+                            amount -= fill.amount
+                            fills.append(fill)
+        if fills and self.persist:
+            PaperFill.save_fills(fills)
+        return fills
+
+    def update_from_cache(self, pair, timestamp=None):
+        """Match against the live book of a pair in order_book_cache."""
+        book = order_book_cache.get_copy(pair)
+        if book is None:
+            return []
+        return self.on_book(
+            pair,
+            book.get_levels(L2OrderBook.ASK),
+            book.get_levels(L2OrderBook.BID),
+            timestamp,
+        )
+
+    def on_new_trades(self, pair, rates, amounts, timestamps):
+        """Trade listener: fill the resting orders from the trades just ingested."""
+        if not self.accounts or not len(rates):
+            return []
+        return self.on_trades(pair, list(zip(rates, amounts)), float(timestamps[-1]))
+
+    def on_replay(self, replay):
+        """Match against the book and the trades of the current step of a MarketReplay."""
+        asks, bids = replay.book
+        timestamp = float(replay.timestamp)
+        fills = self.on_book(replay.pair, asks.tolist(), bids.tolist(), timestamp)
+        step = replay.step
+        start = replay.trade_stops[step - 1] if step else 0
+        trades = zip(
+            replay.trades["rate"][start : replay.trade_stops[step]].tolist(),
+            replay.trades["amount"][start : replay.trade_stops[step]].tolist(),
+        )
+        return fills + self.on_trades(replay.pair, list(trades), timestamp)
+
+    def get_pnl(self, account):
+        with self.lock:
+            return self.accounts[account].get_pnl(self.marks)
+
+    def get_summary(self):
+        """{account: PnL and equity} of every account at the last marks."""
+        with self.lock:
+            return {
+                name: {
+                    **account.get_pnl(self.marks),
+                    "equity": account.get_equity(self.marks),
+                }
+                for name, account in self.accounts.items()
+            }
+
+
+paper_engine = PaperTradingEngine()
+# Trades polled or streamed by this process give the maker fills
+Trade.add_listener(paper_engine.on_new_trades)
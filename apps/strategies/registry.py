@@ -0,0 +1,201 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+from cache.bars import bar_aggregator
+from cache.order_book import order_book_cache
+from cache.price_history import price_history_cache
+from logger_util import UtxLogger as log
+from models.order import Order
+from models.trade import Trade
+
+
+@dataclass(frozen=True)
+class DataRequirements:
+    """
+    Market data a strategy reads from its MarketSnapshot.
+
+    Attributes:
+        :history Number of most recent trade rates and timestamps.
+        :bars Number of most recent bars per resolution, e.g. {"1m": 60}.
+        :book_depth Order book levels per side (0 for no book).
+        :last_order Whether the last order of the pair is loaded.
+    """
+
+    history: int = 0
+    bars: dict = field(default_factory=dict)
+    book_depth: int = 0
+    last_order: bool = False
+
+    @classmethod
+    def combine(cls, requirements):
+        """Smallest requirements covering all of the given ones."""
+        history, bars, book_depth, last_order = 0, {}, 0, False
+        for requirement in requirements:
+            history = max(history, requirement.history)
+            for resolution, n in requirement.bars.items():
+                bars[resolution] = max(bars.get(resolution, 0), n)
+            book_depth = max(book_depth, requirement.book_depth)
+            last_order = last_order or requirement.last_order
+        return cls(history, bars, book_depth, last_order)
+
+
+@dataclass
+class MarketSnapshot:
+    """
+    Market data of a pair at one point of a cycle, shared by every strategy
+    evaluated in it. The arrays are read-only and the order book is a copy,
+    so strategies running in parallel all see the same data.
+    """
+
+    pair: str
+    rates: np.ndarray
+    timestamps: np.ndarray
+    bars: dict
+    order_book: object = None
+    last_order: object = None
+
+    @property
+    def current_price(self):
+        return float(self.rates[-1]) if len(self.rates) else None
+
+    @staticmethod
+    def read_only(array):
+        array = np.array(array, dtype=np.float64)
+        array.flags.writeable = False
+        return array
+
+    @classmethod
+    def load(cls, pair, requirements):
+        """Read the required data from the in-process caches (and the database once)."""
+        rates = timestamps = np.empty(0)
+        if requirements.history:
+            if not price_history_cache.has_pair(pair):
+                rates, timestamps = Trade.get_recent_rates(pair, requirements.history)
+                price_history_cache.add_trades(pair, rates, timestamps)
+            rates, timestamps = price_history_cache.get_history(
+                pair, requirements.history
+            )
+        bars = {
+            resolution: cls.read_only(
+                bar_aggregator.get_bars(pair, resolution, n, include_current=True)
+            )
+            for resolution, n in requirements.bars.items()
+        }
+        order_book = None
+        if requirements.book_depth:
+            order_book = order_book_cache.get_copy(pair, requirements.book_depth)
+        last_order = None
+        if requirements.last_order:
+            last_order = Order.objects.filter(pair=pair).order_by("-created_at").first()
+        return cls(
+            pair,
+            cls.read_only(rates),
+            cls.read_only(timestamps),
+            bars,
+            order_book,
+            last_order,
+        )
+
+
+class StrategyRegistry:
+    """
+    Strategies evaluated by Tasks.run_strategies.
+
+    A strategy is registered with a factory called with the pair, e.g. a
+    class taking a `pair` keyword. Its instances keep their state between
+    cycles and provide:
+
+        requirements  DataRequirements of the strategy
+        evaluate(snapshot)  decide on a MarketSnapshot, returning any result
+
+    run(pair) loads one MarketSnapshot covering the requirements of all
+    the strategies of the pair and evaluates them on it in parallel, so
+    adding strategies does not add data loads. A strategy that raises is
+    logged and does not affect the others.
+
+    Workers are threads: the snapshot is shared without copying and the
+    strategies keep using the Django connections of their worker.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.factories = {}
+        self.instances = {}
+        self.executor = None
+        self.lock = threading.Lock()
+        self.log = log(self.__class__.__name__)
+
+    def register(self, name, factory, pairs=None):
+        """Register a strategy for the given pairs, or for every pair if None."""
+        with self.lock:
+            self.factories[name] = (factory, None if pairs is None else set(pairs))
+            for key in [key for key in self.instances if key[0] == name]:
+                del self.instances[key]
+
+    def unregister(self, name):
+        with self.lock:
+            self.factories.pop(name, None)
+            for key in [key for key in self.instances if key[0] == name]:
+                del self.instances[key]
+
+    def get_strategies(self, pair):
+        """{name: instance} of the strategies registered for a pair."""
+        strategies = {}
+        with self.lock:
+            for name, (factory, pairs) in self.factories.items():
+                if pairs is not None and pair not in pairs:
+                    continue
+                instance = self.instances.get((name, pair))
+                if instance is None:
+                    instance = self.instances[(name, pair)] = factory(pair=pair)
+                strategies[name] = instance
+        return strategies
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="strategy"
+                )
+            return self.executor
+
+    def run(self, pair):
+        """
+        Evaluate the strategies of a pair on one shared snapshot.
+
+        Returns:
+            :{name: result} of the strategies that did not raise
+        """
+        strategies = self.get_strategies(pair)
+        if not strategies:
+            return {}
+        snapshot = MarketSnapshot.load(
+            pair,
+            DataRequirements.combine(
+                strategy.requirements for strategy in strategies.values()
+            ),
+        )
+        executor = self.get_executor()
+        futures = {
+            name: executor.submit(strategy.evaluate, snapshot)
+            for name, strategy in strategies.items()
+        }
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                self.log.error("run", f"Strategy {name} failed on {pair}: {e}")
+        return results
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+strategy_registry = StrategyRegistry()
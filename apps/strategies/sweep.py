@@ -0,0 +1,127 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from backtest import Backtester
+from logger_util import UtxLogger as log
+from models.trade import Trade
+
+from apps.strategies.config import StrategiesConfig
+
+# Price arrays attached in each worker process by _attach_prices
+_worker_prices = {}
+
+
+def _attach_prices(shared_name, size, backtester_kwargs):
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    shared = shared_memory.SharedMemory(name=shared_name)
+    prices = np.ndarray((2, size), dtype=np.float64, buffer=shared.buf)
+    _worker_prices.update(
+        shared=shared, prices=prices, backtester_kwargs=backtester_kwargs
+    )
+
+
+def _run_combinations(combinations):
+    rates, timestamps = _worker_prices["prices"]
+    backtester_kwargs = _worker_prices["backtester_kwargs"]
+    results = []
+    for parameters in combinations:
+        backtester = Backtester(StrategiesConfig(**parameters), **backtester_kwargs)
+        stats = backtester.run(rates, timestamps).stats
+        results.append({**parameters, **stats})
+    return results
+
+
+class ParameterSweep:
+    """
+    Backtest every combination of StrategiesConfig parameters in a process pool.
+
+    The price history is copied once into shared memory; workers attach to
+    it instead of receiving the arrays with every task.
+
+    Example:
+        sweep = ParameterSweep(
+            {"moving_average_window": range(10, 200, 10), "rsi_period": [7, 14]},
+            fee_rate=0.001,
+        )
+        results = sweep.run_range("2024-02-01 00:00:00", "2024-03-01 00:00:00")
+    """
+
+    def __init__(
+        self,
+        parameter_ranges,
+        rank_by="TotalReturn",
+        max_workers=None,
+        chunk_size=16,
+        **backtester_kwargs,
+    ):
+        self.parameter_ranges = parameter_ranges
+        self.rank_by = rank_by
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.backtester_kwargs = backtester_kwargs
+        self.log = log(self.__class__.__name__)
+
+    def get_combinations(self):
+        defaults = StrategiesConfig().__dict__
+        unknown = set(self.parameter_ranges) - set(defaults)
+        if unknown:
+            raise ValueError(f"Unknown StrategiesConfig parameters: {sorted(unknown)}")
+        names = list(self.parameter_ranges)
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*self.parameter_ranges.values())
+        ]
+
+    def run(self, rates, timestamps):
+        """Return a DataFrame of parameters and stats, best first."""
+        rates = np.asarray(rates, dtype=np.float64)
+        if len(rates) == 0:
+            raise ValueError("Cannot sweep over an empty price history.")
+        combinations = self.get_combinations()
+        chunks = [
+            combinations[i : i + self.chunk_size]
+            for i in range(0, len(combinations), self.chunk_size)
+        ]
+
+        shared = shared_memory.SharedMemory(create=True, size=2 * rates.nbytes)
+        prices = np.ndarray((2, len(rates)), dtype=np.float64, buffer=shared.buf)
+        try:
+            prices[0] = rates
+            prices[1] = timestamps
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_attach_prices,
+                initargs=(shared.name, len(rates), self.backtester_kwargs),
+            ) as executor:
+                results = list(
+                    itertools.chain.from_iterable(
+                        executor.map(_run_combinations, chunks)
+                    )
+                )
+        finally:
+            # The view must be released before the block can be closed
+            del prices
+            shared.close()
+            shared.unlink()
+
+        self.log.info("run", f"Backtested {len(results)} parameter combinations")
+        return (
+            pd.DataFrame(results)
+            .sort_values(self.rank_by, ascending=False, na_position="last")
+            .reset_index(drop=True)
+        )
+
+    def run_range(self, start_date, end_date, pair="btc_jpy"):
+        """Load the trades of a date range once and sweep over them."""
+        start_datetime = datetime.strptime(start_date, "%Y-%m-%d %H:%M:%S")
+        end_datetime = datetime.strptime(end_date, "%Y-%m-%d %H:%M:%S")
+        rates, timestamps = Trade.get_rates_between(start_datetime, end_datetime, pair)
+        return self.run(rates, timestamps)
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from django.test import TestCase
+from models.bar import Bar
+from models.trade import Trade
+
+
+class BarModelTest(TestCase):
+    def test_bars_from_trades_roll_up(self):
+        for i, (rate, minute) in enumerate(((100, 0), (110, 0), (90, 3), (105, 7))):
+            Trade.objects.create(
+                id=i, rate=str(rate), amount="0.5", pair="btc_jpy", order_type="buy"
+            )
+            Trade.objects.filter(id=i).update(
+                created_at=datetime(2026, 1, 1, 0, minute, 10)
+            )
+        start, end = datetime(2026, 1, 1), datetime(2026, 1, 1, 1)
+
+        self.assertEqual(Bar.create_from_trades("btc_jpy", start, end), 3)
+        self.assertEqual(Bar.roll_up("btc_jpy", "1m", "5m", start, end), 2)
+        bars = Bar.get_bars("btc_jpy", "5m", start, end)
+        self.assertEqual(bars[0, 1:].tolist(), [100, 110, 90, 90, 1.5])
+        self.assertEqual(bars[1, 1:].tolist(), [105, 105, 105, 105, 0.5])
+        # Stored periods are skipped
+        Bar.roll_up("btc_jpy", "1m", "5m", start, end)
+        self.assertEqual(Bar.objects.filter(resolution="5m").count(), 2)
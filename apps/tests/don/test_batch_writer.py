@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from batch_util import UtxBatchWriter
+from django.test import TransactionTestCase
+from models.order import Order
+from models.ticker import Ticker
+
+
+class UtxBatchWriterTest(TransactionTestCase):
+    def setUp(self):
+        self.writer = UtxBatchWriter(max_batch=3, max_age=60)
+
+    def tearDown(self):
+        self.writer.close()
+
+    def create_ticker(self, last):
+        ticker = Ticker(
+            utx_id=f"T{last}",
+            last=last,
+            bid=last - 1,
+            ask=last + 1,
+            high=last + 2,
+            low=last - 2,
+            volume=1.0,
+            timestamp=datetime.now(),
+        )
+        self.writer.add(ticker)
+        return ticker
+
+    def test_flush_writes_queued_rows_by_model(self):
+        for last in range(5):
+            self.create_ticker(last)
+        order = Order(
+            id="1",
+            order_type="BUY",
+            rate=1,
+            amount=1,
+            time_in_force="GTC",
+            stop_loss_rate=0,
+            pair="btc_jpy",
+        )
+        self.writer.add(order)
+        self.assertTrue(self.writer.flush(timeout=10))
+        self.assertEqual(Ticker.objects.count(), 5)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.writer.written, 6)
+
+    def test_close_drains_queue(self):
+        self.create_ticker(1)
+        self.writer.close(timeout=10)
+        self.assertEqual(Ticker.objects.count(), 1)
+        self.assertIsNone(self.writer.thread)
+
+    def test_rejected_batch_is_retried_row_by_row(self):
+        self.create_ticker(1)
+        self.writer.flush(timeout=10)
+        # Duplicate primary key fails the bulk insert, the other rows still land
+        for last in (1, 2, 3):
+            self.create_ticker(last)
+        self.writer.flush(timeout=10)
+        self.assertEqual(Ticker.objects.count(), 3)
+        self.assertEqual(self.writer.failed, 1)
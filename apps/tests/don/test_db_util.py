@@ -0,0 +1,115 @@
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from db_util import UtxDBService
+from django.db import connection
+from django.test import TransactionTestCase
+from models.order import Order
+from models.trade import Trade
+
+
+class UtxDBServiceTest(TransactionTestCase):
+    def get_constraints(self, model):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+
+    def get_columns(self, model):
+        with connection.cursor() as cursor:
+            return {
+                column.name
+                for column in connection.introspection.get_table_description(
+                    cursor, model._meta.db_table
+                )
+            }
+
+    def test_creates_table_with_keys_and_indexes(self):
+        with connection.schema_editor() as editor:
+            editor.delete_model(Trade)
+        UtxDBService().create_model_table(Trade)
+
+        constraints = self.get_constraints(Trade).values()
+        self.assertIn(
+            ["utx_id"], [c["columns"] for c in constraints if c["primary_key"]]
+        )
+        self.assertIn(
+            ["pair", "id"], [c["columns"] for c in constraints if c["unique"]]
+        )
+        self.assertIn(
+            ["pair", "created_at"], [c["columns"] for c in constraints if c["index"]]
+        )
+
+    def test_updates_table_of_changed_model(self):
+        with connection.schema_editor() as editor:
+            editor.delete_model(Order)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE data_order (utx_id BIGINT, id VARCHAR, pair VARCHAR)"
+            )
+        UtxDBService().create_model_table(Order)
+
+        self.assertEqual(
+            self.get_columns(Order),
+            {field.column for field in Order._meta.local_fields},
+        )
+        self.assertIn(Order._meta.indexes[0].name, self.get_constraints(Order))
+        # Nothing left to add
+        UtxDBService().create_model_table(Order)
+
+    def test_converts_retyped_columns_with_their_rows(self):
+        with connection.schema_editor() as editor:
+            editor.delete_model(Trade)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE data_trade (utx_id BIGINT, id REAL, "
+                "amount VARCHAR(20), rate VARCHAR(20), pair VARCHAR(10), "
+                "order_type VARCHAR(10), created_at DATETIME)"
+            )
+            cursor.execute(
+                "INSERT INTO data_trade VALUES "
+                "(1, 42.0, '0.005', '5000000.5', 'btc_jpy', 'buy', '2026-01-01')"
+            )
+        UtxDBService().create_model_table(Trade)
+
+        trade = Trade.objects.get()
+        self.assertEqual(trade.id, 42)
+        self.assertEqual(trade.rate, Decimal("5000000.5"))
+        self.assertEqual(Trade.get_vwap("btc_jpy"), Decimal("5000000.5"))
+
+    @skipUnless(connection.vendor == "postgresql", "Partitioning needs PostgreSQL")
+    def test_partitioned_table_rejects_reinserted_trade(self):
+        with connection.schema_editor() as editor:
+            editor.delete_model(Trade)
+        with mock.patch.dict("os.environ", {"UTX_PARTITION_INTERVAL": "month"}):
+            UtxDBService().create_model_table(Trade)
+        self.addCleanup(self.recreate_table, Trade)
+
+        public_trades = {
+            "data": [
+                {
+                    "id": 1,
+                    "amount": "0.1",
+                    "rate": "100.0",
+                    "pair": "btc_jpy",
+                    "order_type": "buy",
+                    "created_at": "2026-10-01T05:55:38.000Z",
+                }
+            ]
+        }
+        for day in (2, 3):
+            now = datetime(2026, 10, day)
+            # Skip the lookup of stored ids, as a concurrent insert would
+            with mock.patch(
+                "models.trade.timezone.now", return_value=now
+            ), mock.patch.object(Trade, "get_stored_keys", return_value=set()):
+                result = Trade.create_trades_data(public_trades)
+        self.assertEqual(result, {"inserted": 0, "skipped": 1})
+        self.assertEqual(Trade.objects.count(), 1)
+
+    @staticmethod
+    def recreate_table(model):
+        with connection.schema_editor() as editor:
+            editor.delete_model(model)
+            editor.create_model(model)
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import TestCase
+from models.order_book import OrderBook
+from models.order_book_history import OrderBookDiff, OrderBookStore
+
+
+class OrderBookStoreTests(TestCase):
+    def setUp(self):
+        self.start = datetime(2024, 3, 1)
+        self.books = [
+            {"asks": [[101, 1], [102, 1]], "bids": [[99, 1]]},
+            {"asks": [[101, 2], [102, 1]], "bids": [[99, 1]]},
+            {"asks": [[102, 1]], "bids": [[99, 1], [98, 4]]},
+            {"asks": [[103, 1]], "bids": [[97, 1]]},
+        ]
+        store = OrderBookStore(snapshot_interval=2, flush_size=2)
+        for minute, book in enumerate(self.books):
+            store.record("btc_jpy", book, self.start + timedelta(minutes=minute))
+        store.flush()
+
+    def test_book_as_of(self):
+        for minute, book in enumerate(self.books):
+            rebuilt = OrderBookStore.book_as_of(
+                "btc_jpy", self.start + timedelta(minutes=minute, seconds=30)
+            )
+            self.assertEqual(
+                rebuilt.to_dict(),
+                {
+                    "asks": [[float(p), float(s)] for p, s in book["asks"]],
+                    "bids": [[float(p), float(s)] for p, s in book["bids"]],
+                },
+            )
+        self.assertIsNone(
+            OrderBookStore.book_as_of("btc_jpy", self.start - timedelta(minutes=1))
+        )
+
+    def test_replay(self):
+        best_asks = [
+            book.best_ask
+            for _, book in OrderBookStore.replay(
+                "btc_jpy", self.start, self.start + timedelta(minutes=10)
+            )
+        ]
+        self.assertEqual(best_asks, [101.0, 101.0, 102.0, 103.0])
+
+    def test_create_order_book_keeps_unequal_depths(self):
+        OrderBook.delete_order_book()
+        res = OrderBook.create_order_book(
+            {"asks": [["101", "1"], ["102", "2"], ["103", "3"]], "bids": [["99", "1"]]}
+        )
+        self.assertEqual(len(res["asks"]), 3)
+        self.assertEqual(len(res["bids"]), 1)
+        self.assertEqual(len(OrderBook.get_order_book()["asks"]), 3)
+
+    def test_failed_batch_is_written_row_by_row(self):
+        store = OrderBookStore(snapshot_interval=10, flush_size=3)
+        utx_id = OrderBookDiff.objects.order_by("utx_id").first().utx_id
+        # The second diff reuses a stored utx_id and cannot be inserted
+        with mock.patch(
+            "models.order_book_history.UtxUtils.generate_utx_id",
+            side_effect=[1, utx_id, 2, 3],
+        ):
+            for book in self.books:
+                store.record("eth_jpy", book, self.start)
+        self.assertEqual(store.failed, 1)
+        self.assertEqual(len(store.pending), 1)
+        self.assertEqual(OrderBookDiff.objects.filter(pair="eth_jpy").count(), 1)
@@ -1,4 +1,12 @@
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from cache.bars import bar_aggregator
+from cache.price_history import price_history_cache
 from django.test import TestCase
+from django.utils import timezone
 from models.trade import Trade
 
 
@@ -28,3 +36,102 @@ class TradeModelTest(TestCase):
         new_trade = Trade.create_trade_data(new_trade_data)
         self.assertTrue(isinstance(new_trade, Trade))
         self.assertEqual(new_trade.trade_id, new_trade_data["trade_id"])
+
+
+class CreateTradesDataTest(TestCase):
+    def test_create_trades_data_skips_duplicates(self):
+        public_trades = {
+            "success": True,
+            "data": [
+                {
+                    "id": 1,
+                    "amount": "0.1",
+                    "rate": "100.0",
+                    "pair": "btc_jpy",
+                    "order_type": "buy",
+                },
+                {
+                    "id": 2,
+                    "amount": "0.2",
+                    "rate": "101.0",
+                    "pair": "btc_jpy",
+                    "order_type": "sell",
+                },
+                {
+                    "id": 2,
+                    "amount": "0.2",
+                    "rate": "101.0",
+                    "pair": "btc_jpy",
+                    "order_type": "sell",
+                },
+            ],
+        }
+        result = Trade.create_trades_data(public_trades)
+        self.assertEqual(result, {"inserted": 2, "skipped": 1})
+
+        result = Trade.create_trades_data(public_trades)
+        self.assertEqual(result, {"inserted": 0, "skipped": 3})
+        self.assertEqual(Trade.objects.filter(pair="btc_jpy").count(), 2)
+
+        # Typed columns aggregate in SQL
+        self.assertEqual(Trade.get_vwap("btc_jpy"), Decimal("30.2") / Decimal("0.3"))
+        ohlcv = Trade.get_ohlcv("btc_jpy")
+        self.assertEqual((ohlcv["open"], ohlcv["close"]), (100, 101))
+        self.assertEqual(ohlcv["volume"], Decimal("0.3"))
+        rates, _ = Trade.get_recent_rates("btc_jpy", 10)
+        self.assertEqual(rates.tolist(), [100.0, 101.0])
+
+    def test_same_id_on_other_pair_is_stored(self):
+        trade = {"id": 7, "amount": "0.1", "rate": "100.0", "order_type": "buy"}
+        Trade.create_trades_data({"data": [{**trade, "pair": "btc_jpy"}]})
+        result = Trade.create_trades_data(
+            {"data": [{**trade, "pair": "eth_jpy"}, {**trade, "pair": "eth_jpy"}]}
+        )
+        self.assertEqual(result, {"inserted": 1, "skipped": 1})
+        self.assertEqual(Trade.objects.filter(id=7).count(), 2)
+
+    def test_concurrent_insert_is_not_counted(self):
+        public_trades = {
+            "data": [
+                {
+                    "id": 9,
+                    "amount": "1.0",
+                    "rate": "100.0",
+                    "pair": "test_jpy",
+                    "order_type": "buy",
+                }
+            ]
+        }
+        self.addCleanup(price_history_cache.clear, "test_jpy")
+        self.addCleanup(bar_aggregator.clear, "test_jpy")
+        Trade.create_trades_data(public_trades)
+        # Another writer stored the trade after the lookup
+        with mock.patch.object(Trade, "get_stored_keys", return_value=set()):
+            result = Trade.create_trades_data(public_trades)
+        self.assertEqual(result, {"inserted": 0, "skipped": 1})
+        self.assertEqual(Trade.objects.filter(pair="test_jpy").count(), 1)
+        rates, _ = price_history_cache.get_history("test_jpy")
+        self.assertEqual(rates.tolist(), [100.0])
+
+    def test_exchange_time_is_stored_naive(self):
+        Trade.create_trades_data(
+            {
+                "data": [
+                    {
+                        "id": 11,
+                        "amount": "0.1",
+                        "rate": "100.0",
+                        "pair": "btc_jpy",
+                        "order_type": "buy",
+                        "created_at": "2026-10-01T05:55:38.000Z",
+                    }
+                ]
+            }
+        )
+        created_at = Trade.objects.get(pair="btc_jpy", id=11).created_at
+        self.assertEqual(
+            created_at,
+            timezone.make_naive(
+                datetime(2026, 10, 1, 5, 55, 38, tzinfo=dt_timezone.utc)
+            ),
+        )
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from aiohttp import web
+from django.test import SimpleTestCase
+
+from apps.brokers.async_coincheck_client import AsyncCoincheckClient
+from apps.brokers.config import BrokersConfig, coincheck_cfg
+
+LATENCY = 0.2
+
+
+class AsyncCoincheckClientTest(SimpleTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.failures_left = 0
+        self.order_attempts = 0
+        self.runner = web.AppRunner(self.create_app())
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.config = BrokersConfig(
+            access_key="key",
+            secret_access_key="secret",
+            base_url=f"http://127.0.0.1:{port}",
+            api_urls=coincheck_cfg.api_urls,
+            backoff_factor=0,
+        )
+        self.client = AsyncCoincheckClient(self.config)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.client.close())
+        self.loop.run_until_complete(self.runner.cleanup())
+        self.loop.close()
+
+    def create_app(self):
+        async def ticker(request):
+            await asyncio.sleep(LATENCY)
+            return web.json_response({"last": 100.0, "pair": request.query["pair"]})
+
+        async def trades(request):
+            await asyncio.sleep(LATENCY)
+            return web.json_response({"success": True, "data": []})
+
+        async def order_books(request):
+            if self.failures_left > 0:
+                self.failures_left -= 1
+                return web.json_response({"error": "busy"}, status=429)
+            return web.json_response({"asks": [], "bids": []})
+
+        async def new_order(request):
+            self.order_attempts += 1
+            if "ACCESS-SIGNATURE" not in request.headers:
+                return web.json_response({"error": "unsigned"}, status=401)
+            return web.json_response({"error": "maintenance"}, status=503)
+
+        app = web.Application()
+        app.router.add_get("/api/ticker", ticker)
+        app.router.add_get("/api/trades", trades)
+        app.router.add_get("/api/order_books", order_books)
+        app.router.add_post("/api/exchange/orders", new_order)
+        return app
+
+    def test_same_method_surface(self):
+        res = self.loop.run_until_complete(self.client.get_ticker("eth_jpy"))
+        self.assertEqual(res, {"last": 100.0, "pair": "eth_jpy"})
+
+    def test_requests_run_concurrently(self):
+        pairs = ["btc_jpy", "eth_jpy", "etc_jpy"]
+        start = time.monotonic()
+        res = self.loop.run_until_complete(self.client.get_market_data(pairs))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(set(res["tickers"]), set(pairs))
+        self.assertEqual(res["tickers"]["etc_jpy"]["pair"], "etc_jpy")
+        # Sequential requests would take LATENCY * 2 * len(pairs)
+        self.assertLess(elapsed, LATENCY * 2)
+
+    def test_retry_on_too_many_requests(self):
+        self.failures_left = 2
+        res = self.loop.run_until_complete(self.client.get_order_books())
+        self.assertEqual(res, {"asks": [], "bids": []})
+
+    def test_post_not_retried_on_server_error(self):
+        res = self.loop.run_until_complete(
+            self.client.post_new_order("btc_jpy", "buy", "100", "1")
+        )
+        self.assertIn("error", res)
+        self.assertEqual(self.order_attempts, 1)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from backtest import Backtester, rolling_mean_std, wilder_rsi
+from django.test import SimpleTestCase
+from indexes import WilderRSI
+
+from apps.strategies.config import StrategiesConfig
+
+
+class BacktestTest(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.rates = 5_000_000 + np.cumsum(rng.normal(0, 2000, size=5000))
+        self.timestamps = 1_700_000_000 + np.arange(5000) * 60.0
+
+    def test_rolling_mean_std_match_pandas(self):
+        mean, std = rolling_mean_std(self.rates, 20)
+        series = pd.Series(self.rates)
+        np.testing.assert_allclose(mean, series.rolling(20).mean(), rtol=1e-9)
+        np.testing.assert_allclose(std, series.rolling(20).std(), rtol=1e-6)
+
+    def test_wilder_rsi_matches_streaming(self):
+        streaming = WilderRSI(14)
+        for rate in self.rates:
+            streaming.update(rate)
+        rsi = wilder_rsi(self.rates, 14)
+        self.assertTrue(np.isnan(rsi[:14]).all())
+        self.assertAlmostEqual(rsi[-1], streaming.rsi)
+
+    def test_long_only_follows_rising_market(self):
+        rates = np.linspace(100, 200, 500)
+        result = Backtester(StrategiesConfig(moving_average_window=5)).run(
+            rates, self.timestamps[:500]
+        )
+        self.assertEqual(result.stats["Trades"], 1)
+        self.assertGreater(result.stats["TotalReturn"], 0.9)
+        self.assertEqual(result.stats["MaxDrawdown"], 0.0)
+
+    def test_signals_are_filled_after_delay(self):
+        backtester = Backtester(fill_delay=2)
+        positions = backtester.compute_positions(np.array([1, 0, 1, 1], dtype=np.int8))
+        np.testing.assert_array_equal(positions, [0, 0, 1, 0])
+
+    def test_fees_reduce_equity(self):
+        free = Backtester().run(self.rates, self.timestamps)
+        costly = Backtester(fee_rate=0.001, slippage=0.0005).run(
+            self.rates, self.timestamps
+        )
+        self.assertGreater(free.stats["Trades"], 0)
+        self.assertLess(costly.equity[-1], free.equity[-1])
+        self.assertEqual(len(costly.to_frame()), len(self.rates))
+
+    def test_empty_history_rejected(self):
+        with self.assertRaises(ValueError):
+            Backtester().run([], [])
@@ -0,0 +1,44 @@
+import numpy as np
+from cache.bars import BarAggregator, aggregate_bars, trades_to_bars
+from django.test import SimpleTestCase
+
+
+class BarAggregatorTest(SimpleTestCase):
+    def setUp(self):
+        self.closed = []
+        self.aggregator = BarAggregator(("1s", "1m"))
+        self.aggregator.add_listener(
+            lambda pair, resolution, bars: self.closed.append((resolution, len(bars)))
+        )
+
+    def test_aggregate_bars(self):
+        bars = trades_to_bars([10, 12, 9, 11, 20], [1, 1, 1, 1, 2], [0, 10, 30, 59, 61])
+        np.testing.assert_array_equal(
+            aggregate_bars(bars, 60), [[0, 10, 12, 9, 11, 4], [60, 20, 20, 20, 20, 2]]
+        )
+
+    def test_bars_close_and_roll_up(self):
+        self.aggregator.add_trades("btc_jpy", [10, 12], [1, 1], [0.2, 0.7])
+        self.aggregator.add_trades("btc_jpy", [9, 11], [1, 1], [30.5, 59.1])
+        self.assertEqual(self.closed, [("1s", 2)])
+        np.testing.assert_array_equal(
+            self.aggregator.get_bars("btc_jpy", "1m", include_current=True),
+            [[0, 10, 12, 9, 11, 4]],
+        )
+
+        self.aggregator.add_trades("btc_jpy", [20], [2], [61])
+        self.assertEqual(self.closed[-2:], [("1s", 1), ("1m", 1)])
+        minutes = self.aggregator.get_bars("btc_jpy", "1m")
+        np.testing.assert_array_equal(minutes, [[0, 10, 12, 9, 11, 4]])
+        np.testing.assert_array_equal(
+            self.aggregator.get_bars("btc_jpy", "1s")[:, 0], [0, 30, 59]
+        )
+        np.testing.assert_array_equal(
+            self.aggregator.get_current_bar("btc_jpy", "1m"), [60, 20, 20, 20, 20, 2]
+        )
+
+    def test_late_trade_counts_in_open_bar(self):
+        self.aggregator.add_trades("btc_jpy", [10], [1], [5])
+        self.aggregator.add_trades("btc_jpy", [8], [1], [3])
+        current = self.aggregator.get_current_bar("btc_jpy", "1s")
+        np.testing.assert_array_equal(current, [5, 10, 10, 8, 8, 2])
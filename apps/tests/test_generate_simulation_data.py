@@ -1,5 +1,7 @@
 import unittest
+from datetime import datetime
 
+import numpy as np
 from models.ticker import Ticker
 
 from apps.simulation.simulation_service import SimulationService
@@ -56,6 +58,41 @@ class TestSimulationDataGenerator(unittest.TestCase):
 
         self.assertGreater(high_volatility_range, low_volatility_range)
 
+    def test_seed_makes_data_reproducible(self):
+        """Test that two generators with the same seed produce the same chunks."""
+        first = SimulationService(self.start_price, 25, self.volatility, seed=1)
+        second = SimulationService(self.start_price, 25, self.volatility, seed=1)
+        start_time = datetime(2024, 1, 1)
+
+        for chunk_a, chunk_b in zip(
+            first.generate_chunks(start_time), second.generate_chunks(start_time)
+        ):
+            np.testing.assert_array_equal(chunk_a["last"], chunk_b["last"])
+
+    def test_market_data_streams_are_independent(self):
+        """Test that the trades and the books do not share random draws."""
+        generator = SimulationService(self.start_price, 25, self.volatility, seed=1)
+        start_time = datetime(2024, 1, 1)
+        first = generator.generate_market_data(start_time=start_time)
+        busier = generator.generate_market_data(
+            start_time=start_time, trades_per_step=50.0
+        )
+
+        np.testing.assert_array_equal(first["prices"], busier["prices"])
+        np.testing.assert_array_equal(first["asks"], busier["asks"])
+        self.assertGreater(len(busier["trades"]["id"]), len(first["trades"]["id"]))
+
+    def test_generate_chunks_bounded(self):
+        """Test that chunks never exceed chunk_size and cover every data point."""
+        generator = SimulationService(
+            self.start_price, 25, self.volatility, seed=1, chunk_size=10
+        )
+        chunks = list(generator.generate_chunks(datetime(2024, 1, 1)))
+
+        self.assertEqual([len(chunk["last"]) for chunk in chunks], [10, 10, 5])
+        timestamps = np.concatenate([chunk["timestamp"] for chunk in chunks])
+        self.assertTrue((np.diff(timestamps) == 60).all())
+
 
 if __name__ == "__main__":
     unittest.main()
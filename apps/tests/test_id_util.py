@@ -0,0 +1,112 @@
+import os
+import threading
+from unittest import mock
+
+import id_util
+from django.test import SimpleTestCase
+from id_util import UtxIdGenerator
+
+
+class UtxIdGeneratorTest(SimpleTestCase):
+    def setUp(self):
+        self.generator = UtxIdGenerator(worker_id=7)
+
+    def test_ids_are_increasing(self):
+        ids = [self.generator.next_id() for _ in range(10000)]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_unique_across_threads(self):
+        results = []
+
+        def worker():
+            results.extend(self.generator.next_id() for _ in range(5000))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 8 * 5000)
+
+    def test_batch_allocation_spills_over_milliseconds(self):
+        with mock.patch.object(
+            UtxIdGenerator, "current_ms", return_value=UtxIdGenerator.EPOCH_MS + 10
+        ):
+            ids = self.generator.next_ids(10000)
+            next_id = self.generator.next_id()
+        self.assertEqual(len(set(ids)), 10000)
+        self.assertEqual(ids, sorted(ids))
+        self.assertGreater(next_id, ids[-1])
+
+    def test_clock_moving_backwards(self):
+        with mock.patch.object(
+            UtxIdGenerator, "current_ms", return_value=UtxIdGenerator.EPOCH_MS + 500
+        ):
+            first = self.generator.next_id()
+        with mock.patch.object(
+            UtxIdGenerator, "current_ms", return_value=UtxIdGenerator.EPOCH_MS + 100
+        ):
+            second = self.generator.next_id()
+        self.assertGreater(second, first)
+
+    def test_decode(self):
+        utx_id = self.generator.next_id()
+        created_at, worker_id, sequence = UtxIdGenerator.decode(utx_id)
+        self.assertEqual(worker_id, 7)
+        self.assertGreaterEqual(created_at.year, 2024)
+        self.assertLess(utx_id, 1 << 63)
+
+    def test_worker_ids_do_not_collide(self):
+        other = UtxIdGenerator(worker_id=8)
+        self.assertFalse(set(self.generator.next_ids(1000)) & set(other.next_ids(1000)))
+
+    def test_worker_id_from_environment(self):
+        environ = {"UTX_WORKER_ID": "1000", "UTX_WORKER_COUNT": "24"}
+        with mock.patch.dict(os.environ, environ):
+            generator = UtxIdGenerator()
+        self.assertEqual(generator.worker_id, 1000)
+        self.assertEqual(generator.free_ids, range(1001, 1024))
+        with self.assertRaises(ValueError):
+            UtxIdGenerator(worker_id=1000, worker_count=25)
+
+    def test_split_halves_free_ids(self):
+        generator = UtxIdGenerator(worker_id=0, worker_count=8)
+        self.assertEqual(generator.split(), (4, 4))
+        self.assertEqual(generator.split(), (2, 2))
+        self.assertEqual(generator.split(), (1, 1))
+        self.assertIsNone(generator.split())
+
+    def fork(self, write_fd, children=0):
+        """Fork a child reporting its worker id, after forking its own children."""
+        pid = os.fork()
+        if pid:
+            return pid
+        try:
+            for child in [self.fork(write_fd) for _ in range(children)]:
+                os.waitpid(child, 0)
+            try:
+                id_util.id_generator.next_id()
+                line = b"%d\n" % id_util.id_generator.worker_id
+            except RuntimeError:
+                line = b"none\n"
+            os.write(write_fd, line)
+        finally:
+            os._exit(0)
+
+    def test_nested_and_repeated_forks_take_distinct_worker_ids(self):
+        read_fd, write_fd = os.pipe()
+        with mock.patch.object(
+            id_util, "id_generator", UtxIdGenerator(worker_id=0, worker_count=8)
+        ):
+            # The first child forks two children of its own, then the parent
+            # forks until its range is used up
+            pids = [self.fork(write_fd, children=2)]
+            pids += [self.fork(write_fd) for _ in range(3)]
+            for pid in pids:
+                os.waitpid(pid, 0)
+            self.assertEqual(id_util.id_generator.worker_id, 0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            worker_ids = [line.strip() for line in pipe]
+        # 4 takes 4..7 and gives 6..7 and 5 to its children; 2 takes 2..3
+        self.assertEqual(sorted(worker_ids), ["1", "2", "4", "5", "6", "none"])
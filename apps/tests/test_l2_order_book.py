@@ -0,0 +1,103 @@
+import numpy as np
+from cache.order_book import L2OrderBook, OrderBookCache
+from django.test import SimpleTestCase
+from models.order_book_history import (
+    OrderBookDiff,
+    OrderBookSnapshot,
+    OrderBookStore,
+)
+
+
+class L2OrderBookTest(SimpleTestCase):
+    def setUp(self):
+        self.book = L2OrderBook(
+            asks=[["101.0", "1.5"], ["103.0", "2"], ["102.0", "0.5"]],
+            bids=[["99.0", "1"], ["98.0", "3"]],
+        )
+
+    def test_levels_are_sorted_best_first(self):
+        self.assertEqual(self.book.best_ask, 101.0)
+        self.assertEqual(self.book.best_bid, 99.0)
+        self.assertEqual(
+            self.book.get_levels("asks"), [(101.0, 1.5), (102.0, 0.5), (103.0, 2.0)]
+        )
+        self.assertEqual(self.book.get_levels("bids", depth=1), [(99.0, 1.0)])
+
+    def test_diff_rebuilds_the_next_snapshot(self):
+        asks = [[100.5, 1], [101.0, 1.5], [103.0, 1]]
+        bids = [[98.0, 3], [97.0, 4]]
+        ask_changes, bid_changes = self.book.diff(asks, bids)
+        self.assertCountEqual(ask_changes, [(100.5, 1), (103.0, 1), (102.0, 0.0)])
+        self.assertCountEqual(bid_changes, [(97.0, 4), (99.0, 0.0)])
+
+        self.book.apply_diff(ask_changes, bid_changes)
+        self.assertEqual(self.book.to_dict(), L2OrderBook(asks, bids).to_dict())
+        self.assertEqual(len(self.book), 5)
+
+    def test_top_of_book_queries(self):
+        self.assertEqual(self.book.spread, 2.0)
+        self.assertEqual(self.book.mid, 100.0)
+        self.assertEqual(self.book.depth_at(102.0), 0.5)
+        self.assertEqual(self.book.depth_at(98.0), 3.0)
+        self.assertEqual(self.book.depth_at(100.0), 0.0)
+        self.assertEqual(self.book.depth_to("asks", 102.0), 2.0)
+        self.assertEqual(self.book.depth_to("bids", 98.0), 4.0)
+        self.assertAlmostEqual(self.book.imbalance(), (4 - 4) / 8)
+        self.assertAlmostEqual(self.book.imbalance(depth=1), (1 - 1.5) / 2.5)
+
+    def test_vwap_to_size(self):
+        self.assertEqual(self.book.vwap("asks", 1.0), 101.0)
+        self.assertAlmostEqual(self.book.vwap("asks", 2.5), (151.5 + 51 + 51.5) / 2.5)
+        self.assertAlmostEqual(self.book.vwap("bids", 2.0), (99 + 98) / 2)
+        self.assertIsNone(self.book.vwap("bids", 5.0))
+
+    def test_random_updates_match_a_dict_book(self):
+        rng = np.random.default_rng(0)
+        book, expected = L2OrderBook(), {"asks": {}, "bids": {}}
+        for _ in range(2000):
+            side = "asks" if rng.random() < 0.5 else "bids"
+            price = float(rng.integers(90, 110))
+            size = float(rng.integers(0, 3))
+            book.set_level(side, price, size)
+            if size:
+                expected[side][price] = size
+            else:
+                expected[side].pop(price, None)
+        self.assertEqual(book.get_levels("asks"), sorted(expected["asks"].items()))
+        self.assertEqual(
+            book.get_levels("bids"), sorted(expected["bids"].items(), reverse=True)
+        )
+
+    def test_cache_swaps_books_on_update(self):
+        cache = OrderBookCache()
+        first = cache.update("btc_jpy", {"asks": [["101", "1"]], "bids": []})
+        second = cache.update("btc_jpy", {"asks": [["105", "1"]], "bids": []})
+        self.assertEqual(first.best_ask, 101.0)
+        self.assertIs(cache.get("btc_jpy"), second)
+        cache.apply_diff("btc_jpy", bids=[[100, 2]])
+        self.assertEqual(second.best_bid, 100.0)
+        self.assertIsNone(cache.get("eth_jpy"))
+
+
+class OrderBookStoreTest(SimpleTestCase):
+    def test_records_snapshots_and_diffs(self):
+        store = OrderBookStore(snapshot_interval=2, flush_size=100)
+        books = [
+            {"asks": [[101, 1]], "bids": [[99, 1]]},
+            {"asks": [[101, 2]], "bids": [[99, 1]]},
+            {"asks": [[101, 2]], "bids": [[99, 1]]},
+            {"asks": [[101, 2]], "bids": [[98, 1]]},
+            {"asks": [[102, 1]], "bids": [[98, 1]]},
+        ]
+        for book in books:
+            store.record("btc_jpy", book)
+
+        # Unchanged books are not stored
+        self.assertEqual(
+            [type(row) for row in store.pending],
+            [OrderBookSnapshot, OrderBookDiff, OrderBookDiff, OrderBookSnapshot],
+        )
+        self.assertEqual(store.pending[2].bids, [[98.0, 1.0], [99.0, 0.0]])
+        utx_ids = [row.utx_id for row in store.pending]
+        self.assertEqual(utx_ids, sorted(utx_ids))
+        self.assertEqual(store.get_live_book("btc_jpy").best_ask, 102.0)
@@ -0,0 +1,137 @@
+import asyncio
+
+from cache.order_book import order_book_cache
+from django.test import SimpleTestCase
+from management.ingestion import AsyncBatchWriter, MarketDataIngestor
+
+from apps.brokers.async_coincheck_client import AsyncCoincheckClient
+from apps.brokers.coincheck_stream import parse_trades
+from apps.brokers.config import BrokersConfig, coincheck_cfg
+from apps.simulation.mock_exchange import MarketReplay, MockExchange
+
+
+class FakeRestClient:
+    config = coincheck_cfg
+
+    def __init__(self, trades):
+        self.trades = trades
+
+    async def get_public_trades(self, pair):
+        return {"success": True, "data": self.trades[::-1]}
+
+    async def get_order_books(self, pair):
+        return {"asks": [["101", "1"]], "bids": [["99", "1"]]}
+
+    async def close(self):
+        pass
+
+
+class MarketDataStreamTest(SimpleTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        order_book_cache.clear()
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    @staticmethod
+    async def wait_for(condition, timeout=5.0):
+        for _ in range(int(timeout / 0.01)):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("Condition not met in time")
+
+    def test_parse_trades_formats(self):
+        trades = parse_trades(
+            [["1700000000", "12", "btc_jpy", "5000000.0", "0.01", "buy", "1", "2"]]
+        )
+        self.assertEqual(trades[0]["id"], 12)
+        self.assertEqual(trades[0]["rate"], "5000000.0")
+        self.assertTrue(trades[0]["created_at"].startswith("2023-11-14T22:13:20"))
+        old = parse_trades([13, "btc_jpy", 5000000.0, 0.02, "sell"])
+        self.assertEqual(old[0]["order_type"], "sell")
+        self.assertNotIn("created_at", old[0])
+
+    def test_batch_writer_batches_items(self):
+        batches = []
+        writer = AsyncBatchWriter(batches.append, max_batch=2, max_delay=0.01)
+
+        async def write():
+            task = asyncio.ensure_future(writer.run())
+            await writer.put_many(range(5))
+            await writer.close()
+            await task
+
+        self.run_async(write())
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+        self.assertEqual(writer.written, 5)
+
+    def test_id_gap_is_backfilled(self):
+        trades = [{"id": i, "pair": "btc_jpy"} for i in range(1, 6)]
+        ingestor = MarketDataIngestor(
+            ["btc_jpy"], rest_client=FakeRestClient(trades), write_trades=list
+        )
+
+        async def receive():
+            await ingestor.on_trades("btc_jpy", trades[:1])
+            await ingestor.on_trades("btc_jpy", trades[4:])
+            queue = ingestor.trade_writer.queue
+            return [queue.get_nowait()["id"] for _ in range(queue.qsize())]
+
+        self.assertEqual(self.run_async(receive()), [1, 2, 3, 4, 5])
+        self.assertEqual(ingestor.gaps, 1)
+
+    def test_stream_from_mock_exchange_survives_reconnect(self):
+        replay = MarketReplay.simulate("btc_jpy", 50, seed=2)
+        exchange = MockExchange([replay])
+        written = []
+
+        async def stream():
+            base_url = await exchange.start()
+            config = BrokersConfig(
+                base_url=base_url,
+                ws_url=base_url.replace("http", "ws") + "/ws",
+                api_urls=coincheck_cfg.api_urls,
+                backoff_factor=0,
+            )
+            ingestor = MarketDataIngestor(
+                ["btc_jpy"],
+                rest_client=AsyncCoincheckClient(config),
+                write_trades=written.extend,
+                write_order_books=lambda records: None,
+                max_delay=0.01,
+                initial_backoff=0.01,
+            )
+            task = asyncio.ensure_future(ingestor.run())
+
+            def subscribed():
+                channels = [c for c, _ in exchange.subscriptions.values()]
+                return ingestor.trade_writer.written and any(
+                    len(c) == 2 for c in channels
+                )
+
+            for connection in (1, 2):
+                await self.wait_for(
+                    lambda: ingestor.stream.connections == connection and subscribed()
+                )
+                for _ in range(5):
+                    exchange.advance(replay)
+                last_id = int(replay.trades["id"][replay.trade_stops[replay.step] - 1])
+                await self.wait_for(lambda: written and written[-1]["id"] == last_id)
+                await exchange.close_websockets()
+
+            await ingestor.stop()
+            await task
+            await exchange.stop()
+
+        self.run_async(stream())
+        ids = [trade["id"] for trade in written]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertEqual(ids[-1], int(replay.trades["id"][replay.trade_stops[10] - 1]))
+        book = order_book_cache.get("btc_jpy")
+        self.assertAlmostEqual(book.best_ask, float(replay.asks[10, 0, 0]), places=1)
+        self.assertAlmostEqual(book.best_bid, float(replay.bids[10, 0, 0]), places=1)
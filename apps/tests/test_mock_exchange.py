@@ -0,0 +1,106 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from apps.brokers.async_coincheck_client import AsyncCoincheckClient
+from apps.brokers.config import BrokersConfig, coincheck_cfg
+from apps.simulation.mock_exchange import MarketReplay, MockExchange, walk_book
+
+
+class MockExchangeTest(SimpleTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.exchanges = []
+
+    def tearDown(self):
+        for exchange, client in self.exchanges:
+            self.loop.run_until_complete(client.close())
+            self.loop.run_until_complete(exchange.stop())
+        self.loop.close()
+
+    def start(self, replays, **kwargs):
+        exchange = MockExchange(replays, **kwargs)
+        base_url = self.loop.run_until_complete(exchange.start())
+        config = BrokersConfig(
+            access_key="key",
+            secret_access_key="secret",
+            base_url=base_url,
+            api_urls=coincheck_cfg.api_urls,
+            backoff_factor=0,
+        )
+        client = AsyncCoincheckClient(config)
+        self.exchanges.append((exchange, client))
+        return exchange, client
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_replay_is_deterministic(self):
+        tickers = []
+        for _ in range(2):
+            _, client = self.start([MarketReplay.simulate("btc_jpy", 100, seed=3)])
+            tickers.append([self.run_async(client.get_ticker()) for _ in range(5)])
+        self.assertEqual(tickers[0], tickers[1])
+        self.assertNotEqual(tickers[0][0]["last"], tickers[0][1]["last"])
+
+    def test_public_endpoints(self):
+        _, client = self.start([MarketReplay.simulate("btc_jpy", 100, seed=1)])
+        data = self.run_async(client.get_market_data(["btc_jpy"], order_books=True))
+        ticker = data["tickers"]["btc_jpy"]
+        self.assertLess(ticker["bid"], ticker["ask"])
+        trades = data["trades"]["btc_jpy"]["data"]
+        self.assertTrue(trades)
+        self.assertGreater(trades[0]["id"], trades[-1]["id"])
+        self.assertEqual(len(data["order_books"]["btc_jpy"]["asks"]), 20)
+        error = self.run_async(client.get_ticker("xrp_jpy"))
+        self.assertIn("error", error)
+
+    def test_limit_order_rests_until_market_crosses(self):
+        replay = MarketReplay("btc_jpy", [100.0, 100.0, 90.0], [0, 60, 120])
+        exchange, client = self.start([replay])
+        order = self.run_async(client.post_new_order("btc_jpy", "buy", "95", "0.001"))
+        self.assertTrue(order["success"])
+        opens = self.run_async(client.get_unsettled_order_list())
+        self.assertEqual([o["id"] for o in opens["orders"]], [order["id"]])
+
+        exchange.advance(replay)
+        exchange.advance(replay)
+        opens = self.run_async(client.get_unsettled_order_list())
+        self.assertEqual(opens["orders"], [])
+        balance = self.run_async(client.get_balance())
+        self.assertAlmostEqual(float(balance["btc"]), 1.001)
+        self.assertAlmostEqual(float(balance["jpy_reserved"]), 0)
+        history = self.run_async(client.get_transaction_history())
+        self.assertEqual(history["transactions"][0]["liquidity"], "M")
+
+    def test_orders_are_checked_and_cancelled(self):
+        _, client = self.start([MarketReplay.simulate("btc_jpy", 10, seed=1)])
+        rejected = self.run_async(client.post_new_order("btc_jpy", "buy", "1", "1e9"))
+        self.assertIn("insufficient", rejected["error"])
+
+        order = self.run_async(client.post_new_order("btc_jpy", "sell", "1e9", "0.5"))
+        balance = self.run_async(client.get_balance())
+        self.assertAlmostEqual(float(balance["btc_reserved"]), 0.5)
+        self.run_async(client.delet_cancel_order(order["id"]))
+        status = self.run_async(client.get_order_cancellation_status(order["id"]))
+        self.assertTrue(status["cancel"])
+        balance = self.run_async(client.get_balance())
+        self.assertAlmostEqual(float(balance["btc"]), 1)
+
+    def test_unsigned_private_request_rejected(self):
+        exchange, client = self.start([MarketReplay.simulate("btc_jpy", 10, seed=1)])
+
+        async def get_balance():
+            session = client.get_session()
+            async with session.get(f"{exchange.base_url}/api/accounts/balance") as r:
+                return r.status
+
+        self.assertEqual(self.run_async(get_balance()), 401)
+
+    def test_walk_book_respects_limit_and_funds(self):
+        asks = [(100.0, 1.0), (101.0, 1.0), (105.0, 5.0)]
+        self.assertEqual(
+            walk_book(asks, "buy", amount=3, rate=101), [(100.0, 1.0), (101.0, 1.0)]
+        )
+        fills = walk_book(asks, "buy", funds=150)
+        self.assertAlmostEqual(sum(price * amount for price, amount in fills), 150)
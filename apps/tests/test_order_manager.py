@@ -0,0 +1,76 @@
+import asyncio
+
+from django.test import SimpleTestCase
+from order_manager import OrderManager
+
+from apps.brokers.async_coincheck_client import AsyncCoincheckClient
+from apps.brokers.config import BrokersConfig, coincheck_cfg
+from apps.simulation.mock_exchange import MarketReplay, MockExchange
+
+
+class OrderManagerTest(SimpleTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.replay = MarketReplay("btc_jpy", [100.0, 100.0, 90.0], [0, 60, 120])
+        self.exchange = MockExchange([self.replay])
+        base_url = self.run_async(self.exchange.start())
+        self.client = AsyncCoincheckClient(
+            BrokersConfig(
+                access_key="key",
+                secret_access_key="secret",
+                base_url=base_url,
+                api_urls=coincheck_cfg.api_urls,
+                backoff_factor=0,
+            )
+        )
+        self.manager = OrderManager(self.client)
+
+    def tearDown(self):
+        self.run_async(self.client.close())
+        self.run_async(self.exchange.stop())
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_fills_reconciled_from_exchange(self):
+        order = self.run_async(
+            self.manager.place_order("btc_jpy", "buy", "95", "0.001")
+        )
+        self.assertEqual(
+            [o.id for o in self.manager.get_open_orders("btc_jpy")], [order["id"]]
+        )
+        self.assertAlmostEqual(self.manager.get_open_amount("btc_jpy", "buy"), 0.001)
+
+        self.exchange.advance(self.replay)
+        self.exchange.advance(self.replay)
+        self.assertTrue(self.run_async(self.manager.reconcile()))
+        managed = self.manager.get_order(order["id"])
+        self.assertEqual(managed.status, "filled")
+        self.assertAlmostEqual(managed.filled_amount, 0.001)
+        self.assertEqual(self.manager.get_open_orders(), [])
+
+    def test_cancel_orders_concurrently(self):
+        ids = [
+            self.run_async(self.manager.place_order("btc_jpy", "sell", "1e9", "0.1"))[
+                "id"
+            ]
+            for _ in range(5)
+        ]
+        responses = self.run_async(self.manager.cancel_orders(pair="btc_jpy"))
+        self.assertEqual(sorted(responses), ids)
+        self.assertTrue(all(r["success"] for r in responses.values()))
+        self.assertEqual(self.manager.get_open_orders(), [])
+        self.manager.forget_closed()
+        self.assertEqual(self.manager.orders, {})
+
+    def test_orders_placed_elsewhere_are_adopted_and_closed(self):
+        order = self.run_async(
+            self.client.post_new_order("btc_jpy", "sell", "1e9", "0.2")
+        )
+        self.run_async(self.manager.reconcile())
+        self.assertAlmostEqual(self.manager.get_open_amount("btc_jpy", "sell"), 0.2)
+
+        self.run_async(self.client.delet_cancel_order(order["id"]))
+        self.run_async(self.manager.reconcile())
+        self.assertEqual(self.manager.get_order(order["id"]).status, "cancelled")
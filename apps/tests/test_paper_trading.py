@@ -0,0 +1,107 @@
+from django.test import SimpleTestCase
+from models.trade import Trade
+from paper_trading import PaperTradingEngine, Position, paper_engine
+
+ASKS = [[100.0, 1.0], [101.0, 2.0]]
+BIDS = [[99.0, 1.0], [98.0, 2.0]]
+
+
+class PaperTradingEngineTest(SimpleTestCase):
+    def setUp(self):
+        self.engine = PaperTradingEngine(persist=False, clock=lambda: 0.0)
+        self.account = self.engine.add_account(
+            "a", cash=1000.0, taker_fee_rate=0.01, latency=2.0
+        )
+
+    def test_market_order_walks_book_after_latency(self):
+        order = self.engine.place_order("a", "btc_jpy", "buy", 2.0)
+        self.assertEqual(self.engine.on_book("btc_jpy", ASKS, BIDS, timestamp=1.0), [])
+
+        fills = self.engine.on_book("btc_jpy", ASKS, BIDS, timestamp=2.0)
+        self.assertEqual([(f.rate, f.amount) for f in fills], [(100, 1), (101, 1)])
+        self.assertEqual(order.status, "filled")
+        position = self.account.get_position("btc_jpy")
+        self.assertEqual(position.amount, 2.0)
+        self.assertAlmostEqual(position.average_rate, 100.5)
+        self.assertAlmostEqual(position.fees, 2.01)
+        self.assertAlmostEqual(self.account.cash, 1000 - 201 - 2.01)
+
+    def test_thin_book_partial_fills(self):
+        market = self.engine.place_order("a", "btc_jpy", "sell", 5.0)
+        limit = self.engine.place_order("a", "btc_jpy", "buy", 4.0, rate=100.0)
+        self.engine.on_book("btc_jpy", ASKS, BIDS, timestamp=2.0)
+        # The market order is cut to the book, the limit order rests
+        self.assertEqual(market.status, "cancelled")
+        self.assertEqual(market.pending_amount, 2.0)
+        self.assertEqual(limit.status, "open")
+        self.assertEqual(limit.pending_amount, 3.0)
+
+        # A book crossing the resting order is taken at its prices
+        fills = self.engine.on_book("btc_jpy", [[99.5, 5.0]], BIDS, timestamp=3.0)
+        self.assertEqual([(f.rate, f.liquidity) for f in fills], [(99.5, "T")])
+        self.assertEqual(limit.status, "filled")
+        self.assertEqual(self.engine.on_book("btc_jpy", ASKS, BIDS, timestamp=4.0), [])
+
+    def test_same_book_does_not_fill_again(self):
+        order = self.engine.place_order("a", "btc_jpy", "buy", 5.0, rate=100.0)
+        fills = []
+        for timestamp in range(2, 7):
+            fills += self.engine.on_book("btc_jpy", ASKS, BIDS, timestamp=timestamp)
+        self.assertEqual([(f.rate, f.amount) for f in fills], [(100.0, 1.0)])
+        self.assertEqual(order.pending_amount, 4.0)
+
+        # Only the size added to the level is new
+        fills = self.engine.on_book("btc_jpy", [[100.0, 2.5]], BIDS, timestamp=7.0)
+        self.assertEqual([(f.amount, f.liquidity) for f in fills], [(1.5, "T")])
+        self.assertEqual(self.engine.on_book("btc_jpy", ASKS, BIDS, timestamp=8.0), [])
+
+    def test_trades_through_rate_fill_resting_orders(self):
+        account = self.engine.add_account("b", maker_fee_rate=0.001)
+        order = self.engine.place_order("b", "btc_jpy", "buy", 2.0, rate=98.5)
+        self.engine.on_book("btc_jpy", ASKS, BIDS, timestamp=2.0)
+        self.assertEqual(order.status, "open")
+
+        # A trade at the order's rate may have been ahead of it in the queue
+        self.assertEqual(self.engine.on_trades("btc_jpy", [(98.5, 1.0)]), [])
+        fills = self.engine.on_trades("btc_jpy", [(98.0, 0.5), (97.0, 3.0)])
+        self.assertEqual(
+            [(f.rate, f.amount, f.liquidity) for f in fills],
+            [(98.5, 0.5, "M"), (98.5, 1.5, "M")],
+        )
+        self.assertEqual(order.status, "filled")
+        self.assertAlmostEqual(account.get_position("btc_jpy").fees, 2 * 98.5 * 0.001)
+
+    def test_slippage_and_pnl(self):
+        account = self.engine.add_account("b", slippage=0.01)
+        self.engine.place_order("b", "btc_jpy", "buy", 1.0)
+        self.engine.on_book("btc_jpy", ASKS, BIDS)
+        self.engine.place_order("b", "btc_jpy", "sell", 1.0)
+        self.engine.on_book("btc_jpy", [[111.0, 1.0]], [[110.0, 1.0]])
+
+        self.assertEqual(account.get_position("btc_jpy").amount, 0.0)
+        pnl = self.engine.get_pnl("b")
+        self.assertAlmostEqual(pnl["realized"], 110 * 0.99 - 101)
+        self.assertEqual(pnl["unrealized"], 0.0)
+        # Accounts do not see each other's orders
+        self.assertFalse(self.account.fills)
+
+    def test_position_flip(self):
+        position = Position()
+        position.apply("buy", 100.0, 1.0, 0.0)
+        position.apply("sell", 110.0, 3.0, 0.0)
+        self.assertEqual(position.realized_pnl, 10.0)
+        self.assertEqual(position.amount, -2.0)
+        self.assertEqual(position.average_rate, 110.0)
+        self.assertEqual(position.unrealized_pnl(100.0), 20.0)
+
+    def test_ingested_trades_reach_the_engine(self):
+        self.assertIn(paper_engine.on_new_trades, Trade.listeners)
+        order = self.engine.place_order("a", "btc_jpy", "sell", 1.0, rate=101.5)
+        self.engine.on_book("btc_jpy", ASKS, BIDS, timestamp=2.0)
+        fills = self.engine.on_new_trades(
+            "btc_jpy", [101.0, 102.0], [3.0, 0.4], [3.0, 4.0]
+        )
+        self.assertEqual(
+            [(f.rate, f.amount, f.timestamp) for f in fills], [(101.5, 0.4, 4.0)]
+        )
+        self.assertAlmostEqual(order.pending_amount, 0.6)
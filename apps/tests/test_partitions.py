@@ -0,0 +1,99 @@
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from unittest import mock
+
+from db_util import UtxDBService
+from django.db import connection
+from django.test import SimpleTestCase
+from django.utils import timezone
+from models.ticker import Ticker
+from models.trade import Trade
+
+
+class PartitionTest(SimpleTestCase):
+    def create_service(self, interval="month", retention_days=None, archive=False):
+        environ = {"UTX_PARTITION_INTERVAL": interval}
+        if retention_days is not None:
+            environ["UTX_RETENTION_DAYS"] = str(retention_days)
+        if archive:
+            environ["UTX_ARCHIVE_PARTITIONS"] = "1"
+        with mock.patch.dict("os.environ", environ):
+            return UtxDBService()
+
+    def test_partitioned_table_keys_include_partition_column(self):
+        editor = connection.schema_editor(collect_sql=True, atomic=False)
+        sql = UtxDBService.partitioned_table_sql(editor, Trade)
+        self.assertIn('PRIMARY KEY ("utx_id", "created_at")', sql)
+        self.assertIn('UNIQUE ("pair", "id", "created_at")', sql)
+        self.assertTrue(sql.endswith('PARTITION BY RANGE ("created_at")'))
+        self.assertNotIn("IDENTITY", sql)
+        sql = UtxDBService.partitioned_table_sql(editor, Ticker)
+        self.assertIn('PRIMARY KEY ("utx_id", "timestamp")', sql)
+
+    def test_partition_ranges(self):
+        service = self.create_service("month")
+        start = service.get_period_start(datetime(2026, 12, 18, 9))
+        self.assertEqual(
+            service.partition_sql("data_trade", start),
+            "CREATE TABLE IF NOT EXISTS data_trade_p202612 PARTITION OF data_trade "
+            "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')",
+        )
+        service = self.create_service("day")
+        start = service.get_period_start(datetime(2026, 2, 28, 9))
+        self.assertEqual(
+            service.get_partition_name("data_ticker", start), "data_ticker_p20260228"
+        )
+        self.assertIn("TO ('2026-03-01')", service.partition_sql("data_ticker", start))
+
+    def test_expired_partitions_are_dropped_or_detached(self):
+        partitions = [
+            "data_trade_default",
+            "data_trade_p202607",
+            "data_trade_p202608",
+            "data_trade_p20260915",
+        ]
+        for archive, statement in (
+            (False, "DROP TABLE data_trade_p202607"),
+            (True, "ALTER TABLE data_trade DETACH PARTITION data_trade_p202607"),
+        ):
+            service = self.create_service(retention_days=60, archive=archive)
+            with mock.patch("db_util.connection") as db:
+                cursor = db.cursor.return_value.__enter__.return_value
+                cursor.fetchall.return_value = [(name,) for name in partitions]
+                removed = service.drop_expired_partitions(Trade, datetime(2026, 10, 1))
+            self.assertEqual(removed, ["data_trade_p202607"])
+            cursor.execute.assert_called_with(statement)
+
+    def test_trade_partition_key_comes_from_payload(self):
+        public_trades = {
+            "data": [
+                {
+                    "id": 1,
+                    "amount": "0.1",
+                    "rate": "100.0",
+                    "pair": "btc_jpy",
+                    "order_type": "buy",
+                    "created_at": "2026-10-01T05:55:38.000Z",
+                }
+            ]
+        }
+        keys = []
+        with mock.patch.object(Trade, "objects") as objects, mock.patch.object(
+            Trade, "add_to_price_history"
+        ):
+            objects.filter.return_value.values_list.return_value = []
+            for day in (2, 3):
+                now = datetime(2026, 10, day)
+                with mock.patch("models.trade.timezone.now", return_value=now):
+                    Trade.create_trades_data(public_trades)
+                (trades,), _ = objects.bulk_create.call_args
+                keys.append([(t.pair, t.id, t.created_at) for t in trades])
+        # A trade stored twice has the same (pair, id, created_at) key
+        self.assertEqual(keys[0], keys[1])
+        # Naive, in settings.TIME_ZONE
+        self.assertEqual(
+            keys[0][0][2],
+            timezone.make_naive(
+                datetime(2026, 10, 1, 5, 55, 38, tzinfo=dt_timezone.utc)
+            ),
+        )
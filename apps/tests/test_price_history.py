@@ -0,0 +1,51 @@
+import numpy as np
+from cache.price_history import PriceHistoryCache
+from cache.ring_buffer import RingBuffer
+from django.test import SimpleTestCase
+
+
+class RingBufferTest(SimpleTestCase):
+    def test_latest_wraps_around(self):
+        buffer = RingBuffer(5)
+        buffer.extend(np.arange(8))
+        self.assertEqual(len(buffer), 5)
+        np.testing.assert_array_equal(buffer.latest()[:, 0], [3, 4, 5, 6, 7])
+        np.testing.assert_array_equal(buffer.latest(2)[:, 0], [6, 7])
+        self.assertEqual(buffer.last()[0], 7)
+
+    def test_extend_larger_than_capacity(self):
+        buffer = RingBuffer(3, columns=2)
+        buffer.extend([[i, -i] for i in range(10)])
+        np.testing.assert_array_equal(buffer.latest(), [[7, -7], [8, -8], [9, -9]])
+
+    def test_last_on_empty_buffer(self):
+        with self.assertRaises(IndexError):
+            RingBuffer(3).last()
+
+
+class PriceHistoryCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = PriceHistoryCache(capacity=100)
+
+    def test_history_per_pair(self):
+        self.cache.add_trades("btc_jpy", [1.0, 2.0, 3.0], [10, 11, 12])
+        self.cache.add_trades("eth_jpy", [7.0], [10])
+
+        rates, timestamps = self.cache.get_history("btc_jpy", 2)
+        np.testing.assert_array_equal(rates, [2.0, 3.0])
+        np.testing.assert_array_equal(timestamps, [11, 12])
+        self.assertEqual(self.cache.get_last_rate("eth_jpy"), 7.0)
+        self.assertFalse(self.cache.has_pair("lsk_jpy"))
+
+    def test_unknown_pair_is_empty(self):
+        rates, timestamps = self.cache.get_history("lsk_jpy")
+        self.assertEqual(len(rates), 0)
+        self.assertEqual(len(timestamps), 0)
+
+    def test_listeners_receive_new_trades(self):
+        received = []
+        self.cache.add_listener(
+            lambda pair, rates, timestamps: received.append((pair, list(rates)))
+        )
+        self.cache.add_trades("btc_jpy", [1.0, 2.0], [10, 11])
+        self.assertEqual(received, [("btc_jpy", [1.0, 2.0])])
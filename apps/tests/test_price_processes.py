@@ -0,0 +1,90 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.simulation.market_data import (
+    generate_order_books,
+    generate_trades,
+    order_book_to_api_format,
+    trades_to_api_format,
+)
+from apps.simulation.processes import (
+    ArithmeticProcess,
+    GarchProcess,
+    GeometricBrownianMotion,
+    JumpDiffusion,
+    RegimeSwitchingProcess,
+)
+
+
+class PriceProcessTest(SimpleTestCase):
+    def test_paths_are_positive_and_reproducible(self):
+        processes = [
+            GeometricBrownianMotion(0.0, 0.01),
+            JumpDiffusion(0.0, 0.01, 0.05, -0.02, 0.05),
+            GarchProcess(1e-6, 0.1, 0.85),
+            RegimeSwitchingProcess([(0.0, 0.005), (0.0, 0.03)], [[0.99, 0.01]] * 2),
+        ]
+        for process in processes:
+            first, _ = process.simulate([100.0] * 8, 500, np.random.default_rng(1))
+            second, _ = process.simulate([100.0] * 8, 500, np.random.default_rng(1))
+            self.assertEqual(first.shape, (8, 500))
+            self.assertTrue((first > 0).all())
+            np.testing.assert_array_equal(first, second)
+
+    def test_arithmetic_process_matches_cumulative_gaussian_steps(self):
+        prices, _ = ArithmeticProcess(1.0).simulate(
+            1000.0, 50, np.random.default_rng(3)
+        )
+        expected = 1000.0 + np.cumsum(np.random.default_rng(3).normal(0, 1.0, 50))
+        np.testing.assert_allclose(prices[0], expected)
+
+    def test_gbm_log_returns_have_expected_moments(self):
+        prices, _ = GeometricBrownianMotion(0.0, 0.02).simulate(
+            np.ones(2000), 100, np.random.default_rng(5)
+        )
+        log_returns = np.diff(np.log(prices), axis=1)
+        self.assertAlmostEqual(log_returns.std(), 0.02, delta=0.001)
+
+    def test_garch_returns_cluster(self):
+        prices, state = GarchProcess(1e-6, 0.15, 0.8).simulate(
+            np.ones(200), 500, np.random.default_rng(11)
+        )
+        squared = np.diff(np.log(prices), axis=1) ** 2
+        correlation = np.corrcoef(squared[:, 1:].ravel(), squared[:, :-1].ravel())
+        self.assertGreater(correlation[0, 1], 0.05)
+        self.assertEqual(state["variance"].shape, (200,))
+
+    def test_regime_switching_visits_every_regime(self):
+        process = RegimeSwitchingProcess(
+            [(0.0, 0.01), (0.0, 0.05)], [[0.95, 0.05], [0.1, 0.9]]
+        )
+        _, state = process.simulate(np.ones(10), 1000, np.random.default_rng(2))
+        self.assertEqual(set(np.unique(state["regimes"])), {0, 1})
+
+    def test_transition_matrix_rows_must_sum_to_one(self):
+        with self.assertRaises(ValueError):
+            RegimeSwitchingProcess([(0, 0.1), (0, 0.2)], [[0.5, 0.4], [0.5, 0.5]])
+
+
+class MarketDataTest(SimpleTestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(4)
+        self.prices = 5_000_000 + np.cumsum(self.rng.normal(0, 1000, 100))
+        self.timestamps = 1_700_000_000 + 60 * np.arange(100)
+
+    def test_trades_are_ordered_around_prices(self):
+        trades = generate_trades(self.prices, self.timestamps, self.rng)
+        self.assertTrue((np.diff(trades["timestamp"]) >= 0).all())
+        self.assertTrue((trades["amount"] > 0).all())
+        response = trades_to_api_format(trades, stop=2)
+        self.assertEqual(len(response["data"]), 2)
+        self.assertTrue(response["data"][0]["created_at"].endswith("Z"))
+
+    def test_order_books_are_sorted_and_uncrossed(self):
+        asks, bids = generate_order_books(self.prices, self.rng, depth=10)
+        self.assertEqual(asks.shape, (100, 10, 2))
+        self.assertTrue((np.diff(asks[:, :, 0], axis=1) > 0).all())
+        self.assertTrue((np.diff(bids[:, :, 0], axis=1) < 0).all())
+        self.assertTrue((asks[:, 0, 0] > bids[:, 0, 0]).all())
+        book = order_book_to_api_format(asks[0], bids[0])
+        self.assertEqual(len(book["asks"]), 10)
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from apps.brokers.async_coincheck_client import AsyncCoincheckClient
+from apps.brokers.coincheck_client import CoincheckClient
+from apps.brokers.config import BrokersConfig, coincheck_cfg
+from apps.brokers.rate_limit import (
+    ORDER,
+    PRIVATE,
+    PUBLIC,
+    RateLimitGovernor,
+    _governors,
+    get_endpoint_class,
+)
+from apps.brokers.session_pool import close_sessions
+from apps.simulation.mock_exchange import MarketReplay, MockExchange
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitGovernorTest(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.governor = RateLimitGovernor(
+            {"total": (1, 4), PUBLIC: (10, 10)}, clock=self.clock
+        )
+
+    def test_endpoint_classes(self):
+        self.assertEqual(get_endpoint_class("get_ticker", False), PUBLIC)
+        self.assertEqual(get_endpoint_class("get_balance", True), PRIVATE)
+        self.assertEqual(get_endpoint_class("post_new_order", True), ORDER)
+
+    def test_public_leaves_budget_to_orders(self):
+        # Public requests keep 25% of the total burst for higher priorities
+        for _ in range(3):
+            self.assertEqual(self.governor.try_acquire(PUBLIC), 0)
+        self.assertGreater(self.governor.try_acquire(PUBLIC), 0)
+        self.assertGreater(self.governor.try_acquire(PRIVATE), 0)
+        self.assertEqual(self.governor.try_acquire(ORDER), 0)
+        self.assertAlmostEqual(self.governor.try_acquire(ORDER), 1.0)
+
+        self.clock.now = 1.0
+        self.assertEqual(self.governor.try_acquire(ORDER), 0)
+        self.assertEqual(dict(self.governor.granted), {PUBLIC: 3, ORDER: 2})
+
+    def test_waiting_order_goes_first(self):
+        for _ in range(4):
+            self.governor.try_acquire(ORDER)
+        priority = self.governor.enter(ORDER, None)
+        self.clock.now = 10.0
+        self.assertGreater(self.governor.try_acquire(PUBLIC), 0)
+        self.assertEqual(self.governor.try_acquire(ORDER, priority), 0)
+        self.governor.leave(priority)
+        self.assertEqual(self.governor.try_acquire(PUBLIC), 0)
+
+    def test_block_after_rate_limited(self):
+        self.governor.block(PUBLIC, 5)
+        self.assertAlmostEqual(self.governor.try_acquire(PUBLIC), 5)
+        self.assertEqual(self.governor.try_acquire(ORDER), 0)
+
+
+class GovernedClientTest(SimpleTestCase):
+    def test_burst_stays_under_exchange_limit(self):
+        loop = asyncio.new_event_loop()
+        exchange = MockExchange(
+            [MarketReplay.simulate("btc_jpy", 10, seed=1)], max_requests_per_second=25
+        )
+        base_url = loop.run_until_complete(exchange.start())
+        client = AsyncCoincheckClient(
+            BrokersConfig(
+                base_url=base_url,
+                api_urls=coincheck_cfg.api_urls,
+                max_retries=0,
+                rate_limits={"total": (20, 5)},
+            )
+        )
+
+        async def burst():
+            return await asyncio.gather(*(client.get_ticker() for _ in range(30)))
+
+        try:
+            responses = loop.run_until_complete(burst())
+        finally:
+            loop.run_until_complete(client.close())
+            loop.run_until_complete(exchange.stop())
+            loop.close()
+        self.assertFalse([r for r in responses if "error" in r])
+        self.assertEqual(client.governor.granted[PUBLIC], 30)
+
+
+class GovernedSyncClientTest(SimpleTestCase):
+    def setUp(self):
+        # The mock exchange serves from an event loop on its own thread
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.exchange = MockExchange(
+            [MarketReplay.simulate("btc_jpy", 10, seed=1)], max_requests_per_second=25
+        )
+        self.base_url = asyncio.run_coroutine_threadsafe(
+            self.exchange.start(), self.loop
+        ).result()
+
+    def tearDown(self):
+        close_sessions()
+        _governors.pop(self.base_url, None)
+        asyncio.run_coroutine_threadsafe(self.exchange.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def create_client(self, rate_limits, max_retries):
+        return CoincheckClient(
+            BrokersConfig(
+                base_url=self.base_url,
+                api_urls=coincheck_cfg.api_urls,
+                max_retries=max_retries,
+                backoff_factor=0,
+                rate_limits=rate_limits,
+            )
+        )
+
+    def burst(self, client, count=30):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return list(executor.map(lambda _: client.get_ticker(), range(count)))
+
+    def test_threads_stay_under_exchange_limit(self):
+        client = self.create_client({"total": (20, 5)}, max_retries=0)
+        responses = self.burst(client)
+        self.assertFalse([r for r in responses if "error" in r])
+        self.assertEqual(client.governor.granted[PUBLIC], 30)
+
+    def test_retries_wait_for_the_governor(self):
+        # Looser than the exchange: the 429s hold the bucket and every
+        # retry takes a token again
+        client = self.create_client({"total": (100, 100)}, max_retries=3)
+        # However the burst falls on the exchange's one second windows, one
+        # of them gets more than 25 requests
+        responses = self.burst(client, 60)
+        self.assertFalse([r for r in responses if "error" in r])
+        self.assertGreater(client.governor.granted[PUBLIC], 60)
+        self.assertGreater(client.governor.throttled[PUBLIC], 0)
@@ -0,0 +1,123 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+from management.scheduler import ScheduledTask, TaskScheduler, scheduled
+
+
+class SampleTasks:
+    def __init__(self):
+        self.calls = []
+        self.release_slow = threading.Event()
+
+    @scheduled(interval=0.05, group="io")
+    def fetch(self):
+        self.calls.append("fetch")
+
+    @scheduled(interval=0.05, depends_on=("fetch",), group="strategy")
+    def evaluate(self):
+        self.calls.append("evaluate")
+
+    @scheduled(interval=0.05, group="slow")
+    def slow(self):
+        self.release_slow.wait(5)
+        self.calls.append("slow")
+
+    def not_a_task(self):
+        self.calls.append("not_a_task")
+
+
+class TaskSchedulerTest(SimpleTestCase):
+    def setUp(self):
+        self.tasks = SampleTasks()
+        self.scheduler = TaskScheduler.from_object(self.tasks, default_interval=1)
+
+    def tearDown(self):
+        self.tasks.release_slow.set()
+        self.scheduler.shutdown()
+
+    def test_discovers_only_scheduled_methods(self):
+        self.assertEqual(set(self.scheduler.tasks), {"fetch", "evaluate", "slow"})
+
+    def test_run_once_respects_dependencies(self):
+        self.tasks.release_slow.set()
+        self.scheduler.run_once()
+        self.assertEqual(sorted(self.tasks.calls), ["evaluate", "fetch", "slow"])
+        self.assertLess(
+            self.tasks.calls.index("fetch"), self.tasks.calls.index("evaluate")
+        )
+
+    def test_slow_task_does_not_block_fast_tasks(self):
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            self.scheduler.run_pending()
+            time.sleep(0.01)
+
+        self.assertNotIn("slow", self.tasks.calls)
+        self.assertGreater(self.tasks.calls.count("fetch"), 3)
+        self.assertGreater(self.tasks.calls.count("evaluate"), 3)
+        self.assertEqual(self.scheduler.tasks["slow"].run_count, 0)
+
+    def test_dependency_cycle_rejected(self):
+        tasks = [
+            ScheduledTask("a", lambda: None, 1, depends_on=("b",)),
+            ScheduledTask("b", lambda: None, 1, depends_on=("a",)),
+        ]
+        with self.assertRaises(ValueError):
+            TaskScheduler(tasks)
+
+    def test_unknown_dependency_rejected(self):
+        tasks = [ScheduledTask("a", lambda: None, 1, depends_on=("missing",))]
+        with self.assertRaises(ValueError):
+            TaskScheduler(tasks)
+
+
+class PairTasks:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    @scheduled(interval=0.05, group="io", per_pair=True)
+    def fetch(self, pair):
+        with self.lock:
+            self.calls.append(("fetch", pair))
+
+    @scheduled(interval=0.05, depends_on=("fetch",), per_pair=True)
+    def evaluate(self, pair):
+        with self.lock:
+            self.calls.append(("evaluate", pair))
+
+    @scheduled(interval=0.05, depends_on=("fetch",))
+    def report(self):
+        with self.lock:
+            self.calls.append(("report", None))
+
+
+class PerPairTaskSchedulerTest(SimpleTestCase):
+    def setUp(self):
+        self.tasks = PairTasks()
+        self.scheduler = TaskScheduler.from_object(
+            self.tasks, default_interval=1, pairs=["a", "b"]
+        )
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def test_one_task_per_pair(self):
+        tasks = self.scheduler.tasks
+        self.assertEqual(
+            set(tasks),
+            {"fetch:a", "fetch:b", "evaluate:a", "evaluate:b", "report"},
+        )
+        self.assertEqual(tasks["evaluate:a"].depends_on, ("fetch:a",))
+        self.assertEqual(set(tasks["report"].depends_on), {"fetch:a", "fetch:b"})
+
+    def test_run_once_passes_pair(self):
+        self.scheduler.run_once()
+        calls = self.tasks.calls
+        self.assertEqual(len(calls), 5)
+        for pair in ("a", "b"):
+            self.assertLess(
+                calls.index(("fetch", pair)), calls.index(("evaluate", pair))
+            )
+        self.assertEqual(calls[-1], ("report", None))
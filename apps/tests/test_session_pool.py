@@ -0,0 +1,89 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from apps.brokers.coincheck_client import CoincheckClient
+from apps.brokers.config import BrokersConfig, coincheck_cfg
+from apps.brokers.session_pool import close_sessions, get_session
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures_left = 0
+    ports = set()
+    nonces = []
+
+    def do_GET(self):
+        StubHandler.ports.add(self.client_address[1])
+        if StubHandler.failures_left > 0:
+            StubHandler.failures_left -= 1
+            self._reply(503, {"error": "unavailable"})
+        else:
+            self._reply(200, {"last": 100.0})
+
+    def do_DELETE(self):
+        StubHandler.nonces.append(self.headers.get("ACCESS-NONCE"))
+        if StubHandler.failures_left > 0:
+            StubHandler.failures_left -= 1
+            self._reply(429, {"error": "too many requests"})
+        else:
+            self._reply(200, {"success": True, "id": 1})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SessionPoolTest(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.config = BrokersConfig(
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+            api_urls=coincheck_cfg.api_urls,
+            backoff_factor=0,
+        )
+        StubHandler.failures_left = 0
+        StubHandler.ports = set()
+        StubHandler.nonces = []
+
+    def tearDown(self):
+        close_sessions()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_shared_per_base_url(self):
+        self.assertIs(get_session(self.config), CoincheckClient(self.config).session)
+
+    def test_connection_reused(self):
+        client = CoincheckClient(self.config)
+        for _ in range(5):
+            self.assertEqual(client.get_ticker(), {"last": 100.0})
+        self.assertEqual(len(StubHandler.ports), 1)
+
+    def test_retry_on_server_error(self):
+        StubHandler.failures_left = 2
+        res = CoincheckClient(self.config).get_ticker()
+        self.assertEqual(res, {"last": 100.0})
+
+    def test_error_after_retries_exhausted(self):
+        StubHandler.failures_left = 10
+        res = CoincheckClient(self.config).get_ticker()
+        self.assertIn("error", res)
+
+    def test_signed_request_retried_with_new_nonce(self):
+        StubHandler.failures_left = 2
+        self.config.api_key, self.config.secret_key = "key", "secret"
+        res = CoincheckClient(self.config).delet_cancel_order(1)
+        self.assertEqual(res, {"success": True, "id": 1})
+        self.assertEqual(len(StubHandler.nonces), 3)
+        self.assertEqual(len(set(StubHandler.nonces)), 3)
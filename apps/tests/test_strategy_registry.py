@@ -0,0 +1,113 @@
+import threading
+from unittest import mock
+
+from btc_strategy import BTCStrategy
+from cache.bars import bar_aggregator
+from cache.order_book import order_book_cache
+from cache.price_history import price_history_cache
+from django.test import SimpleTestCase
+from registry import DataRequirements, MarketSnapshot, StrategyRegistry
+
+PAIR = "test_jpy"
+
+
+class SampleStrategy:
+    requirements = DataRequirements(history=3)
+
+    def __init__(self, pair, requirements=None, fail=False):
+        self.pair = pair
+        if requirements is not None:
+            self.requirements = requirements
+        self.fail = fail
+        self.threads = set()
+
+    def evaluate(self, snapshot):
+        self.threads.add(threading.current_thread().name)
+        if self.fail:
+            raise RuntimeError("broken strategy")
+        return snapshot.current_price
+
+
+class StrategyRegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = StrategyRegistry(max_workers=4)
+        price_history_cache.add_trades(PAIR, [10, 11, 12, 13], [1, 2, 3, 4])
+        bar_aggregator.add_trades(PAIR, [10, 11, 12, 13], [1, 1, 1, 1], [1, 2, 3, 4])
+        order_book_cache.update(
+            PAIR, {"asks": [["14", "1"], ["15", "1"]], "bids": [["12", "1"]]}
+        )
+
+    def tearDown(self):
+        self.registry.shutdown()
+        for cache in (price_history_cache, bar_aggregator, order_book_cache):
+            cache.clear(PAIR)
+
+    def test_combine_requirements(self):
+        combined = DataRequirements.combine(
+            [
+                DataRequirements(history=10, bars={"1m": 5}),
+                DataRequirements(history=3, bars={"1m": 2, "1s": 4}, book_depth=1),
+            ]
+        )
+        self.assertEqual(combined, DataRequirements(10, {"1m": 5, "1s": 4}, 1, False))
+
+    def test_snapshot_is_read_only_copy(self):
+        snapshot = MarketSnapshot.load(
+            PAIR, DataRequirements(history=2, bars={"1s": 10}, book_depth=1)
+        )
+        self.assertEqual(snapshot.rates.tolist(), [12, 13])
+        self.assertEqual(len(snapshot.bars["1s"]), 4)
+        self.assertEqual(snapshot.order_book.get_levels("asks"), [(14.0, 1.0)])
+        with self.assertRaises(ValueError):
+            snapshot.rates[0] = 0
+        order_book_cache.apply_diff(PAIR, asks=[["14", "0"]])
+        self.assertEqual(snapshot.order_book.best_ask, 14.0)
+
+    def test_strategies_share_one_snapshot(self):
+        for i in range(50):
+            self.registry.register(f"sample{i}", SampleStrategy)
+        self.registry.register(
+            "bars",
+            lambda pair: SampleStrategy(pair, DataRequirements(bars={"1m": 1})),
+        )
+        self.registry.register("other_pair", SampleStrategy, pairs=["btc_jpy"])
+
+        with mock.patch.object(
+            MarketSnapshot, "load", wraps=MarketSnapshot.load
+        ) as load:
+            results = self.registry.run(PAIR)
+
+        load.assert_called_once_with(PAIR, DataRequirements(history=3, bars={"1m": 1}))
+        self.assertEqual(len(results), 51)
+        self.assertEqual(set(results.values()), {13.0})
+        threads = set().union(
+            *(s.threads for s in self.registry.get_strategies(PAIR).values())
+        )
+        self.assertTrue(all(name.startswith("strategy") for name in threads))
+
+    def test_failing_strategy_does_not_stop_others(self):
+        self.registry.register("ok", SampleStrategy)
+        self.registry.register("broken", lambda pair: SampleStrategy(pair, fail=True))
+        self.assertEqual(self.registry.run(PAIR), {"ok": 13.0})
+        # Instances keep their state between cycles
+        strategy = self.registry.get_strategies(PAIR)["ok"]
+        self.registry.run(PAIR)
+        self.assertIs(self.registry.get_strategies(PAIR)["ok"], strategy)
+
+
+class BTCStrategyEvaluateTest(SimpleTestCase):
+    def test_every_branch_returns_the_strategy_result(self):
+        result = {"TradeAction": ["BUY"], "CurrentPrice": [100.0]}
+        strategy = BTCStrategy(pair=PAIR)
+        with mock.patch.object(
+            BTCStrategy, "execute_strategy", return_value=result
+        ), mock.patch("btc_strategy.Order") as order:
+            for last_order in (
+                None,
+                mock.Mock(order_type="BUY"),
+                mock.Mock(order_type="SELL"),
+            ):
+                snapshot = mock.Mock(last_order=last_order, order_book=None)
+                self.assertIs(strategy.evaluate(snapshot), result)
+        # No order when the last one was already a BUY
+        self.assertEqual(order.return_value.save.call_count, 2)
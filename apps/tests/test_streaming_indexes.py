@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from indexes import Indexes, RollingStats, StreamingIndexes, WilderRSI
+
+
+def wilder_rsi_reference(rates, period):
+    deltas = np.diff(rates)
+    gains, losses = np.maximum(deltas, 0), np.maximum(-deltas, 0)
+    average_gain, average_loss = gains[:period].mean(), losses[:period].mean()
+    for gain, loss in zip(gains[period:], losses[period:]):
+        average_gain = (average_gain * (period - 1) + gain) / period
+        average_loss = (average_loss * (period - 1) + loss) / period
+    return 100 - 100 / (1 + average_gain / average_loss)
+
+
+class StreamingIndexesTest(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.rates = 5_000_000 + np.cumsum(rng.normal(0, 1000, size=500))
+
+    def test_rolling_stats_match_pandas(self):
+        stats = RollingStats(20)
+        for rate in self.rates:
+            stats.update(rate)
+        series = pd.Series(self.rates)
+        self.assertAlmostEqual(stats.mean, series.tail(20).mean(), places=4)
+        self.assertAlmostEqual(stats.std, series.tail(20).std(), places=4)
+
+    def test_bollinger_bands_match_indexes(self):
+        streaming = StreamingIndexes(20, 2, 14).update_many(self.rates)
+        mean, upper, lower = Indexes().calculate_bollinger_bands(
+            pd.Series(self.rates), 20, 2
+        )
+        for actual, expected in zip(
+            streaming.bollinger_bands, (mean.iloc[-1], upper.iloc[-1], lower.iloc[-1])
+        ):
+            self.assertAlmostEqual(actual, expected, places=4)
+
+    def test_wilder_rsi(self):
+        rsi = WilderRSI(14)
+        for rate in self.rates:
+            rsi.update(rate)
+        self.assertAlmostEqual(rsi.rsi, wilder_rsi_reference(self.rates, 14))
+
+    def test_not_ready_before_window_filled(self):
+        streaming = StreamingIndexes(20, 2, 14).update_many(self.rates[:10])
+        self.assertFalse(streaming.is_ready)
+        self.assertTrue(np.isnan(streaming.bollinger_bands[0]))
+
+    def test_snapshot_round_trip(self):
+        streaming = StreamingIndexes(20, 2, 14).update_many(self.rates[:300])
+        snapshot = json.loads(json.dumps(streaming.snapshot()))
+        restored = StreamingIndexes.from_snapshot(snapshot)
+
+        streaming.update_many(self.rates[300:])
+        restored.update_many(self.rates[300:])
+        self.assertEqual(streaming.bollinger_bands, restored.bollinger_bands)
+        self.assertEqual(streaming.normalized_rsi, restored.normalized_rsi)
+        self.assertEqual(streaming.volatility, restored.volatility)
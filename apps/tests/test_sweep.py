@@ -0,0 +1,39 @@
+import numpy as np
+from backtest import Backtester
+from django.test import SimpleTestCase
+from sweep import ParameterSweep
+
+from apps.strategies.config import StrategiesConfig
+
+
+class ParameterSweepTest(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.rates = 5_000_000 + np.cumsum(rng.normal(0, 2000, size=3000))
+        self.timestamps = 1_700_000_000 + np.arange(3000) * 60.0
+
+    def test_results_are_ranked(self):
+        sweep = ParameterSweep(
+            {"moving_average_window": [5, 10, 20, 40], "rsi_period": [7, 14]},
+            max_workers=2,
+            chunk_size=3,
+            fee_rate=0.001,
+        )
+        results = sweep.run(self.rates, self.timestamps)
+
+        self.assertEqual(len(results), 8)
+        self.assertTrue(results["TotalReturn"].is_monotonic_decreasing)
+
+        best = results.iloc[0]
+        expected = Backtester(
+            StrategiesConfig(
+                moving_average_window=int(best["moving_average_window"]),
+                rsi_period=int(best["rsi_period"]),
+            ),
+            fee_rate=0.001,
+        ).run(self.rates, self.timestamps)
+        self.assertAlmostEqual(best["TotalReturn"], expected.stats["TotalReturn"])
+
+    def test_unknown_parameter_rejected(self):
+        with self.assertRaises(ValueError):
+            ParameterSweep({"window": [1, 2]}).get_combinations()
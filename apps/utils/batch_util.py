@@ -0,0 +1,121 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connections, models, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class UtxBatchWriter:
+    """
+    Write-behind buffer for model instances.
+
+    add() queues an instance and returns; a background thread writes the
+    queued instances with one bulk_create per model once max_batch of them
+    are pending or the oldest waited max_age seconds.
+
+    Backpressure: add() blocks while max_pending instances are queued, so
+    a producer faster than the database slows down instead of growing
+    memory. Durability: flush() waits until everything added before it is
+    written, and close() (also run at interpreter exit) drains the queue
+    before stopping the thread. A batch the database rejects is retried one
+    row at a time so a single bad row only loses itself, and is logged.
+    """
+
+    _FLUSH, _CLOSE = "flush", "close"
+
+    def __init__(self, max_batch=500, max_age=1.0, max_pending=10000):
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self.queue = queue.Queue(max_pending)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.written = 0
+        self.failed = 0
+
+    def add(self, instance, timeout=None):
+        """Queue an instance for writing; raises queue.Full after timeout seconds."""
+        self.start()
+        self.queue.put(instance, timeout=timeout)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="utx-batch-writer", daemon=True
+                )
+                self.thread.start()
+
+    def flush(self, timeout=None):
+        """Wait until every instance added so far is written; False on timeout."""
+        if self.thread is None or not self.thread.is_alive():
+            return True
+        done = threading.Event()
+        self.queue.put((self._FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Write everything queued and stop the writer thread."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None and thread.is_alive():
+            self.queue.put((self._CLOSE, None))
+            thread.join(timeout)
+
+    def run(self):
+        pending = defaultdict(list)
+        count, oldest = 0, None
+        try:
+            while True:
+                timeout = None
+                if oldest is not None:
+                    timeout = max(0.0, oldest + self.max_age - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                command = item[0] if isinstance(item, tuple) else None
+                if isinstance(item, models.Model):
+                    pending[type(item)].append(item)
+                    count += 1
+                    oldest = oldest or time.monotonic()
+                if count and (item is None or command or count >= self.max_batch):
+                    self.write(pending)
+                    pending = defaultdict(list)
+                    count, oldest = 0, None
+                if command == self._FLUSH:
+                    item[1].set()
+                elif command == self._CLOSE:
+                    break
+        finally:
+            # The thread owns its database connection
+            connections.close_all()
+
+    def write(self, pending):
+        for model, instances in pending.items():
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(instances, batch_size=self.max_batch)
+                self.written += len(instances)
+            except Exception as e:
+                logger.error(
+                    f"Error bulk saving {len(instances)} {model.__name__} instances: {e}"
+                )
+                self.write_each(instances)
+
+    def write_each(self, instances):
+        for instance in instances:
+            try:
+                models.Model.save(instance, force_insert=True)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error saving {type(instance).__name__} instance: {e}")
+
+
+batch_writer = UtxBatchWriter()
+atexit.register(batch_writer.close)
@@ -1,41 +1,50 @@
+import logging
 import os
+import re
+from datetime import datetime, timedelta
 
-import pandas as pd
 from django.apps import apps
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import connection, models
 
+logger = logging.getLogger(__name__)
+
 
 class UtxDBService:
+    """
+    Creates and updates the tables of the data models with Django's schema
+    editor, so they get the primary keys, indexes and constraints declared
+    on the models.
+
+    The app has no migration files. Instead, when a model changes,
+    create_models_tables brings its existing table up to date: missing
+    columns, indexes, constraints and the primary key of tables created by
+    older versions are added, and columns whose type changed are converted
+    in place with their rows. Dropped fields are not applied.
+
+    Append-only time series list their time columns in a BRIN_FIELDS class
+    attribute and get a BRIN index on PostgreSQL, which stays a few pages
+    large however long the history grows.
+
+    Models with a PARTITION_FIELD get a range-partitioned table on
+    PostgreSQL, with one partition per day or month (UTX_PARTITION_INTERVAL
+    "day" or "month", anything else disables partitioning) and a default
+    partition for rows outside them. maintain_partitions() creates the
+    partitions of the next UTX_PARTITIONS_AHEAD periods and drops the ones
+    older than UTX_RETENTION_DAYS, or only detaches them as archive tables
+    when UTX_ARCHIVE_PARTITIONS=1. Tables created before partitioning was
+    enabled stay unpartitioned.
+    """
+
+    PARTITION_SUFFIX = re.compile(r"_p(\d{8}|\d{6})$")
+
     def __init__(self):
         self.models_directory = os.environ.get("UTX_DATA_MODELS", "data")
-        self.django_to_pg_type_mapping = self._default_django_to_pg_type_mapping()
-
-    @staticmethod
-    def _default_django_to_pg_type_mapping():
-        """Provides default mapping from Django field types to PostgreSQL types."""
-        return {
-            models.AutoField: "SERIAL",
-            models.BigAutoField: "BIGSERIAL",
-            models.BooleanField: "BOOLEAN",
-            models.CharField: "VARCHAR",
-            models.DateField: "DATE",
-            models.DateTimeField: "TIMESTAMP",
-            models.DecimalField: "NUMERIC",
-            models.DurationField: "INTERVAL",
-            models.FileField: "VARCHAR",
-            models.FloatField: "DOUBLE PRECISION",
-            models.IntegerField: "INTEGER",
-            models.BigIntegerField: "BIGINT",
-            models.BooleanField: "BOOLEAN",  # NullBooleanField is deprecated
-            models.PositiveIntegerField: "INTEGER",
-            models.PositiveSmallIntegerField: "SMALLINT",
-            models.SlugField: "VARCHAR",
-            models.SmallAutoField: "SMALLSERIAL",
-            models.SmallIntegerField: "SMALLINT",
-            models.TextField: "TEXT",
-            models.TimeField: "TIME",
-            models.UUIDField: "UUID",
-        }
+        self.partition_interval = os.environ.get("UTX_PARTITION_INTERVAL", "month")
+        self.partitions_ahead = int(os.environ.get("UTX_PARTITIONS_AHEAD", 2))
+        retention_days = os.environ.get("UTX_RETENTION_DAYS")
+        self.retention_days = int(retention_days) if retention_days else None
+        self.archive_partitions = os.environ.get("UTX_ARCHIVE_PARTITIONS") == "1"
 
     def get_models(self):
         """Fetches all models from the specified Django app, with error handling."""
@@ -46,36 +55,292 @@ class UtxDBService:
                 f"No installed app with label '{self.models_directory}'. Please check your UTX_DATA_MODELS environment variable and INSTALLED_APPS configuration."
             )
 
-    def extract_model_fields(self, model):
-        """Extracts field names and types from a given model, excluding reverse relations."""
-        return [
-            (field.name, type(field))
-            for field in model._meta.get_fields()
-            if not field.is_relation or field.one_to_many or field.one_to_one
+    @staticmethod
+    def get_brin_indexes(model):
+        if connection.vendor != "postgresql":
+            return []
+        indexes = []
+        for field_name in getattr(model, "BRIN_FIELDS", ()):
+            index = BrinIndex(fields=[field_name])
+            index.set_name_with_model(model)
+            indexes.append(index)
+        return indexes
+
+    def create_model_table(self, model):
+        """Create the table of a model, or add what an existing table is missing."""
+        table = model._meta.db_table
+        partitioned = self.is_partitioned_model(model)
+        if table not in connection.introspection.table_names():
+            with connection.schema_editor() as editor:
+                if partitioned:
+                    editor.execute(self.partitioned_table_sql(editor, model))
+                    for index in model._meta.indexes:
+                        editor.add_index(model, index)
+                else:
+                    editor.create_model(model)
+                for index in self.get_brin_indexes(model):
+                    editor.add_index(model, index)
+            logger.info(f"Created table {table}")
+        else:
+            self.sync_model_table(model)
+        if partitioned and self.is_partitioned_table(table):
+            self.create_partitions(model)
+
+    def sync_model_table(self, model):
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            columns = {
+                column.name: column
+                for column in connection.introspection.get_table_description(
+                    cursor, table
+                )
+            }
+            constraints = connection.introspection.get_constraints(cursor, table)
+
+        changes = []
+        if not any(constraint["primary_key"] for constraint in constraints.values()):
+            changes.append(("primary key", self.add_primary_key))
+        for field in model._meta.local_fields:
+            if field.column not in columns:
+                changes.append((f"column {field.column}", self.add_field(field)))
+            elif not field.primary_key:
+                old_field = self.get_column_field(model, field, columns[field.column])
+                if (
+                    old_field is not None
+                    and old_field.get_internal_type() != field.get_internal_type()
+                ):
+                    changes.append(
+                        (
+                            f"type {field.get_internal_type()} of {field.column}",
+                            self.alter_field(old_field, field),
+                        )
+                    )
+        for index in model._meta.indexes + self.get_brin_indexes(model):
+            if index.name not in constraints:
+                changes.append((f"index {index.name}", self.add_index(index)))
+        for constraint in model._meta.constraints:
+            if constraint.name not in constraints:
+                changes.append(
+                    (f"constraint {constraint.name}", self.add_constraint(constraint))
+                )
+
+        # One transaction per change so a failing one does not undo the others
+        for description, change in changes:
+            try:
+                with connection.schema_editor() as editor:
+                    change(editor, model)
+                logger.info(f"Applied {description} to {table}")
+            except Exception as e:
+                logger.error(f"Error applying {description} to {table}: {e}")
+
+    @staticmethod
+    def add_primary_key(editor, model):
+        pk = model._meta.pk
+        editor.execute(
+            f"ALTER TABLE {editor.quote_name(model._meta.db_table)} "
+            f"ADD PRIMARY KEY ({editor.quote_name(pk.column)})"
+        )
+
+    @staticmethod
+    def get_column_field(model, field, column):
+        """
+        Field matching the current type of a column, so alter_field converts
+        the stored values (USING column::type on PostgreSQL), or None for
+        types Django does not map.
+        """
+        try:
+            field_type = connection.introspection.get_field_type(
+                column.type_code, column
+            )
+        except KeyError:
+            return None
+        kwargs = {"null": bool(column.null_ok)}
+        if field_type == "CharField":
+            kwargs["max_length"] = column.internal_size or 255
+        elif field_type == "DecimalField":
+            kwargs["max_digits"] = column.precision or 65
+            kwargs["decimal_places"] = column.scale or 0
+        old_field = getattr(models, field_type)(**kwargs)
+        old_field.set_attributes_from_name(field.name)
+        old_field.model = model
+        return old_field
+
+    @staticmethod
+    def alter_field(old_field, field):
+        return lambda editor, model: editor.alter_field(model, old_field, field)
+
+    @staticmethod
+    def add_field(field):
+        return lambda editor, model: editor.add_field(model, field)
+
+    @staticmethod
+    def add_index(index):
+        return lambda editor, model: editor.add_index(model, index)
+
+    @staticmethod
+    def add_constraint(constraint):
+        return lambda editor, model: editor.add_constraint(model, constraint)
+
+    # Partitioning
+    def is_partitioned_model(self, model):
+        return (
+            connection.vendor == "postgresql"
+            and self.partition_interval in ("day", "month")
+            and getattr(model, "PARTITION_FIELD", None) is not None
+        )
+
+    @staticmethod
+    def is_partitioned_table(table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table JOIN pg_class "
+                "ON pg_class.oid = pg_partitioned_table.partrelid "
+                "WHERE pg_class.relname = %s",
+                [table],
+            )
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def partitioned_table_sql(editor, model):
+        """
+        CREATE TABLE of a model partitioned by range of its PARTITION_FIELD.
+
+        PostgreSQL requires the partition column in the primary key and
+        unique constraints, so it is appended to them. Identity columns are
+        not supported on partitioned tables; utx_ids are generated by the
+        models anyway.
+        """
+        quote = editor.quote_name
+        partition_column = model._meta.get_field(model.PARTITION_FIELD).column
+        definitions = []
+        for field in model._meta.local_fields:
+            definition, _ = editor.column_sql(model, field, include_default=False)
+            definition = definition.replace(" PRIMARY KEY", "")
+            definitions.append(f"{quote(field.column)} {definition}")
+        keys = [(f"{model._meta.db_table}_pkey", "PRIMARY KEY", [model._meta.pk.name])]
+        keys += [
+            (constraint.name, "UNIQUE", list(constraint.fields))
+            for constraint in model._meta.constraints
+            if isinstance(constraint, models.UniqueConstraint)
         ]
+        for name, kind, field_names in keys:
+            columns = [
+                model._meta.get_field(field_name).column for field_name in field_names
+            ]
+            if partition_column not in columns:
+                columns.append(partition_column)
+            definitions.append(
+                f"CONSTRAINT {quote(name)} {kind} "
+                f"({', '.join(quote(column) for column in columns)})"
+            )
+        return (
+            f"CREATE TABLE {quote(model._meta.db_table)} ({', '.join(definitions)}) "
+            f"PARTITION BY RANGE ({quote(partition_column)})"
+        )
 
-    def map_django_to_pg_type(self, django_type):
-        """Maps a Django field type to a PostgreSQL type."""
-        return self.django_to_pg_type_mapping.get(
-            django_type, "TEXT"
-        )  # Default to TEXT for unmapped types
+    def get_period_start(self, moment):
+        if self.partition_interval == "day":
+            return datetime(moment.year, moment.month, moment.day)
+        return datetime(moment.year, moment.month, 1)
 
-    def create_model_table(self, model):
-        """Generates SQL for creating a table based on a Django model, using safe parameterized queries."""
-        model_name = model._meta.model_name
-        fields = self.extract_model_fields(model)
-        pg_fields = [
-            (name, self.map_django_to_pg_type(dtype)) for name, dtype in fields
+    @staticmethod
+    def get_next_period(start, interval):
+        if interval == "day":
+            return start + timedelta(days=1)
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+    def get_partition_name(self, table, start):
+        suffix = (
+            f"{start:%Y%m%d}" if self.partition_interval == "day" else f"{start:%Y%m}"
+        )
+        return f"{table}_p{suffix}"
+
+    def partition_sql(self, table, start):
+        end = self.get_next_period(start, self.partition_interval)
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.get_partition_name(table, start)} "
+            f"PARTITION OF {table} FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+
+    def create_partitions(self, model, now=None):
+        """Create the default partition and those of this and the next periods."""
+        table = model._meta.db_table
+        start = self.get_period_start(now or datetime.now())
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
         ]
-        fields_str = ", ".join([f"{name} {data_type}" for name, data_type in pg_fields])
+        for _ in range(self.partitions_ahead + 1):
+            statements.append(self.partition_sql(table, start))
+            start = self.get_next_period(start, self.partition_interval)
+        for statement in statements:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(statement)
+            except Exception as e:
+                # e.g. rows of the new range already in the default partition
+                logger.error(f"Error creating partition of {table}: {e}")
 
-        # Using Django's ORM to execute raw SQL safely
+    def get_partitions(self, table):
+        """(name, end of range) of the dated partitions of a table."""
         with connection.cursor() as cursor:
             cursor.execute(
-                f"CREATE TABLE IF NOT EXISTS data_{model_name} ({fields_str})"
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = %s",
+                [table],
+            )
+            names = [name for (name,) in cursor.fetchall()]
+        partitions = []
+        for name in names:
+            match = self.PARTITION_SUFFIX.search(name)
+            if match is None:
+                continue
+            suffix = match.group(1)
+            if len(suffix) == 8:
+                end = self.get_next_period(datetime.strptime(suffix, "%Y%m%d"), "day")
+            else:
+                end = self.get_next_period(datetime.strptime(suffix, "%Y%m"), "month")
+            partitions.append((name, end))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    def drop_expired_partitions(self, model, now=None):
+        """
+        Drop (or detach, with archive_partitions) the partitions whose rows
+        are all older than retention_days.
+
+        Returns:
+            :Names of the removed partitions
+        """
+        if self.retention_days is None:
+            return []
+        table = model._meta.db_table
+        cutoff = (now or datetime.now()) - timedelta(days=self.retention_days)
+        removed = []
+        for name, end in self.get_partitions(table):
+            if end > cutoff:
+                break
+            if self.archive_partitions:
+                statement = f"ALTER TABLE {table} DETACH PARTITION {name}"
+            else:
+                statement = f"DROP TABLE {name}"
+            with connection.cursor() as cursor:
+                cursor.execute(statement)
+            removed.append(name)
+            logger.info(
+                f"{'Detached' if self.archive_partitions else 'Dropped'} {name}"
             )
+        return removed
+
+    def maintain_partitions(self, now=None):
+        """Create upcoming partitions and remove expired ones for every partitioned model."""
+        for model in self.get_models():
+            table = model._meta.db_table
+            if self.is_partitioned_model(model) and self.is_partitioned_table(table):
+                self.create_partitions(model, now)
+                self.drop_expired_partitions(model, now)
 
     def create_models_tables(self):
-        """Creates PostgreSQL tables for all models in the specified Django app."""
+        """Creates or updates the tables of all models in the specified Django app."""
         for model in self.get_models():
             self.create_model_table(model)
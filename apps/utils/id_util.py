@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class UtxIdGenerator:
+    """
+    Snowflake-style 63 bit ID generator.
+
+    Layout (most to least significant):
+        41 bits milliseconds since EPOCH_MS (about 69 years)
+        10 bits worker id
+        12 bits sequence within the millisecond
+
+    IDs are unique and strictly increasing for one generator, and roughly
+    time-sortable across generators. When a millisecond runs out of sequence
+    numbers or the clock moves backwards, the generator keeps counting on a
+    logical clock instead of waiting, so it never blocks or repeats an ID.
+
+    Processes must use distinct worker ids. A process started on its own
+    reserves UTX_WORKER_COUNT ids (1 when unset) from UTX_WORKER_ID (0
+    when unset), and uses the first one; give every such process a range
+    that does not overlap the others. The rest of the range is for the
+    processes it forks: every fork hands the upper half of the free ids
+    to the child, which splits it again for its own children. Ids are not
+    given back when a child exits. A child forked once the range is used
+    up has no worker id, and its generator raises instead of repeating
+    the parent's ids.
+    """
+
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+    def __init__(self, worker_id=None, worker_count=None):
+        if worker_id is None:
+            worker_id = int(os.getenv("UTX_WORKER_ID", "0"))
+        if worker_count is None:
+            worker_count = int(os.getenv("UTX_WORKER_COUNT", "1"))
+        last_id = worker_id + worker_count - 1
+        if not 0 <= worker_id <= last_id <= self.MAX_WORKER_ID:
+            raise ValueError(
+                f"Worker ids {worker_id}..{last_id} outside 0..{self.MAX_WORKER_ID}"
+            )
+        self.worker_id = worker_id
+        # Worker ids left for the children this process forks
+        self.free_ids = range(worker_id + 1, last_id + 1)
+        self.lock = threading.Lock()
+        self.last_ms = 0
+        self.sequence = 0
+
+    def split(self):
+        """
+        Hand the upper half of the free worker ids to a child process.
+
+        Returns:
+            :(worker_id, worker_count) of the child, None when none is left
+        """
+        with self.lock:
+            if not self.free_ids:
+                return None
+            child_ids = self.free_ids[len(self.free_ids) // 2 :]
+            self.free_ids = self.free_ids[: len(self.free_ids) // 2]
+        return child_ids[0], len(child_ids)
+
+    @staticmethod
+    def current_ms():
+        return time.time_ns() // 1_000_000
+
+    def reserve(self, count):
+        """
+        Reserve count sequence numbers.
+        Returns a list of (milliseconds, first_sequence, size) blocks.
+        """
+        blocks = []
+        # The critical section only does integer arithmetic; a batch of any
+        # size costs a single acquisition.
+        with self.lock:
+            now = self.current_ms() - self.EPOCH_MS
+            if now > self.last_ms:
+                self.last_ms = now
+                self.sequence = 0
+            while count > 0:
+                free = self.MAX_SEQUENCE + 1 - self.sequence
+                if free == 0:
+                    self.last_ms += 1
+                    self.sequence = 0
+                    continue
+                size = min(free, count)
+                blocks.append((self.last_ms, self.sequence, size))
+                self.sequence += size
+                count -= size
+        return blocks
+
+    def compose(self, milliseconds, sequence):
+        return (
+            (milliseconds << (self.WORKER_BITS + self.SEQUENCE_BITS))
+            | (self.worker_id << self.SEQUENCE_BITS)
+            | sequence
+        )
+
+    def next_id(self):
+        """Return one new ID."""
+        ((milliseconds, sequence, _),) = self.reserve(1)
+        return self.compose(milliseconds, sequence)
+
+    def next_ids(self, count):
+        """Return count new IDs in increasing order, e.g. for a bulk insert."""
+        ids = []
+        for milliseconds, sequence, size in self.reserve(count):
+            first_id = self.compose(milliseconds, sequence)
+            ids.extend(range(first_id, first_id + size))
+        return ids
+
+    @classmethod
+    def decode(cls, utx_id):
+        """Split an ID into its (datetime, worker id, sequence) parts."""
+        milliseconds = utx_id >> (cls.WORKER_BITS + cls.SEQUENCE_BITS)
+        worker_id = (utx_id >> cls.SEQUENCE_BITS) & cls.MAX_WORKER_ID
+        sequence = utx_id & cls.MAX_SEQUENCE
+        created_at = datetime.fromtimestamp(
+            (milliseconds + cls.EPOCH_MS) / 1000, tz=timezone.utc
+        )
+        return created_at, worker_id, sequence
+
+
+class NoWorkerIdGenerator:
+    """Generator of a forked child left without a worker id."""
+
+    worker_id = None
+    free_ids = range(0)
+
+    def split(self):
+        return None
+
+    def next_id(self):
+        raise RuntimeError(
+            "No worker id left for this forked process; raise UTX_WORKER_COUNT"
+        )
+
+    def next_ids(self, count):
+        return self.next_id()
+
+
+id_generator = UtxIdGenerator()
+# (worker_id, worker_count) of the child being forked
+_child_ids = None
+
+
+def _reserve_child_ids():
+    global _child_ids
+    _child_ids = id_generator.split()
+
+
+def _reset_after_fork():
+    # A forked child must not share the parent's worker id and sequence
+    global id_generator
+    if _child_ids is None:
+        id_generator = NoWorkerIdGenerator()
+    else:
+        id_generator = UtxIdGenerator(*_child_ids)
+
+
+os.register_at_fork(before=_reserve_child_ids, after_in_child=_reset_after_fork)
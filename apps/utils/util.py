@@ -1,6 +1,6 @@
-import datetime
 import os
 
+import id_util
 import pandas as pd
 from logger_util import UtxLogger as log
 
@@ -19,4 +19,8 @@ class UtxUtils:
 
     @staticmethod
     def generate_utx_id():
-        return datetime.datetime.now().strftime("%Y%d%m%H%M%S%f")[:-3]
+        return id_util.id_generator.next_id()
+
+    @staticmethod
+    def generate_utx_ids(count):
+        return id_util.id_generator.next_ids(count)